@@ -8,7 +8,14 @@ NETXMS_CONFIG = {
     'username': 'admin',
     'password': 'password',
     'timeout': 30,
-    'verify_ssl': False
+    'verify_ssl': False,
+    'max_workers': 16,    # Requêtes simultanées lors de la collecte (taille du pool de connexions)
+    'bulk_batch_size': 200,  # Nœuds par requête de lecture groupée des DCI
+    'incremental_overlap': 120,  # Secondes relues avant le dernier point reçu (points tardifs)
+    'cache_ttl': {               # Durée de validité du cache de l'inventaire (secondes)
+        'nodes': 300,
+        'node_details': 900
+    }
 }
 
 # Métriques à surveiller
@@ -40,26 +47,32 @@ METRICS_CONFIG = {
 }
 
 # Types d'équipements
+# 'thresholds' : seuils propres au type, remplaçant ceux de METRICS_CONFIG ; vides par défaut,
+# tous les types utilisent donc les seuils de METRICS_CONFIG, sur toutes les métriques
 EQUIPMENT_TYPES = {
     'server': {
         'name': 'Serveur',
         'icon': '🖥️',
-        'metrics': ['cpu_utilization', 'memory_utilization', 'disk_utilization', 'network_traffic']
+        'metrics': ['cpu_utilization', 'memory_utilization', 'disk_utilization', 'network_traffic'],
+        'thresholds': {}
     },
     'router': {
         'name': 'Routeur',
         'icon': '🌐',
-        'metrics': ['cpu_utilization', 'network_traffic']
+        'metrics': ['cpu_utilization', 'network_traffic'],
+        'thresholds': {}
     },
     'switch': {
         'name': 'Switch',
         'icon': '🔌',
-        'metrics': ['cpu_utilization', 'network_traffic']
+        'metrics': ['cpu_utilization', 'network_traffic'],
+        'thresholds': {}
     },
     'firewall': {
         'name': 'Firewall',
         'icon': '🛡️',
-        'metrics': ['cpu_utilization', 'memory_utilization', 'network_traffic']
+        'metrics': ['cpu_utilization', 'memory_utilization', 'network_traffic'],
+        'thresholds': {}
     }
 }
 
@@ -68,4 +81,95 @@ REFRESH_INTERVALS = {
     'real_time': 30,      # Surveillance temps réel
     'historical': 300,     # Données historiques
     'alerts': 60          # Vérification des alertes
-} 
\ No newline at end of file
+} 
+# Historique en mémoire des métriques (tampons circulaires)
+TIMESERIES_CONFIG = {
+    'capacity': 720,      # Échantillons par série (6h à 30 secondes)
+    'max_series': 2048    # Nombre maximal d'équipements suivis
+}
+
+# Historique persistant des métriques (SQLite), un niveau d'agrégation par table
+METRICS_HISTORY_CONFIG = {
+    'path': 'monitoring/data/metrics_history.db',
+    'max_points': 2000,           # Points maximum renvoyés par une requête de plage
+    'retention_check': 600,       # Intervalle minimum entre deux purges (secondes)
+    'tiers': {
+        'raw': {'resolution': 30, 'retention_days': 2},
+        '5min': {'resolution': 300, 'retention_days': 35},
+        '1h': {'resolution': 3600, 'retention_days': 400}
+    }
+}
+
+# Planification adaptative de la collecte par nœud
+POLLING_CONFIG = {
+    'enabled': True,
+    'tick': 10,                   # Période de vérification des nœuds à interroger (secondes)
+    'min_interval': 10,           # Intervalle pour un nœud proche d'un seuil ou instable
+    'base_interval': REFRESH_INTERVALS['real_time'],
+    'max_interval': 300,          # Intervalle maximal pour un nœud stable
+    'backoff_factor': 1.5,        # Allongement de l'intervalle à chaque collecte stable
+    'proximity_ratio': 0.85,      # Valeur / seuil d'avertissement au-delà duquel le nœud est surveillé de près
+    'change_rate': 10.0,          # Variation (unités par minute) considérée comme rapide
+    'jitter': 0.1,                # Dispersion aléatoire des échéances (±10 %)
+    'max_polls_per_second': 50,   # Plafond global de nœuds interrogés par seconde
+    'burst': 500                  # Nœuds interrogeables d'un coup après une période calme
+}
+
+# Diffusion des changements entre deux collectes : écart absolu minimal (bande morte)
+# pour qu'une nouvelle valeur soit signalée aux abonnés
+SNAPSHOT_CONFIG = {
+    'dead_band': {
+        'cpu_utilization': 1.0,       # %
+        'memory_utilization': 1.0,    # %
+        'disk_utilization': 0.5,      # %
+        'network_traffic': 5.0,       # Mbps
+        'uptime_hours': 1.0
+    },
+    'default_dead_band': 0.0      # Métriques absentes de la liste : tout changement est signalé
+}
+
+# Graphiques temps réel de la page de surveillance
+CHART_CONFIG = {
+    'redraw_interval': 1,         # Période de redessin des courbes (secondes)
+    'max_series': 50,             # Courbes affichées simultanément (nœuds × métriques)
+    'max_points': 1200,           # Points tracés par courbe après décimation min/max
+    'history_refresh': 60,        # Relecture de l'historique persistant des longues fenêtres (secondes)
+    'windows': {                  # Fenêtres proposées (secondes)
+        '10 min': 600,
+        '1 h': 3600,
+        '6 h': 6 * 3600,
+        '24 h': 86400,
+        '7 jours': 7 * 86400
+    },
+    'default_window': '1 h',
+    'default_metrics': ['cpu', 'ram']
+}
+
+# Colonne de tendance du tableau des équipements (mini-courbes tirées de l'historique en mémoire)
+SPARKLINE_CONFIG = {
+    'windows': {                  # Durées proposées (secondes), limitées par la capacité de TIMESERIES_CONFIG
+        '1 h': 3600,
+        '2 h': 2 * 3600,
+        '4 h': 4 * 3600
+    },
+    'default_window': '1 h',
+    'default_metric': 'cpu',
+    'width': 120,                 # Largeur de la colonne (pixels)
+    'cache_size': 4096            # Images de courbes conservées (lignes visibles et récemment visibles)
+}
+
+# Exports de la page de surveillance (tableau et historique persistant)
+EXPORT_CONFIG = {
+    'chunk_size': 5000,           # Lignes lues et écrites par bloc : mémoire constante quelle que soit la taille
+    'history_hours': 24           # Plage proposée par défaut pour l'export de l'historique
+}
+
+# Arborescence des équipements (site > groupe > type) de la page de surveillance
+HIERARCHY_CONFIG = {
+    'site_fields': ['site', 'location', 'zone'],   # Champs du nœud NetXMS lus dans l'ordre
+    'group_fields': ['group', 'container'],
+    'default_site': "Site non renseigné",
+    'default_group': "Sans groupe",
+    'default_type': "Autre",
+    'fetch_batch': 500            # Équipements chargés à la fois à l'ouverture d'un groupe
+}
@@ -8,7 +8,22 @@ WAZUH_CONFIG = {
     'username': 'wazuh',
     'password': 'wazuh',
     'timeout': 30,
-    'verify_ssl': False
+    'verify_ssl': False,
+    'page_size': 1000,          # Événements par page lors de la pagination de /events
+    'max_workers': 4,           # Requêtes simultanées (taille du pool de connexions)
+    # Filtres de l'activité utilisateur, interrogés en parallèle
+    'user_activity_filters': [
+        'event_type:login',
+        'event_type:program_execution',
+        'event_type:file_access',
+        'event_type:network_access'
+    ],
+    # Requête unique couvrant tous les types, si le serveur accepte les filtres combinés
+    # (ex. 'event_type:(login OR program_execution OR file_access OR network_access)') ; None = un filtre par requête
+    'user_activity_query': None,
+    # Cache des résultats de scoring par (id d'événement, version du modèle)
+    'score_cache_size': 200000,  # Événements conservés (les moins récemment lus sont évincés)
+    'score_cache_ttl': 48 * 3600  # Durée de validité d'un résultat (secondes)
 }
 
 # Types d'événements à surveiller
@@ -52,6 +67,31 @@ ML_THRESHOLDS = {
     'anomaly_threshold': 0.8      # Seuil pour détection d'anomalie
 }
 
+# Caractéristiques du contenu des messages : hachage des mots (sans vocabulaire à
+# construire ni à stocker), en n_features colonnes creuses de largeur fixe
+MESSAGE_FEATURES_CONFIG = {
+    'enabled': True,
+    'n_features': 32,             # Colonnes de hachage ajoutées aux caractéristiques numériques
+    'ngram_range': (1, 2)         # Mots seuls et paires de mots consécutifs
+}
+
+# Détecteur incrémental (half-space trees), mis à jour à chaque lot analysé
+ONLINE_DETECTOR_CONFIG = {
+    'enabled': True,
+    'n_trees': 25,
+    'height': 8,                  # Profondeur des arbres (mémoire : n_trees × 2^(height+1) nœuds)
+    'window_size': 1000,          # Événements par fenêtre de référence
+    'size_limit': 0.1,            # Masse minimale (fraction de la fenêtre) pour descendre d'un niveau
+    'clip': 4.0,                  # Écarts-types conservés avant la mise à l'échelle dans [0, 1]
+    # Quantile des scores d'une fenêtre sous lequel un événement est noté 0 (normal) ;
+    # le score ne sert qu'au-delà, ce qui laisse l'activité habituelle sous les seuils
+    'calibration_quantile': 0.99,
+    'seed': 42,
+    # Score utilisé pour le niveau de risque : 'batch' (Isolation Forest réentraînée
+    # périodiquement) ou 'online' (ce détecteur, dès sa deuxième fenêtre complète)
+    'risk_source': 'batch'
+}
+
 # Paramètres de filtrage
 FILTER_OPTIONS = {
     'all_users': 'Tous les utilisateurs',
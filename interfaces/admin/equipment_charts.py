@@ -0,0 +1,271 @@
+"""
+Graphiques temps réel multi-séries de la page de surveillance
+"""
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QCheckBox, QComboBox, QLabel
+
+from monitoring.config.netxms_config import CHART_CONFIG, METRICS_CONFIG
+from monitoring.services.metrics_history_service import MetricsHistoryService, RAW_TIER
+from monitoring.utils.minmax_pyramid import MinMaxPyramid
+from monitoring.utils.timeseries_store import TimeSeriesStore
+
+logger = logging.getLogger(__name__)
+
+# Métriques proposées : clé de l'historique en mémoire -> (titre, métrique de METRICS_CONFIG)
+CHART_METRICS = {
+    'cpu': ("CPU (%)", 'cpu_utilization'),
+    'ram': ("RAM (%)", 'memory_utilization'),
+    'disk': ("Disque (%)", 'disk_utilization'),
+    'network': ("Réseau (Mbps)", 'network_traffic')
+}
+
+SERIES_COLORS = ['#e74c3c', '#27ae60', '#2980b9', '#8e44ad', '#f39c12', '#16a085', '#D96B8A', '#39396A', '#7f8c8d', '#c0392b']
+
+
+class HistoryLoadThread(QThread):
+    """Lecture de l'historique persistant et décimation des courbes, hors du thread de l'interface"""
+    series_loaded = pyqtSignal(object)  # {(métrique, nom): (clé de validité, x, y)}
+
+    def __init__(self, metrics_history: MetricsHistoryService, requests: List[Tuple], max_points: int, parent=None):
+        """requests : ((métrique, nom), clé de validité, identifiant NetXMS, DCI, début, fin)"""
+        super().__init__(parent)
+        self.metrics_history = metrics_history
+        self.requests = requests
+        self.max_points = max_points
+
+    def run(self):
+        results = {}
+        for key, stamp, node_id, dci_name, start, end in self.requests:
+            if self.isInterruptionRequested():
+                return
+            try:
+                tier = self.metrics_history.select_tier(start, end)
+                timestamps, values, minimum, maximum = self.metrics_history.query_arrays(node_id, dci_name, start, end, tier)
+                if tier == RAW_TIER:
+                    pyramid = MinMaxPyramid(timestamps, values)
+                else:
+                    # Agrégats : l'enveloppe min/max de chaque intervalle est tracée
+                    pyramid = MinMaxPyramid(timestamps, values, minimum, maximum)
+                x, y = pyramid.envelope(self.max_points)
+                results[key] = (stamp, x, y)
+            except Exception as e:
+                logger.warning(f"Lecture de l'historique impossible pour {key[1]} ({dci_name}): {e}")
+        self.series_loaded.emit(results)
+
+
+class EquipmentChartPanel(QWidget):
+    """
+    Un graphique par métrique sélectionnée, une courbe par équipement sélectionné.
+
+    Les fenêtres couvertes par l'historique en mémoire sont lues directement dans les
+    tampons circulaires ; les plus longues sont lues dans les agrégats min/max de
+    l'historique persistant par un HistoryLoadThread, et la courbe garde ses données
+    précédentes jusqu'à la fin de la lecture : le redessin n'accède jamais à SQLite. Au-delà de max_points, les courbes sont décimées par une
+    pyramide min/max : le coût de tracé ne dépend pas de la durée affichée. Les courbes
+    ne sont recalculées que si leur série a reçu de nouveaux échantillons.
+    """
+
+    def __init__(self, history: TimeSeriesStore, metrics_history: Optional[MetricsHistoryService], palette: Dict,
+                 parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.metrics_history = metrics_history
+        self.palette = palette
+        self.max_series = CHART_CONFIG['max_series']
+        self.max_points = CHART_CONFIG['max_points']
+        self.windows = CHART_CONFIG['windows']
+
+        self.selection: List[Tuple[str, Optional[int]]] = []  # (nom, identifiant NetXMS)
+        self.curves: Dict[Tuple[str, str], pg.PlotDataItem] = {}
+        self.cache: Dict[Tuple[str, str], Tuple] = {}  # (métrique, nom) -> (clé de validité, x, y)
+        self.colors: Dict[str, str] = {}
+        # Courbes lues dans l'historique persistant, lectures à lancer et lecture en cours
+        self.history_series: Dict[Tuple[str, str], Tuple] = {}
+        self.pending_loads: Dict[Tuple[str, str], Tuple] = {}
+        self.loading = set()  # (clé de courbe, clé de validité) en cours de lecture
+        self.loader: Optional[HistoryLoadThread] = None
+        self.color_cycle = itertools.cycle(SERIES_COLORS)
+
+        self.setup_ui()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.on_timer)
+        self.timer.start(CHART_CONFIG['redraw_interval'] * 1000)
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        controls = QHBoxLayout()
+        self.metric_checks = {}
+        for metric, (title, _) in CHART_METRICS.items():
+            check = QCheckBox(title)
+            check.setChecked(metric in CHART_CONFIG['default_metrics'])
+            check.toggled.connect(self.update_visible_plots)
+            self.metric_checks[metric] = check
+            controls.addWidget(check)
+        controls.addStretch()
+        controls.addWidget(QLabel("Fenêtre :"))
+        self.window_combo = QComboBox()
+        self.window_combo.addItems(list(self.windows))
+        self.window_combo.setCurrentText(CHART_CONFIG['default_window'])
+        self.window_combo.currentTextChanged.connect(self.on_window_changed)
+        controls.addWidget(self.window_combo)
+        layout.addLayout(controls)
+
+        self.plots = {}
+        for metric, (title, _) in CHART_METRICS.items():
+            plot = pg.PlotWidget(axisItems={'bottom': pg.DateAxisItem()})
+            plot.setBackground(self.palette['row_bg'])
+            plot.showGrid(x=True, y=True)
+            plot.setTitle(title, color=self.palette['header'], size="12pt")
+            for axis in ('left', 'bottom'):
+                plot.getAxis(axis).setPen(self.palette['header'])
+                plot.getAxis(axis).setTextPen(self.palette['header'])
+            plot_item = plot.getPlotItem()
+            # Décimation et découpage à la zone visible par pyqtgraph en complément de la pyramide
+            plot_item.setDownsampling(auto=True, mode='peak')
+            plot_item.setClipToView(True)
+            plot_item.addLegend(offset=(-10, 10))
+            plot.setMouseEnabled(x=False, y=True)
+            self.plots[metric] = plot
+            layout.addWidget(plot)
+        self.setLayout(layout)
+        self.update_visible_plots()
+
+    def selected_metrics(self) -> List[str]:
+        return [metric for metric, check in self.metric_checks.items() if check.isChecked()]
+
+    def window_seconds(self) -> int:
+        return self.windows.get(self.window_combo.currentText(), self.windows[CHART_CONFIG['default_window']])
+
+    def set_selection(self, equipments: List[Dict]):
+        """Équipements à tracer (dictionnaires avec 'name' et éventuellement 'id'), limités à max_series courbes"""
+        per_metric = max(1, self.max_series // max(1, len(self.selected_metrics())))
+        selection = [(str(equipment['name']), equipment.get('id')) for equipment in equipments[:per_metric]]
+        if selection == self.selection:
+            return
+        self.selection = selection
+        self.rebuild_curves()
+        self.redraw()
+
+    def update_visible_plots(self):
+        metrics = self.selected_metrics()
+        for metric, plot in self.plots.items():
+            plot.setVisible(metric in metrics)
+        self.rebuild_curves()
+        self.redraw()
+
+    def on_window_changed(self):
+        self.cache.clear()
+        self.redraw()
+
+    def rebuild_curves(self):
+        """Crée les courbes manquantes et supprime celles qui ne sont plus sélectionnées"""
+        wanted = {(metric, name) for metric in self.selected_metrics() for name, _ in self.selection}
+        for key in list(self.curves):
+            if key not in wanted:
+                self.plots[key[0]].getPlotItem().removeItem(self.curves.pop(key))
+                self.cache.pop(key, None)
+                self.history_series.pop(key, None)
+                self.pending_loads.pop(key, None)
+        # Trait fin (cosmétique) dès plusieurs courbes : le tracé des traits épais est bien plus coûteux
+        width = 2 if len(self.selection) == 1 else 1
+        for metric in self.selected_metrics():
+            for name, _ in self.selection:
+                color = self.colors.get(name)
+                if color is None:
+                    color = self.colors[name] = next(self.color_cycle)
+                curve = self.curves.get((metric, name))
+                if curve is None:
+                    curve = self.plots[metric].plot(name=name, connect='finite')
+                    self.curves[(metric, name)] = curve
+                curve.setPen(pg.mkPen(color, width=width))
+
+    def on_timer(self):
+        if self.isVisible():
+            self.redraw()
+
+    def redraw(self, now: Optional[float] = None):
+        """Met à jour les courbes dont la série a changé et fait glisser la fenêtre affichée"""
+        now = time.time() if now is None else now
+        window = self.window_seconds()
+        node_ids = dict(self.selection)
+        for (metric, name), curve in self.curves.items():
+            data = self.series_data(metric, name, node_ids.get(name), window, now)
+            if data is None:
+                continue  # Lecture de l'historique en attente : la courbe garde ses données
+            stamp, x, y = data
+            cached = self.cache.get((metric, name))
+            if cached is not None and cached[0] == stamp:
+                continue
+            self.cache[(metric, name)] = (stamp, x, y)
+            curve.setData(x, y)
+        for metric in self.selected_metrics():
+            self.plots[metric].setXRange(now - window, now, padding=0)
+        self.start_history_load()
+
+    def series_data(self, metric: str, name: str, node_id: Optional[int], window: int,
+                    now: float) -> Optional[Tuple[Tuple, np.ndarray, np.ndarray]]:
+        """
+        (clé de validité, x, y) d'une courbe. La clé ne change que si les données changent :
+        version de la série en mémoire, ou période de relecture de l'historique persistant.
+        Retourne None si la courbe attend une lecture de l'historique persistant.
+        """
+        start = now - window
+        timestamps = self.history.timestamps(name)
+        in_memory = timestamps.size > 0 and timestamps[0] <= start
+        if in_memory or node_id is None or self.metrics_history is None:
+            stamp = ('memory', self.history.version(name), window)
+            cached = self.cache.get((metric, name))
+            if cached is not None and cached[0] == stamp:
+                return cached
+            timestamps, values = self.history.window(name, metric, since=start)
+            x, y = MinMaxPyramid(timestamps, values).envelope(self.max_points)
+            return stamp, x, y
+
+        key = (metric, name)
+        stamp = ('history', int(now // CHART_CONFIG['history_refresh']), window)
+        loaded = self.history_series.get(key)
+        if loaded is not None and loaded[0] == stamp:
+            return loaded
+        if (key, stamp) not in self.loading:
+            dci_name = METRICS_CONFIG[CHART_METRICS[metric][1]]['dci_name']
+            self.pending_loads[key] = (key, stamp, node_id, dci_name, start, now)
+        return None
+
+    def start_history_load(self):
+        """Lance la lecture des courbes en attente, une lecture à la fois"""
+        if self.loader is not None or not self.pending_loads:
+            return
+        requests = list(self.pending_loads.values())
+        self.pending_loads.clear()
+        self.loading = {(request[0], request[1]) for request in requests}
+        self.loader = HistoryLoadThread(self.metrics_history, requests, self.max_points, self)
+        self.loader.series_loaded.connect(self.on_history_loaded)
+        self.loader.finished.connect(self.on_history_load_finished)
+        self.loader.start()
+
+    def on_history_loaded(self, results: Dict):
+        for key, data in results.items():
+            if key in self.curves:
+                self.history_series[key] = data
+        self.loading = set()
+        self.redraw()
+
+    def on_history_load_finished(self):
+        self.loader.deleteLater()
+        self.loader = None
+        self.loading = set()
+        self.start_history_load()
+
+    def stop_loading(self):
+        """Interrompt et attend la lecture de l'historique en cours"""
+        if self.loader is not None:
+            self.loader.requestInterruption()
+            self.loader.wait()
@@ -0,0 +1,136 @@
+"""
+Filtrage indexé du tableau des équipements (recherche par nom et filtre par type)
+"""
+from typing import Dict, Iterable, List, Optional, Set
+
+from PyQt5.QtCore import QSortFilterProxyModel
+
+# Longueur des fragments (n-grammes) indexés pour la recherche de sous-chaînes
+GRAM_SIZE = 3
+
+ALL_TYPES = "Tous"
+
+
+def name_grams(key: str) -> Set[str]:
+    return {key[i:i + GRAM_SIZE] for i in range(len(key) - GRAM_SIZE + 1)}
+
+
+class EquipmentFilterIndex:
+    """
+    Index des lignes du tableau par type et par fragments de nom.
+
+    Les noms sont conservés en minuscules. Une recherche d'au moins GRAM_SIZE caractères
+    ne vérifie que les lignes contenant tous ses trigrammes ; une recherche qui prolonge
+    la précédente (saisie en cours) ne vérifie que les lignes déjà retenues.
+    """
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.types: List[str] = []
+        self.type_rows: Dict[str, Set[int]] = {}
+        self.grams: Dict[str, Set[int]] = {}
+        self.last_query: Optional[str] = None
+        self.last_rows: Optional[Set[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def rebuild(self, names: Iterable[str], types: Iterable[str]):
+        self.keys = [str(name).lower() for name in names]
+        self.types = list(types)
+        self.type_rows = {}
+        self.grams = {}
+        for row, (key, type_name) in enumerate(zip(self.keys, self.types)):
+            self.type_rows.setdefault(type_name, set()).add(row)
+            for gram in name_grams(key):
+                self.grams.setdefault(gram, set()).add(row)
+        self.invalidate_cache()
+
+    def set_row(self, row: int, name: str, type_name: str):
+        """Met à jour l'entrée d'une ligne existante (changement de nom ou de type)"""
+        key = str(name).lower()
+        if key != self.keys[row]:
+            for gram in name_grams(self.keys[row]) - name_grams(key):
+                self.grams[gram].discard(row)
+            for gram in name_grams(key):
+                self.grams.setdefault(gram, set()).add(row)
+            self.keys[row] = key
+        if type_name != self.types[row]:
+            self.type_rows[self.types[row]].discard(row)
+            self.type_rows.setdefault(type_name, set()).add(row)
+            self.types[row] = type_name
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        self.last_query = None
+        self.last_rows = None
+
+    def search(self, text: str) -> Optional[Set[int]]:
+        """Lignes dont le nom contient text (insensible à la casse) ; None si la recherche est vide"""
+        query = text.lower()
+        if not query:
+            return None
+
+        if self.last_query is not None and self.last_query in query:
+            candidates = self.last_rows  # Affinage du résultat précédent
+        elif len(query) >= GRAM_SIZE:
+            postings = sorted((self.grams.get(gram, set()) for gram in name_grams(query)), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            candidates = range(len(self.keys))
+
+        keys = self.keys
+        rows = {row for row in candidates if query in keys[row]}
+        self.last_query, self.last_rows = query, rows
+        return rows
+
+    def rows_of_type(self, type_name: str) -> Optional[Set[int]]:
+        """Lignes d'un type ; None pour ALL_TYPES"""
+        if type_name == ALL_TYPES:
+            return None
+        return self.type_rows.get(type_name, set())
+
+    def matches(self, text: str, type_name: str) -> Optional[Set[int]]:
+        """Lignes satisfaisant les deux filtres ; None si aucun filtre n'est actif"""
+        by_name = self.search(text)
+        by_type = self.rows_of_type(type_name)
+        if by_name is None:
+            return by_type
+        if by_type is None:
+            return by_name
+        return by_name & by_type if len(by_name) <= len(by_type) else by_type & by_name
+
+
+class EquipmentFilterProxyModel(QSortFilterProxyModel):
+    """
+    Filtre le modèle des équipements à partir de son EquipmentFilterIndex : l'ensemble
+    des lignes retenues est calculé une fois par changement de filtre, filterAcceptsRow
+    n'est plus qu'un test d'appartenance.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.search_text = ""
+        self.type_filter = ALL_TYPES
+        self.accepted_rows: Optional[Set[int]] = None
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        # Émis par le modèle avant la réinitialisation ou le dataChanged correspondant
+        model.filter_keys_changed.connect(self.refresh_matches)
+
+    def set_filters(self, search_text: str, type_filter: str):
+        if search_text == self.search_text and type_filter == self.type_filter:
+            return
+        self.search_text = search_text
+        self.type_filter = type_filter
+        self.refresh_matches()
+        # Reconstruction complète de la correspondance des lignes : bien moins coûteuse que les
+        # suppressions dispersées qu'émettrait invalidateFilter sur des dizaines de milliers de lignes
+        self.invalidate()
+
+    def refresh_matches(self):
+        self.accepted_rows = self.sourceModel().filter_index.matches(self.search_text, self.type_filter)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.accepted_rows is None or source_row in self.accepted_rows
@@ -0,0 +1,283 @@
+"""
+Modèle et délégué du tableau des équipements de la page de surveillance
+"""
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor, QPalette
+from PyQt5.QtWidgets import QStyledItemDelegate
+
+from monitoring.services.status_evaluator import StatusEvaluator
+from monitoring.interfaces.admin.equipment_filter import EquipmentFilterIndex
+
+# Colonnes du tableau : (clé des données de la page, titre)
+COLUMNS = [
+    ('name', "Équipement"),
+    ('status', "État"),
+    ('cpu', "CPU (%)"),
+    ('ram', "RAM (%)"),
+    ('disk', "Disque (%)"),
+    ('network', "Réseau (Mbps)"),
+    ('uptime', "Uptime")
+]
+# Colonnes numériques, dans l'ordre des colonnes de la matrice de valeurs
+VALUE_KEYS = ['cpu', 'ram', 'disk', 'network']
+VALUE_COLUMN_OFFSET = 2
+# Colonnes colorées selon le niveau d'alerte de leur métrique
+ALERT_KEYS = ['cpu', 'ram', 'disk']
+
+STATUS_COLUMN = 1
+ONLINE_STATUS = 'En ligne'
+
+# Colonne de tendance, après les colonnes de texte : dessinée par SparklineDelegate, absente des exports
+TREND_COLUMN = len(COLUMNS)
+TREND_TITLE = "Tendance"
+
+# Rôles lus par le délégué : couleur de la colonne État ('online' ou 'offline'),
+# valeur brute d'une métrique et code de type d'équipement (voir StatusEvaluator.type_code)
+COLOR_ROLE = Qt.UserRole + 1
+VALUE_ROLE = Qt.UserRole + 2
+TYPE_CODE_ROLE = Qt.UserRole + 3
+# Clé de la série de l'historique en mémoire (nom de l'équipement), pour la colonne de tendance
+SERIES_ROLE = Qt.UserRole + 4
+
+
+class EquipmentTableModel(QAbstractTableModel):
+    """
+    Modèle du tableau des équipements stocké par colonnes : listes pour les textes,
+    tableaux NumPy pour les métriques (lignes × VALUE_KEYS) et les codes de type.
+    La couleur des métriques est décidée par le délégué au moment du dessin.
+
+    Aucune cellule n'est matérialisée : le texte est formaté à l'affichage des seules
+    lignes visibles, et dataChanged n'est émis que pour les cellules modifiées.
+    Les noms et types sont aussi indexés pour le filtrage (voir EquipmentFilterProxyModel).
+    """
+    filter_keys_changed = pyqtSignal()  # Noms ou types modifiés, émis avant la notification de la vue
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names: List[str] = []
+        self.types: List[str] = []
+        self.filter_index = EquipmentFilterIndex()
+        self.statuses: List[str] = []
+        self.uptimes: List[str] = []
+        self.values = np.empty((0, len(VALUE_KEYS)))
+        self.type_codes = np.empty(0, dtype=np.intp)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS) + 1
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(COLUMNS):
+            return COLUMNS[section][1]
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and section == TREND_COLUMN:
+            return TREND_TITLE
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+
+        if column == TREND_COLUMN:
+            return self.names[row] if role == SERIES_ROLE else None
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self.names[row]
+            if column == STATUS_COLUMN:
+                return self.statuses[row]
+            if column == len(COLUMNS) - 1:
+                return self.uptimes[row]
+            value = self.values[row, column - VALUE_COLUMN_OFFSET]
+            if np.isnan(value):
+                return ""
+            key = COLUMNS[column][0]
+            return f"{value:.1f}" if key == 'network' else f"{value:g}%"
+
+        if role == COLOR_ROLE:
+            if column == STATUS_COLUMN:
+                return 'online' if self.statuses[row] == ONLINE_STATUS else 'offline'
+            return None
+
+        if role == VALUE_ROLE:
+            value_column = column - VALUE_COLUMN_OFFSET
+            if 0 <= value_column < len(VALUE_KEYS):
+                value = self.values[row, value_column]
+                return None if np.isnan(value) else float(value)
+            return None
+
+        if role == TYPE_CODE_ROLE:
+            return int(self.type_codes[row])
+
+        if role == Qt.TextAlignmentRole and column >= VALUE_COLUMN_OFFSET:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def _row_values(self, data_rows: List[Dict]) -> np.ndarray:
+        values = np.full((len(data_rows), len(VALUE_KEYS)), np.nan)
+        for row, data in enumerate(data_rows):
+            for column, key in enumerate(VALUE_KEYS):
+                value = data.get(key)
+                if value is not None:
+                    values[row, column] = value
+        return values
+
+    def set_rows(self, data_rows: List[Dict], type_codes: Optional[np.ndarray] = None):
+        """Remplace tout le contenu (changement de structure : ajout ou suppression de lignes)"""
+        self.beginResetModel()
+        self.names = [str(data['name']) for data in data_rows]
+        self.types = [str(data.get('type', '')) for data in data_rows]
+        self.filter_index.rebuild(self.names, self.types)
+        self.filter_keys_changed.emit()
+        self.statuses = [str(data['status']) for data in data_rows]
+        self.uptimes = [str(data['uptime']) for data in data_rows]
+        self.values = self._row_values(data_rows)
+        if type_codes is None:
+            self.type_codes = np.full(len(data_rows), -1, dtype=np.intp)
+        else:
+            self.type_codes = np.array(type_codes, dtype=np.intp)
+        self.endResetModel()
+
+    def update_rows(self, rows: List[int], data_rows: List[Dict], type_codes: Optional[List[int]] = None):
+        """Met à jour des lignes existantes ; dataChanged n'est émis que sur les cellules modifiées"""
+        if not rows:
+            return
+        new_values = self._row_values(data_rows)
+        for position, (row, data, values) in enumerate(zip(rows, data_rows, new_values)):
+            changed = []
+            if type_codes is not None and type_codes[position] != self.type_codes[row]:
+                # Les seuils, donc la couleur des métriques, dépendent du type
+                self.type_codes[row] = type_codes[position]
+                changed.extend(range(VALUE_COLUMN_OFFSET, VALUE_COLUMN_OFFSET + len(VALUE_KEYS)))
+            name, status, uptime = str(data['name']), str(data['status']), str(data['uptime'])
+            type_name = str(data.get('type', ''))
+            if name != self.names[row] or type_name != self.types[row]:
+                # Index mis à jour avant le dataChanged, qui déclenche le filtrage de la ligne
+                self.filter_index.set_row(row, name, type_name)
+                self.types[row] = type_name
+                self.filter_keys_changed.emit()
+            if name != self.names[row]:
+                self.names[row] = name
+                changed.append(0)
+            if status != self.statuses[row]:
+                self.statuses[row] = status
+                changed.append(STATUS_COLUMN)
+            old = self.values[row]
+            differs = ~((old == values) | (np.isnan(old) & np.isnan(values)))
+            if differs.any():
+                self.values[row] = values
+                changed.extend((np.flatnonzero(differs) + VALUE_COLUMN_OFFSET).tolist())
+            if uptime != self.uptimes[row]:
+                self.uptimes[row] = uptime
+                changed.append(len(COLUMNS) - 1)
+            if changed:
+                # Ligne modifiée : un échantillon a pu s'ajouter à l'historique ; le délégué
+                # ne redessine la tendance que si la version de la série a changé
+                changed.append(TREND_COLUMN)
+                self.dataChanged.emit(self.index(row, min(changed)), self.index(row, max(changed)), [Qt.DisplayRole])
+
+    def row_texts(self, row: int) -> List[str]:
+        """Textes affichés d'une ligne, dans l'ordre des colonnes"""
+        return [self.data(self.index(row, column)) for column in range(len(COLUMNS))]
+
+    def snapshot(self, rows: Sequence[int]) -> 'EquipmentTableSnapshot':
+        return EquipmentTableSnapshot(self, rows)
+
+
+class EquipmentTableSnapshot:
+    """
+    Colonnes du modèle figées pour un export dans un autre thread. Les chaînes sont
+    partagées avec le modèle (seules les listes sont copiées), les valeurs numériques des
+    lignes exportées sont copiées ; aucun texte n'est formaté avant l'écriture des blocs.
+    """
+
+    def __init__(self, model: EquipmentTableModel, rows: Sequence[int]):
+        self.rows = np.asarray(rows, dtype=np.intp)
+        self.names = list(model.names)
+        self.statuses = list(model.statuses)
+        self.uptimes = list(model.uptimes)
+        self.values = model.values[self.rows]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def columns(self) -> List[str]:
+        return [title for _, title in COLUMNS]
+
+    def chunks(self, chunk_size: int) -> Iterator[Dict[str, Sequence]]:
+        """Blocs de chunk_size lignes : titre de colonne -> valeurs (nombres pour les métriques)"""
+        for start in range(0, len(self.rows), chunk_size):
+            rows = self.rows[start:start + chunk_size]
+            values = self.values[start:start + chunk_size]
+            chunk = {
+                COLUMNS[0][1]: [self.names[row] for row in rows],
+                COLUMNS[STATUS_COLUMN][1]: [self.statuses[row] for row in rows],
+                COLUMNS[-1][1]: [self.uptimes[row] for row in rows]
+            }
+            for position in range(len(VALUE_KEYS)):
+                chunk[COLUMNS[VALUE_COLUMN_OFFSET + position][1]] = values[:, position].tolist()
+            yield chunk
+
+
+class ThresholdColorDelegate(QStyledItemDelegate):
+    """
+    Colore les cellules au moment du dessin : la colonne État d'après COLOR_ROLE, les
+    métriques de ALERT_KEYS en comparant leur valeur aux seuils critiques courants de
+    l'évaluateur. Un changement de seuil ne demande donc qu'un nouveau dessin de la
+    zone visible, sans toucher au modèle.
+    """
+
+    BACKGROUNDS = {
+        'online': QColor(144, 238, 144),   # Vert clair
+        'offline': QColor(255, 182, 193),  # Rouge clair
+        'critical': QColor(255, 0, 0)      # Rouge
+    }
+    FOREGROUNDS = {
+        'critical': QColor(255, 255, 255)  # Texte blanc
+    }
+
+    def __init__(self, status_evaluator: StatusEvaluator, metrics: List[str], parent=None):
+        """metrics : métrique de l'évaluateur correspondant à chaque clé de VALUE_KEYS"""
+        super().__init__(parent)
+        self.status_evaluator = status_evaluator
+        # Colonne du tableau -> colonne de l'évaluateur, pour les seules métriques colorées
+        self.alert_columns = {
+            VALUE_COLUMN_OFFSET + position: status_evaluator.metric_index[metric]
+            for position, (key, metric) in enumerate(zip(VALUE_KEYS, metrics))
+            if key in ALERT_KEYS and metric in status_evaluator.metric_index
+        }
+
+    def cell_color(self, index) -> Optional[str]:
+        color = index.data(COLOR_ROLE)
+        if color is not None:
+            return color
+        metric_column = self.alert_columns.get(index.column())
+        if metric_column is None:
+            return None
+        value = index.data(VALUE_ROLE)
+        if value is None:
+            return None
+        evaluator = self.status_evaluator
+        type_code = index.data(TYPE_CODE_ROLE)
+        if type_code is None or type_code < 0:
+            type_code = evaluator.unknown_type
+        # Même règle que le statut affiché : une valeur égale au seuil est critique
+        if evaluator.is_critical(value, type_code, metric_column):
+            return 'critical'
+        return None
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        color = self.cell_color(index)
+        if color is None:
+            return
+        option.backgroundBrush = QBrush(self.BACKGROUNDS[color])
+        foreground = self.FOREGROUNDS.get(color)
+        if foreground is not None:
+            option.palette.setColor(QPalette.Text, foreground)
+            option.palette.setColor(QPalette.HighlightedText, foreground)
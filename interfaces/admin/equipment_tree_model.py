@@ -0,0 +1,196 @@
+"""
+Modèle arborescent des équipements (site > groupe > type) avec agrégats de statut
+"""
+from typing import Dict, Optional
+
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt5.QtGui import QBrush, QColor
+
+from monitoring.config.netxms_config import HIERARCHY_CONFIG
+from monitoring.services.equipment_hierarchy import (
+    EquipmentHierarchy, HierarchyEntry, HierarchyGroup, HierarchyObserver
+)
+from monitoring.services.status_evaluator import STATUS_LABELS
+
+TREE_COLUMNS = ["Équipement", "État", "Critiques", "CPU moyen (%)", "Équipements"]
+STATUS_COLUMN = 1
+
+
+class EquipmentTreeModel(QAbstractItemModel, HierarchyObserver):
+    """
+    Expose une EquipmentHierarchy à un QTreeView. Chaque index porte le groupe qui le
+    contient : un index est un sous-groupe de ce conteneur, ou un équipement s'il s'agit
+    d'un groupe du dernier niveau.
+
+    Les équipements d'un type ne sont chargés dans la vue qu'à l'ouverture du groupe, par
+    lots de fetch_batch (canFetchMore / fetchMore) : un groupe replié ne coûte qu'une
+    ligne. Les changements de l'arborescence sont relayés par les notifications de
+    HierarchyObserver, si bien qu'une mise à jour d'équipement ne signale que ses ancêtres.
+    """
+
+    def __init__(self, status_colors: Dict[int, str], parent=None):
+        """status_colors : couleur de fond de la colonne État par code STATUS_*"""
+        QAbstractItemModel.__init__(self, parent)
+        self.hierarchy = EquipmentHierarchy(self)
+        self.status_brushes = {status: QBrush(QColor(color)) for status, color in status_colors.items()}
+        self.fetch_batch = HIERARCHY_CONFIG['fetch_batch']
+        # Équipements chargés dans la vue, par groupe du dernier niveau déjà ouvert
+        self.fetched: Dict[HierarchyGroup, int] = {}
+        self.pending_change = False
+
+    # --- Navigation ---
+
+    def item(self, index: QModelIndex):
+        """Groupe ou HierarchyEntry désigné par index (racine si index est invalide)"""
+        if not index.isValid():
+            return self.hierarchy.root
+        container = index.internalPointer()
+        if container.is_leaf_level:
+            return self.hierarchy.entries[container.leaves[index.row()]]
+        return container.child_list[index.row()]
+
+    def group_index(self, group: HierarchyGroup, column: int = 0) -> QModelIndex:
+        if group.parent is None:
+            return QModelIndex()
+        return self.createIndex(group.parent.child_list.index(group), column, group.parent)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        return self.createIndex(row, column, self.item(parent))
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.group_index(index.internalPointer())
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        item = self.item(parent)
+        if isinstance(item, HierarchyEntry):
+            return 0
+        if item.is_leaf_level:
+            return self.fetched.get(item, 0)
+        return len(item.child_list)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(TREE_COLUMNS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        item = self.item(parent)
+        if isinstance(item, HierarchyEntry):
+            return False
+        return bool(item.leaves) if item.is_leaf_level else bool(item.child_list)
+
+    def canFetchMore(self, parent):
+        item = self.item(parent)
+        return isinstance(item, HierarchyGroup) and item.is_leaf_level and self.fetched.get(item, 0) < len(item.leaves)
+
+    def fetchMore(self, parent):
+        group = self.item(parent)
+        loaded = self.fetched.get(group, 0)
+        count = min(self.fetch_batch, len(group.leaves) - loaded)
+        if count <= 0:
+            self.fetched[group] = loaded
+            return
+        self.beginInsertRows(parent, loaded, loaded + count - 1)
+        self.fetched[group] = loaded + count
+        self.endInsertRows()
+
+    # --- Données ---
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(TREE_COLUMNS):
+            return TREE_COLUMNS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.item(index)
+        column = index.column()
+        if isinstance(item, HierarchyEntry):
+            status = item.status
+        else:
+            status = item.stats.worst_status
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return item.name if isinstance(item, HierarchyEntry) else item.label
+            if column == STATUS_COLUMN:
+                return STATUS_LABELS[status]
+            if isinstance(item, HierarchyEntry):
+                if column == 3 and item.cpu is not None:
+                    return f"{item.cpu:g}"
+                return None
+            if column == 2:
+                return str(item.stats.critical)
+            if column == 3:
+                mean_cpu = item.stats.mean_cpu
+                return None if mean_cpu is None else f"{mean_cpu:.1f}"
+            if column == 4:
+                return str(item.stats.count)
+            return None
+
+        if role == Qt.BackgroundRole and column == STATUS_COLUMN:
+            return self.status_brushes.get(status)
+        if role == Qt.TextAlignmentRole and column >= 2:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def update_equipment(self, key, name: str, path, status: int, cpu: Optional[float]):
+        self.hierarchy.update(key, name, tuple(path), status, cpu)
+
+    def remove_equipment(self, key):
+        self.hierarchy.remove(key)
+
+    def sync(self, keys):
+        self.hierarchy.sync(keys)
+
+    # --- Notifications de EquipmentHierarchy ---
+
+    def group_inserting(self, parent: HierarchyGroup, row: int):
+        self.beginInsertRows(self.group_index(parent), row, row)
+
+    def group_inserted(self, group: HierarchyGroup):
+        self.endInsertRows()
+
+    def group_removing(self, group: HierarchyGroup, row: int):
+        self.beginRemoveRows(self.group_index(group.parent), row, row)
+        self.fetched.pop(group, None)
+
+    def group_removed(self, parent: HierarchyGroup):
+        self.endRemoveRows()
+
+    def leaf_inserting(self, group: HierarchyGroup, row: int):
+        # Visible seulement si le groupe a été ouvert et entièrement chargé ; sinon fetchMore s'en chargera
+        self.pending_change = self.fetched.get(group) == row
+        if self.pending_change:
+            self.beginInsertRows(self.group_index(group), row, row)
+
+    def leaf_inserted(self, group: HierarchyGroup, row: int):
+        if self.pending_change:
+            self.fetched[group] += 1
+            self.endInsertRows()
+
+    def leaf_removing(self, group: HierarchyGroup, row: int):
+        self.pending_change = row < self.fetched.get(group, 0)
+        if self.pending_change:
+            self.beginRemoveRows(self.group_index(group), row, row)
+
+    def leaf_removed(self, group: HierarchyGroup, row: int):
+        if self.pending_change:
+            self.fetched[group] -= 1
+            self.endRemoveRows()
+
+    def values_changed(self, groups, entry: HierarchyEntry):
+        last = len(TREE_COLUMNS) - 1
+        for group in groups:
+            if group.parent is not None:
+                self.dataChanged.emit(self.group_index(group), self.group_index(group, last))
+        group = entry.group
+        row = group.leaf_rows.get(entry.key)
+        if row is not None and row < self.fetched.get(group, 0):
+            self.dataChanged.emit(self.createIndex(row, 0, group), self.createIndex(row, last, group))
+
@@ -0,0 +1,112 @@
+"""
+Mini-courbes de tendance du tableau des équipements, dessinées depuis l'historique en mémoire
+"""
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+import pyqtgraph as pg
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QPainter, QPen, QPixmap
+from PyQt5.QtWidgets import QStyledItemDelegate
+
+from monitoring.config.netxms_config import SPARKLINE_CONFIG
+from monitoring.utils.minmax_pyramid import MinMaxPyramid
+from monitoring.utils.timeseries_store import TimeSeriesStore
+
+# Échelle fixe des métriques en pourcentage ; les autres sont mises à l'échelle de leurs valeurs
+FIXED_RANGES = {
+    'cpu': (0.0, 100.0),
+    'ram': (0.0, 100.0),
+    'disk': (0.0, 100.0)
+}
+
+MARGIN = 3
+
+
+class SparklineDelegate(QStyledItemDelegate):
+    """
+    Dessine la tendance d'une métrique sur la fenêtre choisie, se terminant au dernier
+    échantillon de l'équipement. La courbe est rendue une fois dans une image mise en
+    cache par série, et n'est redessinée que lorsque la version de la série dans le
+    TimeSeriesStore change : le défilement ne fait que recopier des images.
+
+    Le modèle fournit la clé de la série (nom de l'équipement) par SERIES_ROLE.
+    """
+
+    def __init__(self, history: TimeSeriesStore, series_role: int, color: str, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.series_role = series_role
+        self.color = QColor(color)
+        self.metric = SPARKLINE_CONFIG['default_metric']
+        self.window = SPARKLINE_CONFIG['windows'][SPARKLINE_CONFIG['default_window']]
+        self.cache_size = SPARKLINE_CONFIG['cache_size']
+        self.cache: OrderedDict = OrderedDict()  # nom -> (clé de validité, image)
+
+    def set_series(self, metric: str, window: int):
+        """Change la métrique ou la durée affichée ; toutes les images sont à refaire"""
+        if (metric, window) != (self.metric, self.window):
+            self.metric, self.window = metric, window
+            self.cache.clear()
+
+    def paint(self, painter, option, index):
+        # Fond, sélection et alternance des lignes dessinés par le style
+        super().paint(painter, option, index)
+        name = index.data(self.series_role)
+        if name is None:
+            return
+        pixmap = self.pixmap(name, option.rect.width(), option.rect.height(), painter.device().devicePixelRatioF())
+        if pixmap is not None:
+            painter.drawPixmap(option.rect.topLeft(), pixmap)
+
+    def pixmap(self, name: str, width: int, height: int, ratio: float = 1.0) -> Optional[QPixmap]:
+        stamp = (self.history.version(name), width, height, ratio)
+        cached = self.cache.get(name)
+        if cached is not None and cached[0] == stamp:
+            self.cache.move_to_end(name)
+            return cached[1]
+
+        pixmap = self.render(name, width, height, ratio)
+        self.cache[name] = (stamp, pixmap)
+        self.cache.move_to_end(name)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return pixmap
+
+    def points(self, name: str, width: int, height: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Coordonnées (pixels) de la courbe, NaN pour les échantillons manquants"""
+        last = self.history.timestamps(name, last=1)
+        if last.size == 0:
+            return None
+        end = float(last[0])
+        timestamps, values = self.history.window(name, self.metric, since=end - self.window)
+        if timestamps.size < 2:
+            return None
+        # Au plus deux points par pixel : enveloppe min/max au-delà
+        x, y = MinMaxPyramid(timestamps, values).envelope(2 * width)
+        low, high = FIXED_RANGES.get(self.metric, (None, None))
+        if low is None:
+            finite = y[np.isfinite(y)]
+            if finite.size == 0:
+                return None
+            low, high = float(finite.min()), float(finite.max())
+        span = high - low or 1.0
+        px = MARGIN + (x - (end - self.window)) * ((width - 2 * MARGIN) / self.window)
+        py = (height - MARGIN) - (np.clip(y, low, high) - low) * ((height - 2 * MARGIN) / span)
+        return px, py
+
+    def render(self, name: str, width: int, height: int, ratio: float) -> Optional[QPixmap]:
+        points = self.points(name, width, height)
+        if points is None:
+            return None
+        pixmap = QPixmap(max(1, int(width * ratio)), max(1, int(height * ratio)))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(self.color, 1))
+        # Segments interrompus aux échantillons manquants
+        painter.drawPath(pg.arrayToQPath(points[0], points[1], connect='finite'))
+        painter.end()
+        return pixmap
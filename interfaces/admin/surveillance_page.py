@@ -1,15 +1,41 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView, QFrame, QSplitter, QProgressBar, QGroupBox, QComboBox, QLineEdit, QPushButton, QSlider, QFileDialog
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal
-from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableView, QHeaderView, QFrame, QSplitter, QProgressBar, QGroupBox, QComboBox, QLineEdit, QPushButton, QSlider, QFileDialog, QDialog, QFormLayout, QDateTimeEdit, QMessageBox, QTabWidget, QTreeView
+from PyQt5.QtCore import Qt, QTimer, QThread, QDateTime, pyqtSignal
+from PyQt5.QtGui import QFont
 import qtawesome as qta
 import requests
 import json
+import time
 from datetime import datetime
-import pyqtgraph as pg
 import numpy as np
-import pandas as pd
-from monitoring.services.netxms_service import NetXMSService
-from monitoring.config.netxms_config import REFRESH_INTERVALS
+from monitoring.services.netxms_service import NetXMSService, parse_timestamp
+from monitoring.services.status_evaluator import (
+    StatusEvaluator, STATUS_LABELS, STATUS_UNKNOWN, STATUS_NORMAL, STATUS_WARNING, STATUS_CRITICAL
+)
+from monitoring.services.equipment_hierarchy import resolve_node_location, type_label
+from monitoring.config.netxms_config import METRICS_CONFIG, REFRESH_INTERVALS, TIMESERIES_CONFIG, POLLING_CONFIG, SPARKLINE_CONFIG, EXPORT_CONFIG
+from monitoring.utils.timeseries_store import TimeSeriesStore
+from monitoring.utils.data_export import EXPORT_FORMATS, HISTORY_COLUMNS, available_formats, export_chunks, history_chunks
+from monitoring.interfaces.admin.equipment_table_model import (
+    EquipmentTableModel, ThresholdColorDelegate, COLUMNS, TREND_COLUMN, SERIES_ROLE
+)
+from monitoring.interfaces.admin.equipment_filter import EquipmentFilterProxyModel
+from monitoring.interfaces.admin.equipment_tree_model import EquipmentTreeModel
+from monitoring.interfaces.admin.equipment_charts import EquipmentChartPanel, CHART_METRICS
+from monitoring.interfaces.admin.sparkline_delegate import SparklineDelegate
+
+# Métriques conservées dans l'historique en mémoire
+HISTORY_METRICS = ['cpu', 'ram', 'disk', 'network']
+
+# Délai de regroupement des mouvements des curseurs de seuils (millisecondes)
+THRESHOLD_DEBOUNCE_MS = 200
+
+# Correspondance entre les colonnes du tableau et les métriques de METRICS_CONFIG
+TABLE_METRICS = {
+    'cpu': 'cpu_utilization',
+    'ram': 'memory_utilization',
+    'disk': 'disk_utilization',
+    'network': 'network_traffic'
+}
 
 PALETTE = {
     'main_bg': '#F5F6FA',
@@ -29,15 +55,130 @@ PALETTE = {
     'font': 'Roboto, Segoe UI, Arial, sans-serif',
 }
 
+class CollectionThread(QThread):
+    """Thread de collecte NetXMS : test de connexion puis collecte des nœuds arrivés à échéance"""
+    collection_completed = pyqtSignal(object)  # {'connected': bool, 'deltas': [EquipmentDelta, ...]}
+    collection_error = pyqtSignal(str)  # Erreur de collecte
+    
+    def __init__(self, netxms_service, parent=None):
+        super().__init__(parent)
+        self.netxms_service = netxms_service
+        self.deltas = []
+        # Les différences sont publiées pendant la collecte, donc dans ce thread
+        self.netxms_service.subscribe_deltas(self.deltas.append, replay=False)
+        
+    def run(self):
+        self.deltas.clear()
+        try:
+            connected = self.netxms_service.test_connection()
+            if connected:
+                # Seuls les nœuds arrivés à échéance sont interrogés
+                self.netxms_service.collect_due_equipment()
+            self.collection_completed.emit({'connected': connected, 'deltas': list(self.deltas)})
+        except Exception as e:
+            self.collection_error.emit(str(e))
+
+class ExportThread(QThread):
+    """Thread d'export : les blocs sont produits et écrits un à un, hors du thread de l'interface"""
+    export_progress = pyqtSignal(int, int)  # Lignes écrites, total (0 si inconnu)
+    export_completed = pyqtSignal(str, int)  # Fichier, lignes écrites
+    export_error = pyqtSignal(str)
+
+    def __init__(self, chunks, path, columns, count=None, parent=None):
+        super().__init__(parent)
+        self.chunks = chunks
+        self.path = path
+        self.columns = columns
+        self.count = count  # Calcul du total, exécuté dans ce thread
+
+    def run(self):
+        try:
+            total = self.count() if self.count is not None else None
+            self.export_progress.emit(0, total or 0)
+            written = export_chunks(
+                self.chunks, self.path, self.columns, total=total,
+                progress=lambda done, total: self.export_progress.emit(done, total or 0),
+                cancelled=self.isInterruptionRequested
+            )
+            if not self.isInterruptionRequested():
+                self.export_completed.emit(self.path, written)
+        except Exception as e:
+            self.export_error.emit(str(e))
+
+class HistoryExportDialog(QDialog):
+    """Choix de la plage de l'export de l'historique persistant"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Exporter l'historique des métriques")
+        self.setModal(True)
+        layout = QVBoxLayout()
+        form_layout = QFormLayout()
+        now = QDateTime.currentDateTime()
+        self.start_edit = QDateTimeEdit(now.addSecs(-EXPORT_CONFIG['history_hours'] * 3600))
+        self.end_edit = QDateTimeEdit(now)
+        for edit in (self.start_edit, self.end_edit):
+            edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+            edit.setCalendarPopup(True)
+        form_layout.addRow("Début:", self.start_edit)
+        form_layout.addRow("Fin:", self.end_edit)
+        layout.addLayout(form_layout)
+        button_layout = QHBoxLayout()
+        cancel_btn = QPushButton("Annuler")
+        cancel_btn.clicked.connect(self.reject)
+        button_layout.addWidget(cancel_btn)
+        export_btn = QPushButton("Exporter")
+        export_btn.clicked.connect(self.accept)
+        button_layout.addWidget(export_btn)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def get_range(self):
+        """(début, fin) en secondes epoch"""
+        return self.start_edit.dateTime().toSecsSinceEpoch(), self.end_edit.dateTime().toSecsSinceEpoch()
+
 class SurveillancePage(QWidget):
     def __init__(self):
         super().__init__()
         self.netxms_service = NetXMSService()
         self.equipments_data = []
-        self.historical_data = {}
-        self.cpu_threshold = 90
-        self.ram_threshold = 85
-        self.disk_threshold = 90
+        self.history = TimeSeriesStore(
+            HISTORY_METRICS,
+            capacity=TIMESERIES_CONFIG['capacity'],
+            max_series=TIMESERIES_CONFIG['max_series']
+        )
+        # Curseurs initialisés sur les seuils critiques de METRICS_CONFIG
+        self.cpu_threshold = METRICS_CONFIG['cpu_utilization']['threshold_critical']
+        self.ram_threshold = METRICS_CONFIG['memory_utilization']['threshold_critical']
+        self.disk_threshold = METRICS_CONFIG['disk_utilization']['threshold_critical']
+        # Seuils modifiés par l'utilisateur ; tant qu'un curseur n'a pas bougé, sa métrique
+        # garde les seuils de la configuration (y compris ceux propres à chaque type)
+        self.threshold_overrides = {}
+        # Évaluation vectorisée des seuils, alimentée par les curseurs ; les statuts calculés
+        # par la collecte utilisent les mêmes seuils
+        self.status_evaluator = StatusEvaluator(TABLE_METRICS.values())
+        # L'évaluateur du service est lu par le thread de collecte : les seuils ne lui sont
+        # transmis qu'entre deux collectes
+        self.service_thresholds_pending = False
+        self.threshold_timer = QTimer(self)
+        self.threshold_timer.setSingleShot(True)
+        self.threshold_timer.setInterval(THRESHOLD_DEBOUNCE_MS)
+        self.threshold_timer.timeout.connect(self.apply_threshold_change)
+        # Matrice des valeurs affichées (lignes × TABLE_METRICS) et lignes à redessiner
+        self.metric_values = np.empty((0, len(TABLE_METRICS)))
+        self.type_codes = np.empty(0, dtype=np.intp)
+        self.pending_rows = set()
+        self.pending_samples = []  # Entrées collectées depuis le dernier enregistrement de l'historique
+        self.rows_reset = True
+        # Les collectes NetXMS ne transmettent que les équipements ajoutés, supprimés ou modifiés
+        self.equipment_rows = {}
+        self.simulated_data = False
+        # Collecte hors du thread de l'interface, une seule à la fois
+        self.collection_thread = CollectionThread(self.netxms_service, self)
+        self.collection_thread.collection_completed.connect(self.on_collection_completed)
+        self.collection_thread.collection_error.connect(self.on_collection_error)
+        self.export_thread = None
+        if QApplication.instance() is not None:
+            QApplication.instance().aboutToQuit.connect(self.stop_collection)
         self.setup_ui()
         self.setup_timer()
 
@@ -72,9 +213,7 @@ class SurveillancePage(QWidget):
         self.search_edit.textChanged.connect(self.apply_filters)
         controls_layout.addWidget(QLabel("Recherche:"))
         controls_layout.addWidget(self.search_edit)
-        export_btn = QPushButton(qta.icon('fa5s.file-csv', color=PALETTE['btn_text']), "Exporter CSV")
-        export_btn.clicked.connect(self.export_csv)
-        export_btn.setStyleSheet(f'''
+        button_style = f'''
             QPushButton {{
                 background: {PALETTE['btn_gradient']};
                 color: {PALETTE['btn_text']};
@@ -87,14 +226,41 @@ class SurveillancePage(QWidget):
                 background: {PALETTE['accent']};
                 color: {PALETTE['header']};
             }}
-        ''')
+        '''
+        export_btn = QPushButton(qta.icon('fa5s.file-csv', color=PALETTE['btn_text']), "Exporter")
+        export_btn.clicked.connect(self.export_csv)
+        export_btn.setStyleSheet(button_style)
         controls_layout.addWidget(export_btn)
+        history_export_btn = QPushButton(qta.icon('fa5s.history', color=PALETTE['btn_text']), "Exporter l'historique")
+        history_export_btn.clicked.connect(self.export_history)
+        history_export_btn.setStyleSheet(button_style)
+        controls_layout.addWidget(history_export_btn)
+        # Avancement de l'export en cours
+        self.export_progress_bar = QProgressBar()
+        self.export_progress_bar.setMaximumWidth(160)
+        self.export_progress_bar.setVisible(False)
+        controls_layout.addWidget(self.export_progress_bar)
+        # Colonne de tendance : métrique et durée
+        controls_layout.addWidget(QLabel("Tendance:"))
+        self.trend_metric_combo = QComboBox()
+        for metric, (title, _) in CHART_METRICS.items():
+            self.trend_metric_combo.addItem(title, metric)
+        self.trend_metric_combo.setCurrentIndex(list(CHART_METRICS).index(SPARKLINE_CONFIG['default_metric']))
+        self.trend_metric_combo.setStyleSheet(f"background: {PALETTE['row_alt']}; border-radius: 6px; padding: 4px 8px;")
+        self.trend_metric_combo.currentIndexChanged.connect(self.update_trend_column)
+        controls_layout.addWidget(self.trend_metric_combo)
+        self.trend_window_combo = QComboBox()
+        self.trend_window_combo.addItems(list(SPARKLINE_CONFIG['windows']))
+        self.trend_window_combo.setCurrentText(SPARKLINE_CONFIG['default_window'])
+        self.trend_window_combo.setStyleSheet(f"background: {PALETTE['row_alt']}; border-radius: 6px; padding: 4px 8px;")
+        self.trend_window_combo.currentTextChanged.connect(self.update_trend_column)
+        controls_layout.addWidget(self.trend_window_combo)
         controls_layout.addStretch()
         layout.addLayout(controls_layout)
         # Seuils d'alerte
         thresholds_layout = QHBoxLayout()
         thresholds_layout.addWidget(QLabel("Seuils d'alerte:"))
-        thresholds_layout.addWidget(QLabel("CPU >"))
+        thresholds_layout.addWidget(QLabel("CPU ≥"))
         self.cpu_slider = QSlider(Qt.Orientation.Horizontal)
         self.cpu_slider.setRange(50, 100)
         self.cpu_slider.setValue(self.cpu_threshold)
@@ -102,7 +268,7 @@ class SurveillancePage(QWidget):
         thresholds_layout.addWidget(self.cpu_slider)
         self.cpu_threshold_label = QLabel(f"{self.cpu_threshold}%")
         thresholds_layout.addWidget(self.cpu_threshold_label)
-        thresholds_layout.addWidget(QLabel("RAM >"))
+        thresholds_layout.addWidget(QLabel("RAM ≥"))
         self.ram_slider = QSlider(Qt.Orientation.Horizontal)
         self.ram_slider.setRange(50, 100)
         self.ram_slider.setValue(self.ram_threshold)
@@ -110,7 +276,7 @@ class SurveillancePage(QWidget):
         thresholds_layout.addWidget(self.ram_slider)
         self.ram_threshold_label = QLabel(f"{self.ram_threshold}%")
         thresholds_layout.addWidget(self.ram_threshold_label)
-        thresholds_layout.addWidget(QLabel("Disque >"))
+        thresholds_layout.addWidget(QLabel("Disque ≥"))
         self.disk_slider = QSlider(Qt.Orientation.Horizontal)
         self.disk_slider.setRange(50, 100)
         self.disk_slider.setValue(self.disk_threshold)
@@ -149,21 +315,35 @@ class SurveillancePage(QWidget):
             }}
         """)
         layout = QVBoxLayout()
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels([
-            "Équipement", "État", "CPU (%)", "RAM (%)", "Disque (%)", 
-            "Réseau (Mbps)", "Uptime"
-        ])
+        # Modèle par colonnes : seules les lignes visibles sont formatées et dessinées
+        self.table = QTableView()
+        self.table_model = EquipmentTableModel(self)
+        # Filtres de recherche et de type appliqués par un modèle intermédiaire indexé
+        self.table_proxy = EquipmentFilterProxyModel(self)
+        self.table_proxy.setSourceModel(self.table_model)
+        self.table.setModel(self.table_proxy)
+        self.table.setItemDelegate(ThresholdColorDelegate(self.status_evaluator, list(TABLE_METRICS.values()), self.table))
+        # Tendances dessinées depuis l'historique en mémoire, images mises en cache par équipement
+        self.sparkline_delegate = SparklineDelegate(self.history, SERIES_ROLE, PALETTE['header'], self.table)
+        self.table.setItemDelegateForColumn(TREND_COLUMN, self.sparkline_delegate)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setSelectionMode(QTableView.ExtendedSelection)
+        self.table.selectionModel().selectionChanged.connect(self.update_chart_selection)
         header = self.table.horizontalHeader()
         if header:
             header.setStyleSheet(f"background: {PALETTE['table_header']}; color: {PALETTE['table_header_text']}; font-weight: bold; font-size: 14px; border-radius: 8px;")
             header.setSectionResizeMode(0, QHeaderView.Stretch)
+            # Largeurs ajustées au contenu au chargement des lignes seulement (voir update_table) :
+            # en mode ResizeToContents, chaque dataChanged déclencherait un nouveau calcul
             for i in range(1, 7):
-                header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
+                header.setSectionResizeMode(i, QHeaderView.Interactive)
+            header.setResizeContentsPrecision(200)
+            header.setSectionResizeMode(TREND_COLUMN, QHeaderView.Fixed)
+            header.resizeSection(TREND_COLUMN, SPARKLINE_CONFIG['width'])
         self.table.setAlternatingRowColors(True)
         self.table.setStyleSheet(f"""
-            QTableWidget {{
+            QTableView {{
                 gridline-color: {PALETTE['row_alt']};
                 background-color: {PALETTE['row_bg']};
                 alternate-background-color: {PALETTE['row_alt']};
@@ -178,7 +358,23 @@ class SurveillancePage(QWidget):
                 font-size: 14px;
             }}
         """)
-        layout.addWidget(self.table)
+        # Vue arborescente site > groupe > type, équipements chargés à l'ouverture d'un groupe
+        self.tree_model = EquipmentTreeModel({
+            STATUS_UNKNOWN: PALETTE['row_alt'],
+            STATUS_NORMAL: PALETTE['status_normal'],
+            STATUS_WARNING: PALETTE['status_attention'],
+            STATUS_CRITICAL: PALETTE['status_critique']
+        }, self)
+        self.tree = QTreeView()
+        self.tree.setModel(self.tree_model)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setAlternatingRowColors(True)
+        self.tree.header().setStretchLastSection(False)
+        self.tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        tabs = QTabWidget()
+        tabs.addTab(self.table, "Liste")
+        tabs.addTab(self.tree, "Arborescence")
+        layout.addWidget(tabs)
         group.setLayout(layout)
         return group
 
@@ -202,40 +398,41 @@ class SurveillancePage(QWidget):
             }}
         """)
         layout = QVBoxLayout()
-        # Graphique pyqtgraph stylé
-        self.cpu_graph = pg.PlotWidget()
-        self.cpu_graph.setBackground(PALETTE['row_bg'])
-        self.cpu_graph.showGrid(x=True, y=True)
-        self.cpu_graph.setTitle("CPU (%)", color=PALETTE['header'], size="12pt")
-        self.cpu_graph.getAxis('left').setPen(PALETTE['header'])
-        self.cpu_graph.getAxis('bottom').setPen(PALETTE['header'])
-        self.cpu_graph.getAxis('left').setTextPen(PALETTE['header'])
-        self.cpu_graph.getAxis('bottom').setTextPen(PALETTE['header'])
-        layout.addWidget(self.cpu_graph)
-        self.ram_graph = pg.PlotWidget()
-        self.ram_graph.setBackground(PALETTE['row_bg'])
-        self.ram_graph.showGrid(x=True, y=True)
-        self.ram_graph.setTitle("RAM (%)", color=PALETTE['header'], size="12pt")
-        self.ram_graph.getAxis('left').setPen(PALETTE['header'])
-        self.ram_graph.getAxis('bottom').setPen(PALETTE['header'])
-        self.ram_graph.getAxis('left').setTextPen(PALETTE['header'])
-        self.ram_graph.getAxis('bottom').setTextPen(PALETTE['header'])
-        layout.addWidget(self.ram_graph)
+        # Graphiques multi-séries : équipements sélectionnés dans le tableau, métriques et fenêtre au choix
+        self.chart_panel = EquipmentChartPanel(self.history, self.netxms_service.metrics_history, PALETTE)
+        layout.addWidget(self.chart_panel)
         group.setLayout(layout)
         return group
 
     def setup_timer(self):
-        """Configure le timer pour rafraîchir les données toutes les 30 secondes"""
+        """Configure le timer de rafraîchissement (cadence de la planification adaptative si elle est active)"""
+        interval = POLLING_CONFIG['tick'] if POLLING_CONFIG.get('enabled', True) else REFRESH_INTERVALS['real_time']
         self.timer = QTimer()
         self.timer.timeout.connect(self.refresh_data)
-        self.timer.start(30000)  # 30 secondes
+        self.timer.start(interval * 1000)
         self.refresh_data()  # Première récupération
         
     def refresh_data(self):
-        """Récupère les données depuis l'API NetXMS et met à jour l'affichage"""
+        """Lance une collecte en arrière-plan ; ignoré si la précédente n'est pas terminée"""
+        if self.collection_thread.isRunning():
+            return
+        self.apply_service_thresholds()
+        self.collection_thread.start()
+        
+    def stop_collection(self):
+        """Arrête le rafraîchissement et attend la fin de la collecte en cours (et d'un export interrompu)"""
+        self.timer.stop()
+        self.collection_thread.wait()
+        self.chart_panel.stop_loading()
+        if self.export_thread is not None:
+            self.export_thread.requestInterruption()
+            self.export_thread.wait()
+        
+    def on_collection_completed(self, result):
+        """Applique une collecte terminée et met à jour l'affichage (thread de l'interface)"""
+        self.apply_service_thresholds()
         try:
-            # Test de connexion
-            if not self.netxms_service.test_connection():
+            if not result['connected']:
                 self.connection_status.setText("État de la connexion: DÉCONNECTÉ")
                 self.connection_status.setStyleSheet(f"color: {PALETTE['status_critique']}; font-weight: bold;")
                 # Utiliser les données simulées en cas de déconnexion
@@ -243,9 +440,10 @@ class SurveillancePage(QWidget):
             else:
                 self.connection_status.setText("État de la connexion: CONNECTÉ")
                 self.connection_status.setStyleSheet(f"color: {PALETTE['status_normal']}; font-weight: bold;")
-                # Récupérer les vraies données
-                self.get_real_netxms_data()
+                # Reporter les vraies données
+                self.get_real_netxms_data(result['deltas'])
                 
+            self.record_history()
             self.update_table()
             self.update_charts()
         except Exception as e:
@@ -253,40 +451,84 @@ class SurveillancePage(QWidget):
             self.connection_status.setText("État de la connexion: ERREUR")
             self.connection_status.setStyleSheet(f"color: {PALETTE['status_critique']}; font-weight: bold;")
             
-    def get_real_netxms_data(self):
-        """Récupère les vraies données depuis l'API NetXMS"""
-        try:
-            equipment_data = self.netxms_service.get_all_equipment_data()
+    def on_collection_error(self, message):
+        """Erreur dans le thread de collecte : bascule sur les données simulées"""
+        print(f"Erreur lors de la récupération des données NetXMS: {message}")
+        self.connection_status.setText("État de la connexion: ERREUR")
+        self.connection_status.setStyleSheet(f"color: {PALETTE['status_critique']}; font-weight: bold;")
+        self.simulate_netxms_data()
+        self.record_history()
+        self.update_table()
+        self.update_charts()
+            
+    def get_real_netxms_data(self, deltas):
+        """Reporte dans equipments_data les différences produites par la collecte"""
+        if self.simulated_data:
+            # Remplacement des données simulées par l'état complet connu du service ; la collecte
+            # est terminée, l'état du service ne peut pas changer pendant la lecture
+            self.simulated_data = False
             self.equipments_data = []
+            self.equipment_rows = {}
+            self.rows_reset = True
+            self.pending_samples = []
+            self.apply_equipment_delta(self.netxms_service.snapshot_differ.snapshot_delta())
+            return
+        for delta in deltas:
+            self.apply_equipment_delta(delta)
             
-            for equipment in equipment_data:
-                # Extraction des métriques
-                metrics = equipment.get('metrics', {})
-                cpu = metrics.get('cpu_utilization', {}).get('value', 0)
-                ram = metrics.get('memory_utilization', {}).get('value', 0)
-                disk = metrics.get('disk_utilization', {}).get('value', 0)
-                network = metrics.get('network_traffic', {}).get('value', 0)
-                
-                processed_data = {
-                    'name': equipment['name'],
-                    'status': equipment.get('status', 'Inconnu'),
-                    'cpu': cpu,
-                    'ram': ram,
-                    'disk': disk,
-                    'network': network,
-                    'uptime': equipment.get('uptime', 'N/A'),
-                    'type': equipment.get('type', 'Autres')
-                }
-                self.equipments_data.append(processed_data)
-                
-        except Exception as e:
-            print(f"Erreur lors de la récupération des données NetXMS: {e}")
-            self.simulate_netxms_data()
+    def process_equipment(self, equipment):
+        """Convertit une entrée de NetXMSService en ligne du tableau"""
+        # Extraction des métriques
+        metrics = equipment.get('metrics', {})
+        cpu = metrics.get('cpu_utilization', {}).get('value', 0)
+        ram = metrics.get('memory_utilization', {}).get('value', 0)
+        disk = metrics.get('disk_utilization', {}).get('value', 0)
+        network = metrics.get('network_traffic', {}).get('value', 0)
+        
+        return {
+            'id': equipment['id'],
+            'name': equipment['name'],
+            'status': equipment.get('status', 'Inconnu'),
+            'cpu': cpu,
+            'ram': ram,
+            'disk': disk,
+            'network': network,
+            'uptime': equipment.get('uptime', 'N/A'),
+            'type': equipment.get('type', 'Autres'),
+            'equipment_type': equipment.get('equipment_type'),
+            'site': equipment.get('site'),
+            'group': equipment.get('group'),
+            'sample_time': parse_timestamp(equipment.get('timestamp'))
+        }
+        
+    def apply_equipment_delta(self, delta):
+        """Reporte les équipements ajoutés, supprimés ou modifiés depuis la collecte précédente"""
+        if delta.removed:
+            removed = set(delta.removed)
+            removed_names = {data['name'] for data in self.equipments_data if data.get('id') in removed}
+            self.equipments_data = [data for data in self.equipments_data if data.get('id') not in removed]
+            # Séries en mémoire des équipements disparus libérées pour les nouveaux venus
+            remaining_names = {data['name'] for data in self.equipments_data}
+            for name in removed_names - remaining_names:
+                self.history.remove(name)
+            self.equipment_rows = {data['id']: row for row, data in enumerate(self.equipments_data)}
+            self.rows_reset = True
+        for equipment in delta.changed:
+            row = self.equipment_rows.get(equipment['id'])
+            if row is None:
+                continue
+            self.equipments_data[row] = self.process_equipment(equipment)
+            self.pending_rows.add(row)
+        for equipment in delta.added:
+            self.equipment_rows[equipment['id']] = len(self.equipments_data)
+            self.pending_rows.add(len(self.equipments_data))
+            self.equipments_data.append(self.process_equipment(equipment))
+        # Les valeurs dans la bande morte ne redessinent pas le tableau mais restent dans l'historique
+        self.pending_samples.extend(delta.sampled)
             
     def simulate_netxms_data(self):
         """Simule des données d'équipements pour les tests"""
         import random
-        from datetime import datetime, timedelta
         
         equipment_names = [
             "Serveur-WEB-01", "Serveur-DB-02", "PC-Admin-03", "Switch-Core-01",
@@ -294,6 +536,10 @@ class SurveillancePage(QWidget):
         ]
         
         self.equipments_data = []
+        self.equipment_rows = {}
+        self.simulated_data = True
+        self.rows_reset = True
+        self.pending_samples = []
         current_time = datetime.now()
         
         for i, name in enumerate(equipment_names):
@@ -323,154 +569,216 @@ class SurveillancePage(QWidget):
             }
             self.equipments_data.append(data)
             
-        # Stocker les données historiques pour les graphiques
-        for data in self.equipments_data:
-            name = data['name']
-            if name not in self.historical_data:
-                self.historical_data[name] = {'cpu': [], 'ram': [], 'timestamps': []}
-            
-            self.historical_data[name]['cpu'].append(data['cpu'])
-            self.historical_data[name]['ram'].append(data['ram'])
-            self.historical_data[name]['timestamps'].append(current_time)
-            
-            # Garder seulement les 20 dernières valeurs
-            if len(self.historical_data[name]['cpu']) > 20:
-                self.historical_data[name]['cpu'].pop(0)
-                self.historical_data[name]['ram'].pop(0)
-                self.historical_data[name]['timestamps'].pop(0)
+    def record_history(self):
+        """Ajoute à l'historique en mémoire chaque échantillon collecté depuis le dernier affichage"""
+        now = time.time()
+        names = {data['name'] for data in self.equipments_data}
+        if self.rows_reset:
+            # Inventaire rechargé : les séries des équipements absents sont libérées
+            for name in self.history.keys():
+                if name not in names:
+                    self.history.remove(name)
+        if self.simulated_data:
+            samples = self.equipments_data
+        else:
+            # Tous les nœuds interrogés, y compris ceux restés dans la bande morte (absents de pending_rows)
+            samples = [self.process_equipment(equipment) for equipment in self.pending_samples]
+        self.pending_samples = []
+        for data in samples:
+            if data['name'] not in names:
+                continue  # Supprimé par une collecte ultérieure du même cycle
+            sample_time = data.get('sample_time', now)
+            last = self.history.timestamps(data['name'], last=1)
+            if last.size and last[0] >= sample_time:
+                continue  # Équipement non réinterrogé depuis le dernier échantillon
+            self.history.append(data['name'], sample_time, {metric: data.get(metric) for metric in HISTORY_METRICS})
                 
     def update_table(self):
-        """Met à jour le tableau avec les données actuelles"""
-        self.table.setRowCount(len(self.equipments_data))
-        
-        for row, data in enumerate(self.equipments_data):
-            # Nom de l'équipement
-            name_item = QTableWidgetItem(data['name'])
-            self.table.setItem(row, 0, name_item)
-            
-            # État avec couleur
-            status_item = QTableWidgetItem(data['status'])
-            if data['status'] == 'En ligne':
-                status_item.setBackground(QColor(144, 238, 144))  # Vert clair
-            else:
-                status_item.setBackground(QColor(255, 182, 193))  # Rouge clair
-            self.table.setItem(row, 1, status_item)
-            
-            # CPU avec alerte visuelle
-            cpu_item = QTableWidgetItem(f"{data['cpu']}%")
-            if data['cpu'] > self.cpu_threshold:
-                cpu_item.setBackground(QColor(255, 0, 0))  # Rouge
-                cpu_item.setForeground(QColor(255, 255, 255))  # Texte blanc
-            self.table.setItem(row, 2, cpu_item)
-            
-            # RAM avec alerte visuelle
-            ram_item = QTableWidgetItem(f"{data['ram']}%")
-            if data['ram'] > self.ram_threshold:
-                ram_item.setBackground(QColor(255, 0, 0))  # Rouge
-                ram_item.setForeground(QColor(255, 255, 255))  # Texte blanc
-            self.table.setItem(row, 3, ram_item)
-            
-            # Disque avec alerte visuelle
-            disk_item = QTableWidgetItem(f"{data['disk']}%")
-            if data['disk'] > self.disk_threshold:
-                disk_item.setBackground(QColor(255, 0, 0))  # Rouge
-                disk_item.setForeground(QColor(255, 255, 255))  # Texte blanc
-            self.table.setItem(row, 4, disk_item)
-            
-            # Réseau
-            network_item = QTableWidgetItem(f"{data['network']:.1f}")
-            self.table.setItem(row, 5, network_item)
-            
-            # Uptime
-            uptime_item = QTableWidgetItem(data['uptime'])
-            self.table.setItem(row, 6, uptime_item)
-            
+        """Met à jour le tableau (seules les lignes modifiées ou dont le niveau d'alerte change sont redessinées)"""
+        reset = self.rows_reset or self.table_model.rowCount() != len(self.equipments_data)
+        if reset:
+            self.metric_values = self.status_evaluator.metrics_matrix([self.table_values(data) for data in self.equipments_data])
+            self.type_codes = np.array(
+                [self.status_evaluator.type_code(data.get('equipment_type')) for data in self.equipments_data],
+                dtype=np.intp
+            )
+        elif self.pending_rows:
+            changed = sorted(self.pending_rows)
+            self.metric_values[changed] = self.status_evaluator.metrics_matrix(
+                [self.table_values(self.equipments_data[row]) for row in changed]
+            )
+            self.type_codes[changed] = [
+                self.status_evaluator.type_code(self.equipments_data[row].get('equipment_type')) for row in changed
+            ]
+        result = self.status_evaluator.evaluate(self.metric_values, self.type_codes)
+        rows = range(len(self.equipments_data)) if reset else sorted(self.pending_rows | set(result.changed_rows.tolist()))
+        if not self.simulated_data:
+            # Statut affiché = évaluation avec les seuils courants, cohérent avec les couleurs
+            for row in rows:
+                label = STATUS_LABELS[int(result.status[row])]
+                if self.equipments_data[row]['status'] != label:
+                    self.equipments_data[row]['status'] = label
+                    self.pending_rows.add(row)
+        self.update_tree(rows, result.status, reset)
+
+        if reset:
+            self.table_model.set_rows(self.equipments_data, self.type_codes)
+            # La colonne de tendance garde sa largeur fixe
+            for column in range(len(COLUMNS)):
+                self.table.resizeColumnToContents(column)
+        else:
+            # Le modèle ne signale que les cellules dont le texte a changé
+            rows = sorted(self.pending_rows)
+            self.table_model.update_rows(rows, [self.equipments_data[row] for row in rows], self.type_codes[rows].tolist())
+        self.pending_rows = set()
+        self.rows_reset = False
+
+    def update_tree(self, rows, status, reset):
+        """Reporte dans l'arborescence les seules lignes modifiées ; les agrégats des groupes suivent"""
+        if reset:
+            self.tree_model.sync([self.equipment_key(data) for data in self.equipments_data])
+        for row in rows:
+            data = self.equipments_data[row]
+            site, group = resolve_node_location(data)
+            path = (site, group, type_label(data.get('equipment_type')))
+            self.tree_model.update_equipment(self.equipment_key(data), data['name'], path, int(status[row]), data.get('cpu'))
+
+    def equipment_key(self, data):
+        return data.get('id', data['name'])
+
+    def table_values(self, data):
+        """Valeurs d'une ligne indexées par les métriques de l'évaluateur"""
+        return {metric: data.get(key) for key, metric in TABLE_METRICS.items()}
+
     def update_charts(self):
         """Met à jour les graphiques pyqtgraph"""
-        if not self.equipments_data:
-            return
-            
-        # Prendre le premier équipement pour l'exemple
-        first_equipment = self.equipments_data[0]['name']
-        if first_equipment in self.historical_data:
-            data = self.historical_data[first_equipment]
-            
-            # Mise à jour du graphique CPU
-            if data['cpu']:
-                self.cpu_graph.setData(data['cpu'])
-            
-            # Mise à jour du graphique RAM
-            if data['ram']:
-                self.ram_graph.setData(data['ram'])
+        self.update_chart_selection()
+        self.chart_panel.redraw()
+        
+    def update_chart_selection(self):
+        """Trace les équipements sélectionnés dans le tableau, ou le premier à défaut"""
+        rows = sorted({self.table_proxy.mapToSource(index).row() for index in self.table.selectionModel().selectedRows()})
+        if not rows and self.equipments_data:
+            rows = [0]
+        self.chart_panel.set_selection([self.equipments_data[row] for row in rows if row < len(self.equipments_data)])
                 
     def apply_filters(self):
         """Applique les filtres de recherche et de type"""
-        search_text = self.search_edit.text().lower()
-        filter_type = self.filter_combo.currentText()
-        
-        for row in range(self.table.rowCount()):
-            name_item = self.table.item(row, 0)
-            if name_item:
-                name = name_item.text().lower()
-                equipment_data = next((d for d in self.equipments_data if d['name'].lower() == name), None)
-                
-                # Filtre par type
-                type_match = filter_type == "Tous" or (equipment_data and equipment_data['type'] == filter_type)
-                
-                # Filtre par recherche
-                search_match = search_text == "" or search_text in name
-                
-                # Afficher/masquer la ligne
-                self.table.setRowHidden(row, not (type_match and search_match))
+        self.table_proxy.set_filters(self.search_edit.text(), self.filter_combo.currentText())
                 
+    def apply_thresholds(self, evaluator=None):
+        """Reporte les seuils des curseurs déplacés comme seuils critiques de l'évaluation vectorisée"""
+        evaluator = evaluator or self.status_evaluator
+        for metric, critical in self.threshold_overrides.items():
+            evaluator.set_thresholds(metric, critical=critical)
+
+    def on_threshold_changed(self, metric: str, value: int):
+        """Recolore immédiatement les cellules visibles ; la réévaluation des statuts est différée"""
+        self.threshold_overrides[metric] = value
+        self.apply_thresholds()
+        self.table.viewport().update()
+        self.threshold_timer.start()
+
+    def apply_threshold_change(self):
+        """Fin du mouvement d'un curseur : statuts du tableau et de la collecte réévalués avec les nouveaux seuils"""
+        self.service_thresholds_pending = True
+        if not self.collection_thread.isRunning():
+            self.apply_service_thresholds()
+        self.update_table()
+
+    def apply_service_thresholds(self):
+        """Transmet à l'évaluateur de la collecte les seuils en attente (aucune collecte en cours)"""
+        if self.service_thresholds_pending:
+            self.apply_thresholds(self.netxms_service.status_evaluator)
+            self.service_thresholds_pending = False
+
     def update_cpu_threshold(self, value):
         """Met à jour le seuil CPU"""
         self.cpu_threshold = value
         self.cpu_threshold_label.setText(f"{value}%")
-        self.update_table()
+        self.on_threshold_changed('cpu_utilization', value)
         
     def update_ram_threshold(self, value):
         """Met à jour le seuil RAM"""
         self.ram_threshold = value
         self.ram_threshold_label.setText(f"{value}%")
-        self.update_table()
+        self.on_threshold_changed('memory_utilization', value)
         
     def update_disk_threshold(self, value):
         """Met à jour le seuil disque"""
         self.disk_threshold = value
         self.disk_threshold_label.setText(f"{value}%")
-        self.update_table()
+        self.on_threshold_changed('disk_utilization', value)
         
+    def update_trend_column(self):
+        """Change la métrique ou la durée de la colonne de tendance"""
+        window = SPARKLINE_CONFIG['windows'][self.trend_window_combo.currentText()]
+        self.sparkline_delegate.set_series(self.trend_metric_combo.currentData(), window)
+        self.table.viewport().update()
+
+    def export_file_name(self, title, default_name):
+        """Fichier de destination ; le format suit l'extension (Parquet si pyarrow est installé)"""
+        filters = ";;".join(EXPORT_FORMATS[fmt] for fmt in available_formats())
+        filename, _ = QFileDialog.getSaveFileName(self, title, default_name, filters)
+        return filename
+
     def export_csv(self):
-        """Exporte les données du tableau en CSV"""
-        try:
-            filename, _ = QFileDialog.getSaveFileName(
-                self, "Exporter en CSV", "surveillance_data.csv", "CSV Files (*.csv)"
-            )
-            
-            if filename:
-                # Préparer les données pour l'export
-                export_data = []
-                for row in range(self.table.rowCount()):
-                    if not self.table.isRowHidden(row):
-                        row_data = []
-                        for col in range(self.table.columnCount()):
-                            item = self.table.item(row, col)
-                            row_data.append(item.text() if item else "")
-                        export_data.append(row_data)
-                
-                # Créer le DataFrame et exporter
-                df = pd.DataFrame(export_data)
-                df.columns = [
-                    "Équipement", "État", "CPU (%)", "RAM (%)", "Disque (%)", 
-                    "Réseau (Mbps)", "Uptime"
-                ]
-                df.to_csv(filename, index=False, encoding='utf-8')
-                
-                # Message de confirmation
-                from PyQt5.QtWidgets import QMessageBox
-                QMessageBox.information(self, "Export réussi", f"Données exportées vers {filename}")
-                
-        except Exception as e:
-            from PyQt5.QtWidgets import QMessageBox
-            QMessageBox.critical(self, "Erreur d'export", f"Erreur lors de l'export: {str(e)}") 
\ No newline at end of file
+        """Exporte les lignes du tableau (filtres appliqués) en CSV ou Parquet, en arrière-plan"""
+        if self.export_thread is not None and self.export_thread.isRunning():
+            QMessageBox.information(self, "Export en cours", "Un export est déjà en cours.")
+            return
+        filename = self.export_file_name("Exporter le tableau", "surveillance_data.csv")
+        if not filename:
+            return
+        # Lignes retenues par les filtres, figées au lancement de l'export
+        rows = [
+            self.table_proxy.mapToSource(self.table_proxy.index(row, 0)).row()
+            for row in range(self.table_proxy.rowCount())
+        ]
+        snapshot = self.table_model.snapshot(rows)
+        self.start_export(snapshot.chunks(EXPORT_CONFIG['chunk_size']), filename, snapshot.columns(), count=lambda: len(snapshot))
+
+    def export_history(self):
+        """Exporte l'historique persistant de tous les équipements sur une plage choisie"""
+        history = self.netxms_service.metrics_history
+        if history is None:
+            QMessageBox.warning(self, "Historique indisponible", "L'historique des métriques n'est pas activé.")
+            return
+        if self.export_thread is not None and self.export_thread.isRunning():
+            QMessageBox.information(self, "Export en cours", "Un export est déjà en cours.")
+            return
+        dialog = HistoryExportDialog(self)
+        if dialog.exec_() != QDialog.DialogCode.Accepted:
+            return
+        start, end = dialog.get_range()
+        filename = self.export_file_name("Exporter l'historique", "historique_metriques.csv")
+        if not filename:
+            return
+        tier = history.finest_tier(start)
+        chunks = history_chunks(history.iter_range(start, end, tier, EXPORT_CONFIG['chunk_size']))
+        self.start_export(chunks, filename, HISTORY_COLUMNS, count=lambda: history.count_range(start, end, tier))
+
+    def start_export(self, chunks, filename, columns, count=None):
+        self.export_thread = ExportThread(chunks, filename, columns, count, self)
+        self.export_thread.export_progress.connect(self.on_export_progress)
+        self.export_thread.export_completed.connect(self.on_export_completed)
+        self.export_thread.export_error.connect(self.on_export_error)
+        self.export_progress_bar.setValue(0)
+        self.export_progress_bar.setVisible(True)
+        self.export_thread.start()
+
+    def on_export_progress(self, written, total):
+        # Total inconnu : barre d'activité sans pourcentage
+        self.export_progress_bar.setMaximum(total)
+        self.export_progress_bar.setValue(min(written, total))
+
+    def on_export_completed(self, filename, written):
+        self.export_progress_bar.setVisible(False)
+        if not written:
+            QMessageBox.information(self, "Export", f"Aucune donnée à exporter : {filename} ne contient que les en-têtes")
+            return
+        QMessageBox.information(self, "Export réussi", f"{written} lignes exportées vers {filename}")
+
+    def on_export_error(self, message):
+        self.export_progress_bar.setVisible(False)
+        QMessageBox.critical(self, "Erreur d'export", f"Erreur lors de l'export: {message}")
@@ -23,6 +23,19 @@ PALETTE = {
     'font': 'Roboto, Segoe UI, Arial, sans-serif',
 }
 
+# Libellés affichés pour les types d'événements et niveaux de risque de WazuhService
+EVENT_TYPE_LABELS = {
+    'login': "Connexion",
+    'program_execution': "Programme",
+    'file_access': "Fichier",
+    'network_access': "Réseau"
+}
+RISK_LABELS = {
+    'normal': "Normal",
+    'suspicious': "Suspect",
+    'critical': "Critique"
+}
+
 class UserActivityPage(QWidget):
     def __init__(self):
         super().__init__()
@@ -154,7 +167,7 @@ class UserActivityPage(QWidget):
             else:
                 self.connection_status.setText("Connexion Wazuh: CONNECTÉ")
                 self.connection_status.setStyleSheet(f"color: {PALETTE['status_normal']}; font-weight: bold; margin-left: 12px;")
-                self.events = self.wazuh_service.get_user_activity()
+                self.events = self.activity_rows(self.wazuh_service.get_all_user_activity())
             self.update_table()
         except Exception as e:
             self.connection_status.setText("Connexion Wazuh: ERREUR")
@@ -162,6 +175,21 @@ class UserActivityPage(QWidget):
             self.events = self.simulate_events()
             self.update_table()
 
+    def activity_rows(self, analyzed_events):
+        """Événements analysés (scores mis en cache par le service) au format du tableau"""
+        return [
+            {
+                'timestamp': event['datetime'],
+                'user': event['user'],
+                'type': EVENT_TYPE_LABELS.get(event['event_type'], event['event_type']),
+                'message': event['message'],
+                'agent': event['agent'],
+                'risk': RISK_LABELS.get(event['risk_level'], event['risk_level']),
+                'score': round(event['suspicious_score'], 2)
+            }
+            for event in analyzed_events
+        ]
+
     def simulate_events(self):
         import random
         from datetime import datetime, timedelta
@@ -0,0 +1,237 @@
+"""
+Arborescence des équipements (site > groupe > type) et agrégats de statut maintenus de façon incrémentale
+"""
+import logging
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from monitoring.config.netxms_config import EQUIPMENT_TYPES, HIERARCHY_CONFIG
+from monitoring.services.status_evaluator import STATUS_CRITICAL, STATUS_LABELS, STATUS_UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+# Niveaux de l'arborescence, de la racine vers les équipements
+HIERARCHY_LEVELS = ['site', 'group', 'type']
+
+
+def first_field(node: Dict, fields: List[str]) -> Optional[str]:
+    for field in fields:
+        value = node.get(field)
+        if value not in (None, ''):
+            return str(value)
+    return None
+
+
+def resolve_node_location(node: Dict) -> Tuple[str, str]:
+    """(site, groupe) d'un nœud NetXMS d'après les champs de HIERARCHY_CONFIG"""
+    site = first_field(node, HIERARCHY_CONFIG['site_fields']) or HIERARCHY_CONFIG['default_site']
+    group = first_field(node, HIERARCHY_CONFIG['group_fields']) or HIERARCHY_CONFIG['default_group']
+    return site, group
+
+
+def type_label(equipment_type: Optional[str]) -> str:
+    """Libellé du niveau type (clé de EQUIPMENT_TYPES ou None)"""
+    if equipment_type in EQUIPMENT_TYPES:
+        return EQUIPMENT_TYPES[equipment_type]['name']
+    return HIERARCHY_CONFIG['default_type']
+
+
+class GroupStats:
+    """Agrégats d'un groupe : effectif par statut et somme des CPU, mis à jour par ajout ou retrait"""
+
+    __slots__ = ('count', 'status_counts', 'cpu_sum', 'cpu_count')
+
+    def __init__(self):
+        self.count = 0
+        self.status_counts: Dict[int, int] = {code: 0 for code in STATUS_LABELS}
+        self.cpu_sum = 0.0
+        self.cpu_count = 0
+
+    def add(self, status: int, cpu: Optional[float], sign: int = 1):
+        self.count += sign
+        self.status_counts[status] += sign
+        if cpu is not None:
+            self.cpu_sum += sign * cpu
+            self.cpu_count += sign
+
+    @property
+    def worst_status(self) -> int:
+        """Statut le plus grave présent dans le groupe"""
+        return max((code for code, count in self.status_counts.items() if count > 0), default=STATUS_UNKNOWN)
+
+    @property
+    def critical(self) -> int:
+        return self.status_counts[STATUS_CRITICAL]
+
+    @property
+    def mean_cpu(self) -> Optional[float]:
+        return self.cpu_sum / self.cpu_count if self.cpu_count else None
+
+
+class HierarchyGroup:
+    """Nœud intermédiaire de l'arborescence ; au dernier niveau, ses enfants sont des équipements"""
+
+    def __init__(self, label: str, level: int, parent: Optional['HierarchyGroup']):
+        self.label = label
+        self.level = level            # -1 pour la racine, puis indice dans HIERARCHY_LEVELS
+        self.parent = parent
+        self.children: Dict[str, 'HierarchyGroup'] = {}
+        self.child_list: List['HierarchyGroup'] = []   # Ordre d'affichage des sous-groupes
+        self.leaves: List[Hashable] = []               # Équipements (dernier niveau seulement)
+        self.leaf_rows: Dict[Hashable, int] = {}       # Position de chaque équipement dans leaves
+        self.stats = GroupStats()
+
+    @property
+    def is_leaf_level(self) -> bool:
+        return self.level == len(HIERARCHY_LEVELS) - 1
+
+    def ancestors(self) -> List['HierarchyGroup']:
+        """Le groupe et ses parents jusqu'à la racine incluse"""
+        groups = []
+        group = self
+        while group is not None:
+            groups.append(group)
+            group = group.parent
+        return groups
+
+
+class HierarchyEntry:
+    """Dernier état connu d'un équipement placé dans l'arborescence"""
+
+    __slots__ = ('key', 'name', 'path', 'status', 'cpu', 'group')
+
+    def __init__(self, key: Hashable, name: str, path: Tuple[str, ...], status: int, cpu: Optional[float]):
+        self.key = key
+        self.name = name
+        self.path = path
+        self.status = status
+        self.cpu = cpu
+        self.group: Optional[HierarchyGroup] = None
+
+
+class HierarchyObserver:
+    """
+    Notifications de EquipmentHierarchy, appelées avant et après chaque changement de
+    structure (comme beginInsertRows / endInsertRows pour un modèle Qt) et après chaque
+    changement d'agrégats. Les méthodes par défaut ne font rien.
+    """
+
+    def group_inserting(self, parent: HierarchyGroup, row: int):
+        pass
+
+    def group_inserted(self, group: HierarchyGroup):
+        pass
+
+    def group_removing(self, group: HierarchyGroup, row: int):
+        pass
+
+    def group_removed(self, parent: HierarchyGroup):
+        pass
+
+    def leaf_inserting(self, group: HierarchyGroup, row: int):
+        pass
+
+    def leaf_inserted(self, group: HierarchyGroup, row: int):
+        pass
+
+    def leaf_removing(self, group: HierarchyGroup, row: int):
+        pass
+
+    def leaf_removed(self, group: HierarchyGroup, row: int):
+        pass
+
+    def values_changed(self, groups: List[HierarchyGroup], entry: HierarchyEntry):
+        pass
+
+
+class EquipmentHierarchy:
+    """
+    Arborescence site > groupe > type des équipements, avec à chaque niveau le pire statut,
+    le nombre de nœuds critiques et le CPU moyen.
+
+    Les agrégats sont des sommes : la mise à jour d'un équipement retire son ancienne
+    contribution et ajoute la nouvelle sur ses seuls ancêtres, en O(profondeur), sans
+    parcourir le reste du parc. Les groupes vides sont supprimés.
+    """
+
+    def __init__(self, observer: Optional[HierarchyObserver] = None):
+        self.observer = observer or HierarchyObserver()
+        self.root = HierarchyGroup("", -1, None)
+        self.entries: Dict[Hashable, HierarchyEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def update(self, key: Hashable, name: str, path: Tuple[str, ...], status: int, cpu: Optional[float]):
+        """Ajoute ou met à jour un équipement ; path : (site, groupe, type)"""
+        entry = self.entries.get(key)
+        if entry is not None and entry.path == path:
+            if entry.status == status and entry.cpu == cpu and entry.name == name:
+                return
+            groups = entry.group.ancestors()
+            for group in groups:
+                group.stats.add(entry.status, entry.cpu, -1)
+                group.stats.add(status, cpu)
+            entry.name, entry.status, entry.cpu = name, status, cpu
+            self.observer.values_changed(groups, entry)
+            return
+
+        if entry is not None:
+            self.remove(key)
+        entry = HierarchyEntry(key, name, path, status, cpu)
+        group = self.root
+        for label in path:
+            group = self.child_group(group, label)
+        row = len(group.leaves)
+        self.observer.leaf_inserting(group, row)
+        group.leaves.append(key)
+        group.leaf_rows[key] = row
+        entry.group = group
+        self.entries[key] = entry
+        self.observer.leaf_inserted(group, row)
+        groups = group.ancestors()
+        for ancestor in groups:
+            ancestor.stats.add(status, cpu)
+        self.observer.values_changed(groups, entry)
+
+    def child_group(self, parent: HierarchyGroup, label: str) -> HierarchyGroup:
+        group = parent.children.get(label)
+        if group is None:
+            row = len(parent.child_list)
+            self.observer.group_inserting(parent, row)
+            group = HierarchyGroup(label, parent.level + 1, parent)
+            parent.children[label] = group
+            parent.child_list.append(group)
+            self.observer.group_inserted(group)
+        return group
+
+    def remove(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        group = entry.group
+        row = group.leaf_rows.pop(key)
+        self.observer.leaf_removing(group, row)
+        del group.leaves[row]
+        for position in range(row, len(group.leaves)):
+            group.leaf_rows[group.leaves[position]] = position
+        self.observer.leaf_removed(group, row)
+        groups = group.ancestors()
+        for ancestor in groups:
+            ancestor.stats.add(entry.status, entry.cpu, -1)
+        # Suppression des groupes devenus vides, du type vers le site
+        while group is not self.root and group.stats.count == 0:
+            parent = group.parent
+            row = parent.child_list.index(group)
+            self.observer.group_removing(group, row)
+            del parent.child_list[row]
+            del parent.children[group.label]
+            self.observer.group_removed(parent)
+            groups.remove(group)
+            group = parent
+        self.observer.values_changed(groups, entry)
+
+    def sync(self, keys: List[Hashable]):
+        """Retire les équipements absents de keys (inventaire complet)"""
+        present = set(keys)
+        for key in [key for key in self.entries if key not in present]:
+            self.remove(key)
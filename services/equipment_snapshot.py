@@ -0,0 +1,118 @@
+"""
+Différences entre deux collectes d'équipements NetXMS (ajouts, suppressions, changements)
+"""
+import logging
+import time
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from monitoring.config.netxms_config import SNAPSHOT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Champs comparés tels quels (toute modification est signalée)
+IDENTITY_FIELDS = ('name', 'status', 'equipment_type', 'site', 'group')
+
+
+class EquipmentDelta:
+    """Changements d'une collecte par rapport à la précédente"""
+
+    def __init__(self, sequence: int, added: List[Dict], removed: List[Hashable], changed: List[Dict],
+                 changed_fields: Dict[Hashable, List[str]], sampled: Optional[List[Dict]] = None):
+        self.sequence = sequence
+        self.timestamp = time.time()
+        self.added = added                    # Entrées complètes des nouveaux nœuds
+        self.removed = removed                # Identifiants des nœuds disparus
+        self.changed = changed                # Entrées complètes des nœuds modifiés
+        self.changed_fields = changed_fields  # Champs modifiés par nœud ('status', 'cpu_utilization', ...)
+        self.sampled = sampled or []          # Toutes les entrées collectées, modifiées ou non
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+
+class SnapshotDiffer:
+    """
+    Conserve, pour chaque nœud, les dernières valeurs signalées et compare chaque
+    nouvelle collecte à ces références.
+
+    Une valeur numérique n'est signalée que si elle s'écarte de la référence d'au moins
+    la bande morte de SNAPSHOT_CONFIG ; la référence n'étant mise à jour qu'au moment du
+    signalement, une dérive lente finit toujours par être signalée. Le travail par
+    collecte est proportionnel au nombre de nœuds rafraîchis, pas à la taille du parc.
+    """
+
+    def __init__(self, dead_band: Optional[Dict[str, float]] = None, default_dead_band: Optional[float] = None):
+        self.dead_band = dict(SNAPSHOT_CONFIG['dead_band'], **(dead_band or {}))
+        self.default_dead_band = SNAPSHOT_CONFIG['default_dead_band'] if default_dead_band is None else default_dead_band
+        self.reference: Dict[Hashable, Dict] = {}   # Valeurs signalées en dernier, par nœud
+        self.entries: Dict[Hashable, Dict] = {}     # Dernière entrée collectée, par nœud
+        self.sequence = 0
+
+    def extract(self, equipment: Dict) -> Dict:
+        """Champs comparés d'une entrée au format de NetXMSService.collect_node_data"""
+        fields = {field: equipment.get(field) for field in IDENTITY_FIELDS}
+        fields['uptime_hours'] = equipment.get('uptime_hours')
+        for metric, data in equipment.get('metrics', {}).items():
+            fields[metric] = data.get('value') if isinstance(data, dict) else data
+        return fields
+
+    def changed_fields(self, reference: Dict, current: Dict) -> List[str]:
+        """Champs modifiés ; une métrique disparue du nœud est signalée comme passée à None"""
+        changed = [field for field, previous in reference.items() if field not in current and previous is not None]
+        for field, value in current.items():
+            previous = reference.get(field)
+            if value == previous:
+                continue
+            if field in IDENTITY_FIELDS or not isinstance(value, (int, float)) or not isinstance(previous, (int, float)):
+                changed.append(field)
+            elif abs(value - previous) >= self.dead_band.get(field, self.default_dead_band):
+                changed.append(field)
+        return changed
+
+    def diff(self, equipment_data: List[Dict], inventory_ids: Optional[Iterable[Hashable]] = None) -> EquipmentDelta:
+        """
+        Compare les entrées collectées aux références.
+        inventory_ids : inventaire complet lorsque seule une partie des nœuds a été collectée
+        (collecte adaptative) ; sinon equipment_data est l'inventaire complet.
+        """
+        added, changed = [], []
+        changed_fields = {}
+        seen = set()
+        for equipment in equipment_data:
+            node_id = equipment['id']
+            seen.add(node_id)
+            self.entries[node_id] = equipment
+            current = self.extract(equipment)
+            reference = self.reference.get(node_id)
+            if reference is None:
+                self.reference[node_id] = current
+                added.append(equipment)
+                continue
+            fields = self.changed_fields(reference, current)
+            if fields:
+                for field in fields:
+                    reference[field] = current.get(field)
+                changed.append(equipment)
+                changed_fields[node_id] = fields
+
+        present = seen if inventory_ids is None else set(inventory_ids)
+        removed = list(self.reference.keys() - present)
+        for node_id in removed:
+            del self.reference[node_id]
+            self.entries.pop(node_id, None)
+
+        self.sequence += 1
+        return EquipmentDelta(self.sequence, added, removed, changed, changed_fields, list(equipment_data))
+
+    def snapshot_delta(self) -> EquipmentDelta:
+        """État complet sous forme de delta (tous les nœuds ajoutés), pour un nouvel abonné"""
+        entries = list(self.entries.values())
+        return EquipmentDelta(self.sequence, entries, [], [], {}, entries)
+
+    def reset(self):
+        self.reference.clear()
+        self.entries.clear()
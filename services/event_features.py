@@ -0,0 +1,179 @@
+"""
+Extraction en colonnes des caractéristiques des événements Wazuh pour l'analyse ML
+"""
+import logging
+import time
+from functools import cached_property
+from numbers import Number
+from typing import Dict, List
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from monitoring.config.wazuh_config import MESSAGE_FEATURES_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Colonnes de la matrice de caractéristiques, avec leur facteur de normalisation
+FEATURE_COLUMNS = [
+    ('hour', 24.0),
+    ('weekday', 7.0),
+    ('user_length', 50.0),
+    ('event_type_length', 20.0),
+    ('message_length', 200.0),
+    ('agent_length', 50.0),
+    ('severity', 15.0)
+]
+FEATURE_COUNT = len(FEATURE_COLUMNS)
+
+# Hachage du texte des messages : sans état, il traite chaque lot indépendamment
+MESSAGE_FEATURE_COUNT = MESSAGE_FEATURES_CONFIG['n_features'] if MESSAGE_FEATURES_CONFIG['enabled'] else 0
+MESSAGE_VECTORIZER = HashingVectorizer(
+    n_features=max(MESSAGE_FEATURE_COUNT, 1),
+    ngram_range=tuple(MESSAGE_FEATURES_CONFIG['ngram_range']),
+    alternate_sign=False,
+    norm='l2'
+)
+
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+# Le 1er janvier 1970 était un jeudi (lundi = 0, comme datetime.weekday)
+EPOCH_WEEKDAY = 3
+
+
+def local_offsets(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Décalage de l'heure locale (secondes) pour chaque horodatage epoch. Les changements
+    d'heure tombant sur des heures pleines, le décalage est calculé une fois par heure
+    distincte du lot plutôt qu'une fois par événement.
+    """
+    if not len(timestamps):
+        return np.zeros(0)
+    hours, inverse = np.unique(np.floor_divide(timestamps, SECONDS_PER_HOUR), return_inverse=True)
+    offsets = np.array([time.localtime(hour * SECONDS_PER_HOUR).tm_gmtoff for hour in hours.tolist()], dtype=float)
+    return offsets[inverse]
+
+
+def field_length(value) -> int:
+    try:
+        return len(value)
+    except TypeError:
+        return -1
+
+
+class EventBatch:
+    """
+    Lot d'événements vu en colonnes NumPy. Chaque colonne dérivée (heure et jour locaux,
+    longueurs, sévérité, matrice de caractéristiques, contenu haché des messages) est
+    calculée une seule fois, à la première lecture, puis partagée entre le scoring et
+    l'entraînement.
+
+    Une ligne est invalide si son horodatage ou sa sévérité ne sont pas numériques, ou
+    si un champ texte n'a pas de longueur ; ses caractéristiques restent nulles.
+    """
+
+    def __init__(self, events: List[Dict]):
+        self.events = events
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def _lengths(self, field: str) -> np.ndarray:
+        return np.fromiter((field_length(event.get(field, '')) for event in self.events),
+                           dtype=float, count=len(self.events))
+
+    def _numbers(self, field: str) -> np.ndarray:
+        return np.fromiter(
+            (value if isinstance(value, Number) else np.nan
+             for value in (event.get(field, 0) for event in self.events)),
+            dtype=float, count=len(self.events)
+        )
+
+    @cached_property
+    def timestamps(self) -> np.ndarray:
+        """Horodatages epoch (secondes), NaN s'ils ne sont pas numériques"""
+        return self._numbers('timestamp')
+
+    @cached_property
+    def severities(self) -> np.ndarray:
+        return self._numbers('severity')
+
+    @cached_property
+    def event_types(self) -> List[str]:
+        return [event.get('event_type', '') for event in self.events]
+
+    @cached_property
+    def user_lengths(self) -> np.ndarray:
+        return self._lengths('user')
+
+    @cached_property
+    def event_type_lengths(self) -> np.ndarray:
+        return self._lengths('event_type')
+
+    @cached_property
+    def message_lengths(self) -> np.ndarray:
+        return self._lengths('message')
+
+    @cached_property
+    def agent_lengths(self) -> np.ndarray:
+        return self._lengths('agent')
+
+    @cached_property
+    def valid(self) -> np.ndarray:
+        valid = np.isfinite(self.timestamps) & np.isfinite(self.severities)
+        for lengths in (self.user_lengths, self.event_type_lengths, self.message_lengths, self.agent_lengths):
+            valid &= lengths >= 0
+        return valid
+
+    @cached_property
+    def local_seconds(self) -> np.ndarray:
+        """Horodatages en secondes de l'heure locale (0 pour les lignes invalides)"""
+        timestamps = np.where(self.valid, self.timestamps, 0.0)
+        return np.floor(timestamps) + local_offsets(np.floor(timestamps))
+
+    @cached_property
+    def hours(self) -> np.ndarray:
+        """Heure locale (0-23), comme datetime.fromtimestamp(...).hour"""
+        return np.floor_divide(self.local_seconds, SECONDS_PER_HOUR) % 24
+
+    @cached_property
+    def weekdays(self) -> np.ndarray:
+        """Jour de la semaine local (lundi = 0), comme datetime.fromtimestamp(...).weekday()"""
+        return (np.floor_divide(self.local_seconds, SECONDS_PER_DAY) + EPOCH_WEEKDAY) % 7
+
+    @cached_property
+    def message_features(self) -> sparse.csr_matrix:
+        """Matrice creuse (n, MESSAGE_FEATURE_COUNT) du contenu haché des messages ; lignes invalides vides"""
+        if not MESSAGE_FEATURE_COUNT:
+            return sparse.csr_matrix((len(self.events), 0))
+        # Les messages se répètent beaucoup : chaque texte distinct n'est haché qu'une fois
+        distinct: Dict[str, int] = {}
+        codes = [
+            distinct.setdefault(event.get('message', '') if valid and isinstance(event.get('message', ''), str) else '',
+                                len(distinct))
+            for event, valid in zip(self.events, self.valid.tolist())
+        ]
+        return MESSAGE_VECTORIZER.transform(list(distinct))[codes]
+
+    def model_matrix(self, numeric: np.ndarray, rows: np.ndarray, n_features: int):
+        """
+        Matrice d'entrée d'un modèle pour les lignes rows : caractéristiques numériques
+        (déjà mises à l'échelle) suivies du contenu haché des messages. Un modèle entraîné
+        sans messages (n_features == FEATURE_COUNT) ne reçoit que les colonnes numériques.
+        Creuse si des colonnes de messages sont ajoutées.
+        """
+        if n_features <= FEATURE_COUNT:
+            return numeric
+        return sparse.hstack([sparse.csr_matrix(numeric), self.message_features[rows]], format='csr')
+
+    @cached_property
+    def features(self) -> np.ndarray:
+        """Matrice (n, FEATURE_COUNT) normalisée ; lignes invalides à zéro"""
+        columns = [self.hours, self.weekdays, self.user_lengths, self.event_type_lengths,
+                   self.message_lengths, self.agent_lengths, self.severities]
+        features = np.column_stack([
+            column / scale for column, (_, scale) in zip(columns, FEATURE_COLUMNS)
+        ]) if len(self.events) else np.zeros((0, FEATURE_COUNT))
+        features[~self.valid] = 0.0
+        return features
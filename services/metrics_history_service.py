@@ -0,0 +1,256 @@
+"""
+Historique persistant des métriques NetXMS (SQLite) avec agrégations et rétention par niveau
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from monitoring.config.netxms_config import METRICS_HISTORY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+RAW_TIER = 'raw'
+
+
+class MetricsHistoryService:
+    """
+    Stocke les échantillons bruts (node_id, dci, timestamp, valeur) et les agrège
+    en min/moyenne/max par intervalle pour chaque niveau défini dans METRICS_HISTORY_CONFIG.
+
+    Chaque niveau est une table WITHOUT ROWID indexée par (node_id, dci, timestamp) : une
+    requête de plage pour un nœud est une lecture séquentielle de l'index. Les agrégats
+    sont maintenus par trigger à l'insertion des échantillons bruts, les doublons
+    (même nœud, DCI et horodatage) sont ignorés.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or METRICS_HISTORY_CONFIG['path']
+        self.max_points = METRICS_HISTORY_CONFIG['max_points']
+        self.retention_check = METRICS_HISTORY_CONFIG['retention_check']
+        # Niveaux triés du plus fin au plus grossier
+        self.tiers = sorted(METRICS_HISTORY_CONFIG['tiers'].items(), key=lambda tier: tier[1]['resolution'])
+        self.lock = threading.Lock()
+        self.last_retention = 0.0
+        self.conn = None
+        self.init_database()
+
+    def init_database(self):
+        """Initialise la base SQLite et les tables de chaque niveau"""
+        try:
+            if self.path != ':memory:' and os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            if self.path != ':memory:':
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+
+            cursor = self.conn.cursor()
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self._table(RAW_TIER)} (
+                    node_id INTEGER NOT NULL,
+                    dci TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (node_id, dci, ts)
+                ) WITHOUT ROWID
+            """)
+            for name, tier in self.tiers:
+                if name == RAW_TIER:
+                    continue
+                table = self._table(name)
+                resolution = int(tier['resolution'])
+                cursor.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        node_id INTEGER NOT NULL,
+                        dci TEXT NOT NULL,
+                        ts INTEGER NOT NULL,
+                        min REAL NOT NULL,
+                        max REAL NOT NULL,
+                        sum REAL NOT NULL,
+                        count INTEGER NOT NULL,
+                        PRIMARY KEY (node_id, dci, ts)
+                    ) WITHOUT ROWID
+                """)
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS rollup_{table} AFTER INSERT ON {self._table(RAW_TIER)}
+                    BEGIN
+                        INSERT INTO {table} (node_id, dci, ts, min, max, sum, count)
+                        VALUES (NEW.node_id, NEW.dci, (NEW.ts / {resolution}) * {resolution}, NEW.value, NEW.value, NEW.value, 1)
+                        ON CONFLICT (node_id, dci, ts) DO UPDATE SET
+                            min = min(min, excluded.min),
+                            max = max(max, excluded.max),
+                            sum = sum + excluded.sum,
+                            count = count + 1;
+                    END
+                """)
+            self.conn.commit()
+            logger.info("Base d'historique des métriques initialisée")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'initialisation de l'historique des métriques: {e}")
+
+    def _table(self, tier_name: str) -> str:
+        return f"metrics_{tier_name}" if tier_name == RAW_TIER else f"metrics_rollup_{tier_name}"
+
+    def record(self, samples: Iterable[Tuple[int, str, float, float]]) -> int:
+        """
+        Enregistre des échantillons (node_id, dci, timestamp epoch, valeur).
+        Retourne le nombre d'échantillons réellement ajoutés.
+        """
+        rows = [(node_id, dci, int(ts), float(value)) for node_id, dci, ts, value in samples if value is not None]
+        if not rows or self.conn is None:
+            return 0
+        try:
+            with self.lock:
+                before = self.conn.total_changes
+                with self.conn:
+                    self.conn.executemany(
+                        f"INSERT INTO {self._table(RAW_TIER)} (node_id, dci, ts, value) VALUES (?, ?, ?, ?) "
+                        f"ON CONFLICT (node_id, dci, ts) DO NOTHING",
+                        rows
+                    )
+                # total_changes inclut les lignes écrites par les triggers d'agrégation
+                added = (self.conn.total_changes - before) // len(self.tiers)
+            self.maybe_apply_retention()
+            return added
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de l'enregistrement de l'historique des métriques: {e}")
+            return 0
+
+    def maybe_apply_retention(self):
+        if time.time() - self.last_retention >= self.retention_check:
+            self.apply_retention()
+
+    def apply_retention(self, now: Optional[float] = None):
+        """Supprime, pour chaque niveau, les données plus anciennes que sa durée de rétention"""
+        now = now or time.time()
+        self.last_retention = now
+        try:
+            with self.lock, self.conn:
+                for name, tier in self.tiers:
+                    cutoff = int(now - tier['retention_days'] * 86400)
+                    self.conn.execute(f"DELETE FROM {self._table(name)} WHERE ts < ?", (cutoff,))
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la purge de l'historique des métriques: {e}")
+
+    def select_tier(self, start: float, end: float, now: Optional[float] = None) -> str:
+        """Niveau le plus fin dont la rétention couvre le début de la plage sans dépasser max_points"""
+        now = now or time.time()
+        for name, tier in self.tiers:
+            covers = start >= now - tier['retention_days'] * 86400
+            if covers and (end - start) / tier['resolution'] <= self.max_points:
+                return name
+        return self.tiers[-1][0]
+
+    def finest_tier(self, start: float, now: Optional[float] = None) -> str:
+        """Niveau le plus fin dont la rétention couvre le début de la plage (exports complets)"""
+        now = now or time.time()
+        for name, tier in self.tiers:
+            if start >= now - tier['retention_days'] * 86400:
+                return name
+        return self.tiers[-1][0]
+
+    def count_range(self, start: float, end: float, tier: Optional[str] = None) -> int:
+        """Nombre de points, tous nœuds et DCI confondus, entre start et end"""
+        tier = tier or self.finest_tier(start)
+        if self.conn is None:
+            return 0
+        try:
+            with self.lock:
+                return self.conn.execute(
+                    f"SELECT COUNT(*) FROM {self._table(tier)} WHERE ts BETWEEN ? AND ?", (int(start), int(end))
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors du comptage de l'historique des métriques: {e}")
+            return 0
+
+    def iter_range(self, start: float, end: float, tier: Optional[str] = None,
+                   chunk_size: int = 5000) -> Iterator[List[Tuple]]:
+        """
+        Parcourt par blocs les points (node_id, dci, ts, moyenne, min, max) de tous les nœuds
+        entre start et end, triés par clé primaire. Chaque bloc est une requête distincte qui
+        reprend après la dernière clé lue : le verrou n'est tenu que le temps d'un bloc et la
+        mémoire utilisée ne dépend pas de la taille de la plage.
+        """
+        tier = tier or self.finest_tier(start)
+        if self.conn is None:
+            return
+        columns = "value, value, value" if tier == RAW_TIER else "sum / count, min, max"
+        select = f"SELECT node_id, dci, ts, {columns} FROM {self._table(tier)} WHERE ts BETWEEN ? AND ?"
+        order = "ORDER BY node_id, dci, ts LIMIT ?"
+        last_key = None
+        while True:
+            try:
+                with self.lock:
+                    if last_key is None:
+                        rows = self.conn.execute(f"{select} {order}", (int(start), int(end), chunk_size)).fetchall()
+                    else:
+                        rows = self.conn.execute(
+                            f"{select} AND (node_id, dci, ts) > (?, ?, ?) {order}",
+                            (int(start), int(end), *last_key, chunk_size)
+                        ).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Erreur lors de la lecture de l'historique des métriques: {e}")
+                return
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            last_key = rows[-1][:3]
+
+    def query(self, node_id: int, dci: str, start: float, end: float, tier: Optional[str] = None) -> List[Dict]:
+        """
+        Renvoie les points d'une DCI entre start et end (epoch), triés par horodatage.
+        Chaque point contient 'timestamp' (ISO), 'value' (moyenne), 'min' et 'max'.
+        """
+        return [
+            {
+                'timestamp': datetime.fromtimestamp(ts).isoformat(),
+                'value': value,
+                'min': minimum,
+                'max': maximum
+            }
+            for ts, value, minimum, maximum in self._fetch(node_id, dci, start, end, tier)
+        ]
+
+    def query_arrays(self, node_id: int, dci: str, start: float, end: float,
+                     tier: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Comme query, sous forme de tableaux (horodatages epoch, moyennes, minimums, maximums)"""
+        rows = np.array(self._fetch(node_id, dci, start, end, tier), dtype=np.float64).reshape(-1, 4)
+        return rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3]
+
+    def _fetch(self, node_id: int, dci: str, start: float, end: float, tier: Optional[str] = None) -> List[Tuple]:
+        tier = tier or self.select_tier(start, end)
+        if self.conn is None:
+            return []
+        if tier == RAW_TIER:
+            sql = (f"SELECT ts, value, value, value FROM {self._table(RAW_TIER)} "
+                   f"WHERE node_id = ? AND dci = ? AND ts BETWEEN ? AND ? ORDER BY ts")
+        else:
+            sql = (f"SELECT ts, sum / count, min, max FROM {self._table(tier)} "
+                   f"WHERE node_id = ? AND dci = ? AND ts BETWEEN ? AND ? ORDER BY ts")
+        try:
+            with self.lock:
+                rows = self.conn.execute(sql, (node_id, dci, int(start), int(end))).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Erreur lors de la lecture de l'historique {dci} pour le nœud {node_id}: {e}")
+            return []
+        return rows
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
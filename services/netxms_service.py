@@ -2,24 +2,132 @@
 Service pour l'API NetXMS
 """
 import requests
+from requests.adapters import HTTPAdapter
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, List, Dict, Optional, Tuple
 import logging
-from monitoring.config.netxms_config import NETXMS_CONFIG, METRICS_CONFIG
+from monitoring.config.netxms_config import NETXMS_CONFIG, METRICS_CONFIG, POLLING_CONFIG
+from monitoring.services.metrics_history_service import MetricsHistoryService
+from monitoring.services.status_evaluator import StatusEvaluator, StatusResult, resolve_equipment_type
+from monitoring.services.polling_scheduler import AdaptivePollingScheduler
+from monitoring.services.equipment_snapshot import EquipmentDelta, SnapshotDiffer
+from monitoring.services.equipment_hierarchy import resolve_node_location
 
 logger = logging.getLogger(__name__)
 
-class NetXMSService:
+UPTIME_DCI = 'UPTIME'
+
+# Codes HTTP indiquant que le serveur ne propose pas la lecture groupée
+BULK_UNSUPPORTED_CODES = (404, 405, 501)
+
+
+def parse_timestamp(value) -> float:
+    """Convertit un horodatage NetXMS (epoch s/ms ou ISO 8601) en secondes epoch"""
+    if isinstance(value, (int, float)):
+        return value / 1000.0 if value > 1e11 else float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            pass
+    return datetime.now().timestamp()
+
+
+class MetricSeriesCache:
+    """Série locale d'une DCI triée par horodatage, alimentée par fusions incrémentales"""
+
     def __init__(self):
-        self.api_url = NETXMS_CONFIG['api_url']
+        self.timestamps: List[float] = []
+        self.values: List[float] = []
+        self.coverage_start: Optional[float] = None  # Début de la plage déjà demandée au serveur
+        self.fetched_until: Optional[float] = None   # Fin de la dernière plage reçue
+
+    @property
+    def high_water_mark(self) -> Optional[float]:
+        return self.timestamps[-1] if self.timestamps else None
+
+    def merge(self, points: List[Tuple[float, float]]) -> int:
+        """Fusionne des points (ts, valeur) ; un horodatage déjà connu est remplacé. Retourne le nombre de nouveaux points"""
+        added = 0
+        for ts, value in points:
+            if not self.timestamps or ts > self.timestamps[-1]:
+                self.timestamps.append(ts)
+                self.values.append(value)
+                added += 1
+                continue
+            # Point tardif ou chevauchement : insertion triée ou remplacement
+            index = bisect_left(self.timestamps, ts)
+            if index < len(self.timestamps) and self.timestamps[index] == ts:
+                self.values[index] = value
+            else:
+                self.timestamps.insert(index, ts)
+                self.values.insert(index, value)
+                added += 1
+        return added
+
+    def trim(self, start: float):
+        """Oublie les points antérieurs à start"""
+        index = bisect_left(self.timestamps, start)
+        if index:
+            del self.timestamps[:index]
+            del self.values[:index]
+        if self.coverage_start is not None:
+            self.coverage_start = max(self.coverage_start, start)
+
+    def window(self, start: float, end: float) -> List[Dict]:
+        first = bisect_left(self.timestamps, start)
+        last = bisect_left(self.timestamps, end + 1e-6)
+        return [
+            {'timestamp': datetime.fromtimestamp(ts).isoformat(), 'value': value}
+            for ts, value in zip(self.timestamps[first:last], self.values[first:last])
+        ]
+
+
+class NetXMSService:
+    def __init__(self, api_url: Optional[str] = None):
+        self.api_url = api_url or NETXMS_CONFIG['api_url']
         self.username = NETXMS_CONFIG['username']
         self.password = NETXMS_CONFIG['password']
         self.timeout = NETXMS_CONFIG['timeout']
         self.verify_ssl = NETXMS_CONFIG['verify_ssl']
+        self.max_workers = NETXMS_CONFIG.get('max_workers', 16)
+        self.bulk_batch_size = NETXMS_CONFIG.get('bulk_batch_size', 200)
+        # None = inconnu, détecté au premier appel groupé
+        self.bulk_supported = None
+        # Séries locales pour la récupération incrémentale de get_node_metrics
+        self.incremental_overlap = NETXMS_CONFIG.get('incremental_overlap', 120)
+        self.series_cache: Dict[Tuple[int, str], MetricSeriesCache] = {}
+        self.series_windows: Dict[Tuple[int, str], float] = {}
+        self.series_lock = threading.Lock()
+        # Cache de l'inventaire (TTL par endpoint + revalidation ETag / If-Modified-Since)
+        self.cache_ttl = NETXMS_CONFIG.get('cache_ttl', {})
+        self.response_cache: Dict[str, Dict] = {}
+        self.cache_lock = threading.Lock()
+        self.inventory_ids: Optional[set] = None
+        self.inventory_changes = {'added': [], 'removed': [], 'timestamp': None}
         self.session = requests.Session()
         self.session.auth = (self.username, self.password)
         self.session.verify = self.verify_ssl
+        # Pool de connexions dimensionné pour la collecte concurrente
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Historique local persistant des métriques collectées
+        self.metrics_history = MetricsHistoryService()
+        # Évaluation vectorisée des seuils de tous les nœuds
+        self.status_evaluator = StatusEvaluator()
+        self.last_status_result: Optional[StatusResult] = None
+        # Collecte adaptative : dernier état connu de chaque nœud et planification par nœud
+        self.polling_scheduler = AdaptivePollingScheduler(self.status_evaluator)
+        self.equipment_snapshot: Dict[int, Dict] = {}
+        # Différences entre collectes diffusées aux abonnés (voir subscribe_deltas)
+        self.snapshot_differ = SnapshotDiffer()
+        self.delta_subscribers: List[Callable[[EquipmentDelta], None]] = []
         try:
             self.simulation = not self.test_connection()
         except Exception:
@@ -29,12 +137,10 @@ class NetXMSService:
         if self.simulation:
             return self.simulate_nodes()
         try:
-            response = self.session.get(
-                f"{self.api_url}/nodes",
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            return response.json()
+            nodes, refreshed = self.cached_get('nodes', f"{self.api_url}/nodes")
+            if refreshed:
+                self.update_inventory(nodes)
+            return nodes
         except requests.exceptions.RequestException as e:
             logger.error(f"Erreur lors de la récupération des nœuds: {e}")
             return []
@@ -50,26 +156,143 @@ class NetXMSService:
         if self.simulation:
             return {'id': node_id, 'name': f'Equipement-SIMU-{node_id}', 'status': 'NORMAL'}
         try:
-            response = self.session.get(
-                f"{self.api_url}/nodes/{node_id}",
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            return response.json()
+            details, _ = self.cached_get('node_details', f"{self.api_url}/nodes/{node_id}")
+            return details
         except requests.exceptions.RequestException as e:
             logger.error(f"Erreur lors de la récupération du nœud {node_id}: {e}")
             return None
 
-    def get_node_metrics(self, node_id: int, dci_name: str, hours: int = 1) -> List[Dict]:
+    def cached_get(self, endpoint: str, url: str) -> Tuple[object, bool]:
+        """
+        GET avec cache : la réponse est réutilisée pendant NETXMS_CONFIG['cache_ttl'][endpoint]
+        secondes, puis revalidée par ETag / If-Modified-Since lorsque le serveur les fournit.
+        Retourne (données, rafraîchies) où rafraîchies indique un nouveau contenu.
+        En cas d'erreur, la dernière réponse connue est servie si elle existe.
+        """
+        now = time.time()
+        with self.cache_lock:
+            entry = self.response_cache.get(url)
+        if entry and now < entry['expires']:
+            return entry['data'], False
+
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if entry and response.status_code == 304:
+                entry['expires'] = now + self.cache_ttl.get(endpoint, 0)
+                return entry['data'], False
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            if entry:
+                logger.warning(f"Réponse en cache utilisée pour {url}: {e}")
+                return entry['data'], False
+            raise
+
+        with self.cache_lock:
+            self.response_cache[url] = {
+                'data': data,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'expires': now + self.cache_ttl.get(endpoint, 0)
+            }
+        return data, True
+
+    def invalidate_cache(self, endpoint: Optional[str] = None, node_id: Optional[int] = None):
+        """Invalide le cache de l'inventaire : tout, un endpoint ('nodes', 'node_details') ou un nœud"""
+        with self.cache_lock:
+            if endpoint is None and node_id is None:
+                self.response_cache.clear()
+                return
+            nodes_url = f"{self.api_url}/nodes"
+            for url in list(self.response_cache):
+                is_nodes = url == nodes_url
+                if node_id is not None:
+                    matches = url == f"{nodes_url}/{node_id}"
+                elif endpoint == 'nodes':
+                    matches = is_nodes
+                else:
+                    matches = not is_nodes
+                if matches:
+                    del self.response_cache[url]
+
+    def update_inventory(self, nodes: List[Dict]):
+        """Met à jour l'instantané de l'inventaire et calcule les nœuds ajoutés ou supprimés"""
+        node_ids = {node['id'] for node in nodes}
+        if self.inventory_ids is not None:
+            removed = sorted(self.inventory_ids - node_ids)
+            self.inventory_changes = {
+                'added': [node for node in nodes if node['id'] not in self.inventory_ids],
+                'removed': removed,
+                'timestamp': datetime.now().isoformat()
+            }
+            for node_id in removed:
+                self.invalidate_cache(node_id=node_id)
+            if self.inventory_changes['added'] or removed:
+                logger.info(f"Inventaire NetXMS modifié: {len(self.inventory_changes['added'])} ajout(s), {len(removed)} suppression(s)")
+        self.inventory_ids = node_ids
+
+    def get_inventory_changes(self) -> Dict:
+        """Nœuds ajoutés et supprimés lors du dernier changement d'inventaire"""
+        return self.inventory_changes
+
+    def get_node_metrics(self, node_id: int, dci_name: str, hours: int = 1, incremental: bool = True) -> List[Dict]:
+        """
+        Valeurs d'une DCI sur les `hours` dernières heures.
+        En mode incrémental, seuls les points postérieurs au dernier horodatage reçu
+        (moins NETXMS_CONFIG['incremental_overlap'] secondes pour les points tardifs)
+        sont demandés au serveur puis fusionnés dans la série locale.
+        """
         if self.simulation:
             return [{'timestamp': '2024-01-01T12:00:00', 'value': 42.0}]
-        try:
-            end_time = datetime.now()
-            start_time = end_time - timedelta(hours=hours)
 
+        end = datetime.now().timestamp()
+        start = end - hours * 3600
+        if not incremental:
+            return self.fetch_node_metrics(node_id, dci_name, start, end) or []
+
+        key = (node_id, dci_name)
+        with self.series_lock:
+            series = self.series_cache.get(key)
+            if series is None:
+                series = self.series_cache[key] = MetricSeriesCache()
+            # La série est bornée par la plus longue fenêtre demandée
+            self.series_windows[key] = max(self.series_windows.get(key, 0), hours * 3600)
+            fetch_ranges = []
+            if series.coverage_start is None or series.coverage_start > start:
+                # Plage jamais demandée au serveur (premier appel ou fenêtre élargie)
+                backfill_end = series.coverage_start if series.coverage_start is not None else end
+                fetch_ranges.append((start, backfill_end, True))
+            if series.fetched_until is not None:
+                high_water_mark = series.high_water_mark or series.fetched_until
+                fetch_ranges.append((max(start, high_water_mark - self.incremental_overlap), end, False))
+
+        for range_start, range_end, backfill in fetch_ranges:
+            values = self.fetch_node_metrics(node_id, dci_name, range_start, range_end)
+            if values is None:
+                continue
+            points = [(parse_timestamp(point.get('timestamp')), float(point['value'])) for point in values if 'value' in point]
+            with self.series_lock:
+                series.merge(sorted(points))
+                if backfill:
+                    series.coverage_start = start
+                series.fetched_until = max(series.fetched_until or range_end, range_end)
+
+        with self.series_lock:
+            series.trim(end - self.series_windows[key])
+            return series.window(start, end)
+
+    def fetch_node_metrics(self, node_id: int, dci_name: str, start: float, end: float) -> Optional[List[Dict]]:
+        """Télécharge les valeurs d'une DCI entre start et end (epoch) et les enregistre dans l'historique local"""
+        try:
             params = {
-                'from': int(start_time.timestamp() * 1000),
-                'to': int(end_time.timestamp() * 1000)
+                'from': int(start * 1000),
+                'to': int(end * 1000)
             }
 
             response = self.session.get(
@@ -78,10 +301,36 @@ class NetXMSService:
                 timeout=self.timeout
             )
             response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            values = response.json()
+            self.metrics_history.record(
+                (node_id, dci_name, parse_timestamp(point.get('timestamp')), point.get('value'))
+                for point in values
+            )
+            return values
+        except (requests.exceptions.RequestException, ValueError) as e:
             logger.error(f"Erreur lors de la récupération des métriques {dci_name} pour le nœud {node_id}: {e}")
-            return []
+            return None
+
+    def get_metrics_history(self, node_id: int, dci_name: str, hours: int = 24) -> List[Dict]:
+        """
+        Historique d'une DCI lu uniquement depuis le stockage local, sans appel à l'API.
+        Le niveau d'agrégation (brut, 5 min, 1 h) est choisi selon la longueur de la plage.
+        """
+        end_time = datetime.now().timestamp()
+        return self.metrics_history.query(node_id, dci_name, end_time - hours * 3600, end_time)
+
+    def record_equipment_history(self, equipment_data: List[Dict]):
+        """Enregistre les métriques d'un cycle de collecte dans l'historique local"""
+        samples = []
+        for equipment in equipment_data:
+            for metric_name, metric_data in equipment.get('metrics', {}).items():
+                samples.append((
+                    equipment['id'],
+                    METRICS_CONFIG[metric_name]['dci_name'],
+                    parse_timestamp(metric_data.get('timestamp')),
+                    metric_data.get('value')
+                ))
+        self.metrics_history.record(samples)
 
     def get_current_metrics(self, node_id: int) -> Dict:
         if self.simulation:
@@ -91,101 +340,292 @@ class NetXMSService:
                 'disk_utilization': {'value': 50, 'timestamp': '2024-01-01T12:00:00', 'threshold_warning': 80, 'threshold_critical': 95},
                 'network_traffic': {'value': 10, 'timestamp': '2024-01-01T12:00:00', 'threshold_warning': 150, 'threshold_critical': 200}
             }
+        raw_values = {}
+        for metric_config in METRICS_CONFIG.values():
+            dci_name = metric_config['dci_name']
+            raw_values[(node_id, dci_name)] = self.fetch_last_value(node_id, dci_name)
+
+        return self.build_metrics(node_id, raw_values)
+
+    def fetch_last_value(self, node_id: int, dci_name: str) -> Optional[Dict]:
+        """Récupère la dernière valeur d'une DCI (une requête par couple nœud/DCI)"""
+        try:
+            response = self.session.get(
+                f"{self.api_url}/nodes/{node_id}/dci/{dci_name}/last_value",
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+            if data and 'value' in data:
+                return data
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Impossible de récupérer la DCI {dci_name} pour le nœud {node_id}: {e}")
+        return None
+
+    def build_metrics(self, node_id: int, raw_values: Dict[Tuple[int, str], Optional[Dict]]) -> Dict:
+        """Construit le dictionnaire de métriques d'un nœud à partir des dernières valeurs brutes"""
         metrics = {}
 
         for metric_name, metric_config in METRICS_CONFIG.items():
+            data = raw_values.get((node_id, metric_config['dci_name']))
+            if not data:
+                continue
             try:
-                response = self.session.get(
-                    f"{self.api_url}/nodes/{node_id}/dci/{metric_config['dci_name']}/last_value",
-                    timeout=self.timeout
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                if data and 'value' in data:
-                    metrics[metric_name] = {
-                        'value': float(data['value']),
-                        'timestamp': data.get('timestamp', datetime.now().isoformat()),
-                        'threshold_warning': metric_config['threshold_warning'],
-                        'threshold_critical': metric_config['threshold_critical']
-                    }
-            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                metrics[metric_name] = {
+                    'value': float(data['value']),
+                    'timestamp': data.get('timestamp', datetime.now().isoformat()),
+                    'threshold_warning': metric_config['threshold_warning'],
+                    'threshold_critical': metric_config['threshold_critical']
+                }
+            except (ValueError, KeyError, TypeError) as e:
                 logger.warning(f"Impossible de récupérer la métrique {metric_name} pour le nœud {node_id}: {e}")
-                continue
 
         return metrics
 
+    def get_bulk_last_values(self, node_ids: List[int], dci_names: List[str]) -> Optional[Dict[Tuple[int, str], Dict]]:
+        """
+        Récupère les dernières valeurs de plusieurs DCI pour plusieurs nœuds par lots
+        (NETXMS_CONFIG['bulk_batch_size'] nœuds par requête).
+        Retourne None si le serveur ne supporte pas la lecture groupée.
+        """
+        if self.bulk_supported is False:
+            return None
+
+        batches = [node_ids[i:i + self.bulk_batch_size] for i in range(0, len(node_ids), self.bulk_batch_size)]
+        if not batches:
+            return {}
+        values = {}
+
+        # Premier lot en série tant que le support de la lecture groupée n'est pas connu
+        if self.bulk_supported is None:
+            first_batch = self._fetch_bulk_batch(batches.pop(0), dci_names)
+            if first_batch is None:
+                return None
+            values.update(first_batch)
+
+        if batches:
+            workers = max(1, min(self.max_workers, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(lambda batch: self._fetch_bulk_batch(batch, dci_names), batches)
+                for batch, batch_values in zip(batches, results):
+                    if batch_values is None:
+                        # Lecture groupée refusée en cours de route : le lot est relu requête par requête
+                        batch_values = self._fetch_unitary_batch(batch, dci_names)
+                    values.update(batch_values)
+        return values
+
+    def _fetch_bulk_batch(self, node_ids: List[int], dci_names: List[str]) -> Optional[Dict[Tuple[int, str], Dict]]:
+        """
+        Lecture groupée d'un lot de nœuds, avec repli requête par requête si le lot échoue.
+        Retourne None si le serveur ne supporte pas la lecture groupée.
+        """
+        try:
+            response = self.session.post(
+                f"{self.api_url}/dci/last_values",
+                json={'nodes': node_ids, 'dci': dci_names},
+                timeout=self.timeout
+            )
+            if response.status_code in BULK_UNSUPPORTED_CODES:
+                logger.info("Lecture groupée des DCI non supportée par le serveur, repli sur les requêtes unitaires")
+                self.bulk_supported = False
+                return None
+            response.raise_for_status()
+            self.bulk_supported = True
+
+            values = {}
+            for item in response.json():
+                if item and 'value' in item:
+                    values[(item['node_id'], item['dci_name'])] = item
+            return values
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Échec de la lecture groupée pour {len(node_ids)} nœuds, repli unitaire: {e}")
+
+        return self._fetch_unitary_batch(node_ids, dci_names)
+
+    def _fetch_unitary_batch(self, node_ids: List[int], dci_names: List[str]) -> Dict[Tuple[int, str], Dict]:
+        """Dernières valeurs d'un lot de nœuds, une requête par nœud et par DCI"""
+        return {
+            (node_id, dci_name): data
+            for node_id in node_ids
+            for dci_name in dci_names
+            if (data := self.fetch_last_value(node_id, dci_name))
+        }
+
     def get_node_status(self, node_id: int) -> str:
         if self.simulation:
             return "NORMAL"
-        metrics = self.get_current_metrics(node_id)
+        return self.evaluate_status(self.get_current_metrics(node_id))
 
+    def evaluate_status(self, metrics: Dict, equipment_type: Optional[str] = None) -> str:
+        """Détermine le statut d'un nœud à partir de métriques déjà récupérées"""
         if not metrics:
             return "INCONNU"
+        result = self.status_evaluator.evaluate_equipment(
+            [{'metrics': metrics, 'equipment_type': equipment_type}], track_changes=False
+        )
+        return result.labels()[0]
 
-        # Vérification des seuils critiques
-        for metric_name, metric_data in metrics.items():
-            if metric_data['value'] >= metric_data['threshold_critical']:
-                return "CRITIQUE"
-
-        # Vérification des seuils d'avertissement
-        for metric_name, metric_data in metrics.items():
-            if metric_data['value'] >= metric_data['threshold_warning']:
-                return "ATTENTION"
-
-        return "NORMAL"
+    def apply_statuses(self, equipment_data: List[Dict]) -> StatusResult:
+        """
+        Calcule en une passe vectorisée le statut de tous les équipements.
+        Le résultat (niveaux par cellule, lignes et cellules modifiées) reste disponible
+        dans last_status_result pour ne rafraîchir que ce qui a changé.
+        """
+        result = self.status_evaluator.evaluate_equipment(equipment_data)
+        for equipment, label in zip(equipment_data, result.labels()):
+            equipment['status'] = label
+        self.last_status_result = result
+        return result
 
-    def get_all_equipment_data(self) -> List[Dict]:
+    def get_all_equipment_data(self, max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Collecte l'état de tous les nœuds en parallèle.
+        max_workers borne le nombre de requêtes simultanées (NETXMS_CONFIG['max_workers'] par défaut).
+        """
         if self.simulation:
-            return [
+            equipment_data = [
                 {'id': 1, 'name': 'Serveur-SIMU', 'status': 'NORMAL', 'uptime_hours': 123, 'timestamp': '2024-01-01T12:00:00', 'metrics': self.get_current_metrics(1)},
                 {'id': 2, 'name': 'PC-SIMU', 'status': 'ATTENTION', 'uptime_hours': 45, 'timestamp': '2024-01-01T12:00:00', 'metrics': self.get_current_metrics(2)}
             ]
+            self.publish_delta(equipment_data)
+            return equipment_data
         nodes = self.get_nodes()
-        equipment_data = []
+        if not nodes:
+            return []
 
-        for node in nodes:
-            node_id = node['id']
-            node_name = node.get('name', f"Nœud {node_id}")
+        equipment_data = self.collect_nodes(nodes, max_workers)
+        self.apply_statuses(equipment_data)
+        self.record_equipment_history(equipment_data)
+        self.publish_delta(equipment_data)
+        return equipment_data
 
-            # Récupération des métriques actuelles
-            metrics = self.get_current_metrics(node_id)
+    def collect_nodes(self, nodes: List[Dict], max_workers: Optional[int] = None) -> List[Dict]:
+        """Collecte les données d'une liste de nœuds (lecture groupée si possible), sans calcul de statut"""
+        if not nodes:
+            return []
 
-            # Détermination du statut
-            status = self.get_node_status(node_id)
+        # Lecture groupée : O(nœuds / lot) requêtes au lieu de O(nœuds × métriques)
+        dci_names = [config['dci_name'] for config in METRICS_CONFIG.values()] + [UPTIME_DCI]
+        last_values = self.get_bulk_last_values([node['id'] for node in nodes], dci_names)
+        if last_values is not None:
+            return [self.collect_node_data(node, last_values, evaluate=False) for node in nodes]
 
-            # Récupération de l'uptime
-            uptime_hours = self.get_node_uptime(node_id)
+        workers = max(1, min(max_workers or self.max_workers, len(nodes)))
+        if workers == 1:
+            return [self.collect_node_data(node, evaluate=False) for node in nodes]
 
-            equipment_info = {
-                'id': node_id,
-                'name': node_name,
-                'status': status,
-                'uptime_hours': uptime_hours,
-                'timestamp': datetime.now().isoformat(),
-                'metrics': metrics
-            }
+        # L'ordre des nœuds est conservé par executor.map
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda node: self.collect_node_data(node, evaluate=False), nodes))
 
-            equipment_data.append(equipment_info)
+    def collect_due_equipment(self, max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Collecte adaptative : n'interroge que les nœuds dont l'échéance est atteinte
+        (voir AdaptivePollingScheduler) et renvoie le dernier état connu de tous les nœuds,
+        dans l'ordre de l'inventaire.
+        """
+        if self.simulation or not POLLING_CONFIG.get('enabled', True):
+            return self.get_all_equipment_data(max_workers)
 
-        return equipment_data
+        nodes = self.get_nodes()
+        if not nodes:
+            return []
+
+        now = time.time()
+        node_index = {node['id']: node for node in nodes}
+        self.polling_scheduler.sync_nodes(node_index, now)
+        for node_id in list(self.equipment_snapshot):
+            if node_id not in node_index:
+                del self.equipment_snapshot[node_id]
+
+        due_nodes = [node_index[node_id] for node_id in self.polling_scheduler.due_nodes(now)]
+        polled = self.collect_nodes(due_nodes, max_workers)
+        result = self.status_evaluator.evaluate_equipment(polled, track_changes=False)
+        for equipment, label in zip(polled, result.labels()):
+            equipment['status'] = label
+            self.polling_scheduler.record(equipment['id'], equipment, now)
+            self.equipment_snapshot[equipment['id']] = equipment
+        self.record_equipment_history(polled)
+        self.publish_delta(polled, node_index)
+
+        return [self.equipment_snapshot[node['id']] for node in nodes if node['id'] in self.equipment_snapshot]
+
+    def subscribe_deltas(self, callback: Callable[[EquipmentDelta], None], replay: bool = True):
+        """
+        Abonne callback aux différences produites par chaque collecte.
+        Avec replay, l'état courant lui est d'abord transmis comme un delta d'ajouts.
+        """
+        if callback not in self.delta_subscribers:
+            self.delta_subscribers.append(callback)
+        if replay and self.snapshot_differ.entries:
+            callback(self.snapshot_differ.snapshot_delta())
+
+    def unsubscribe_deltas(self, callback: Callable[[EquipmentDelta], None]):
+        if callback in self.delta_subscribers:
+            self.delta_subscribers.remove(callback)
+
+    def publish_delta(self, equipment_data: List[Dict], inventory_ids=None) -> EquipmentDelta:
+        """Calcule les différences avec la collecte précédente et les transmet aux abonnés s'il y en a"""
+        delta = self.snapshot_differ.diff(equipment_data, inventory_ids)
+        if delta.is_empty:
+            return delta
+        for callback in list(self.delta_subscribers):
+            try:
+                callback(delta)
+            except Exception as e:
+                logger.error(f"Erreur lors de la diffusion des changements d'équipements: {e}")
+        return delta
+
+    def collect_node_data(self, node: Dict, last_values: Optional[Dict] = None, evaluate: bool = True) -> Dict:
+        """
+        Collecte métriques, statut et uptime d'un nœud (chaque métrique n'est lue qu'une fois).
+        Si last_values (résultat de get_bulk_last_values) est fourni, aucune requête n'est émise.
+        Avec evaluate=False, le statut est laissé à apply_statuses (évaluation groupée).
+        """
+        node_id = node['id']
+        node_name = node.get('name', f"Nœud {node_id}")
+        equipment_type = resolve_equipment_type(node)
+        site, group = resolve_node_location(node)
+
+        # Récupération des métriques actuelles
+        if last_values is not None:
+            metrics = self.build_metrics(node_id, last_values)
+        else:
+            metrics = self.get_current_metrics(node_id)
+
+        # Détermination du statut à partir des mêmes métriques
+        status = self.evaluate_status(metrics, equipment_type) if evaluate else None
+
+        # Récupération de l'uptime
+        if last_values is not None:
+            uptime_hours = self.uptime_hours_from_value(last_values.get((node_id, UPTIME_DCI)))
+        else:
+            uptime_hours = self.get_node_uptime(node_id)
+
+        return {
+            'id': node_id,
+            'name': node_name,
+            'status': status,
+            'equipment_type': equipment_type,
+            'site': site,
+            'group': group,
+            'uptime_hours': uptime_hours,
+            'timestamp': datetime.now().isoformat(),
+            'metrics': metrics
+        }
 
     def get_node_uptime(self, node_id: int) -> float:
         if self.simulation:
             return 123.0
-        try:
-            response = self.session.get(
-                f"{self.api_url}/nodes/{node_id}/dci/UPTIME/last_value",
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            data = response.json()
+        return self.uptime_hours_from_value(self.fetch_last_value(node_id, UPTIME_DCI))
 
-            if data and 'value' in data:
+    def uptime_hours_from_value(self, data: Optional[Dict]) -> float:
+        """Convertit la dernière valeur brute de la DCI UPTIME (secondes) en heures"""
+        if data and 'value' in data:
+            try:
                 return float(data['value']) / 3600  # Conversion en heures
-        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
-            logger.warning(f"Impossible de récupérer l'uptime pour le nœud {node_id}: {e}")
-
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Valeur d'uptime invalide: {e}")
         return 0.0
 
     def test_connection(self) -> bool:
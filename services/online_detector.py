@@ -0,0 +1,233 @@
+"""
+Détection d'anomalies en continu (half-space trees) sur l'activité utilisateur
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+from monitoring.config.wazuh_config import ONLINE_DETECTOR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class RunningScaler:
+    """Centrage-réduction à partir de la moyenne et de la variance cumulées (Welford, par lots)"""
+
+    def __init__(self, n_features: int):
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+
+    def partial_fit(self, X: np.ndarray):
+        if not len(X):
+            return
+        batch_count = len(X)
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * batch_count / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * batch_count / total
+        self.count = total
+
+    @property
+    def std(self) -> np.ndarray:
+        if self.count < 2:
+            return np.ones_like(self.mean)
+        std = np.sqrt(self.m2 / (self.count - 1))
+        return np.where(std > 0, std, 1.0)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (X - self.mean) / self.std
+
+
+class HalfSpaceTrees:
+    """
+    Forêt de half-space trees (Tan, Ting & Liu, 2011) sur des données ramenées dans [0, 1].
+
+    Chaque arbre découpe l'espace en deux à chaque niveau, sur une dimension tirée au
+    hasard. Les masses (nombre de points par nœud) de la fenêtre précédente servent de
+    référence pour le score ; celles de la fenêtre courante s'accumulent et la remplacent
+    toutes les window_size observations. La mémoire est fixe : n_trees × 2^(height+1) nœuds.
+
+    Le score brut n'est pas calibré (des données normales obtiennent couramment 0.6 à
+    0.9). Les points d'une fenêtre sont donc aussi notés contre la référence au moment
+    de leur apprentissage ; au changement de fenêtre, le quantile calibration_quantile
+    de ces scores devient le plancher sous lequel un point est considéré normal (score 0).
+    """
+
+    def __init__(self, n_features: int, n_trees: int, height: int, window_size: int,
+                 size_limit: float, calibration_quantile: float, seed: Optional[int] = None):
+        self.n_trees = n_trees
+        self.height = height
+        self.window_size = window_size
+        self.size_limit = size_limit * window_size
+        self.calibration_quantile = calibration_quantile
+        rng = np.random.default_rng(seed)
+        internal = 2 ** height - 1
+        nodes = 2 ** (height + 1) - 1
+        self.split_dims = rng.integers(0, n_features, size=(n_trees, internal))
+        self.split_values = np.empty((n_trees, internal))
+
+        # Espace de travail aléatoire de chaque arbre, englobant [0, 1] sur chaque dimension
+        for tree in range(n_trees):
+            pivot = rng.random(n_features)
+            half_width = 2 * np.maximum(pivot, 1 - pivot)
+            lower, upper = pivot - half_width, pivot + half_width
+            bounds = {0: (lower, upper)}
+            for node in range(internal):
+                node_lower, node_upper = bounds.pop(node)
+                dim = self.split_dims[tree, node]
+                middle = (node_lower[dim] + node_upper[dim]) / 2
+                self.split_values[tree, node] = middle
+                left_upper = node_upper.copy()
+                left_upper[dim] = middle
+                right_lower = node_lower.copy()
+                right_lower[dim] = middle
+                bounds[2 * node + 1] = (node_lower, left_upper)
+                bounds[2 * node + 2] = (right_lower, node_upper)
+
+        self.reference_mass = np.zeros((n_trees, nodes))
+        self.latest_mass = np.zeros((n_trees, nodes))
+        self.window_count = 0
+        self.windows = 0
+        # Score maximal : toute la fenêtre de référence au niveau le plus profond de chaque arbre
+        self.max_score = n_trees * window_size * 2 ** height
+        # Scores bruts de la fenêtre courante contre la référence, et plancher qui en est tiré
+        self.window_scores = np.zeros(window_size)
+        self.score_floor: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        """Vrai dès qu'une fenêtre de référence et le plancher de calibration sont disponibles"""
+        return self.score_floor is not None
+
+    def paths(self, X: np.ndarray) -> np.ndarray:
+        """Nœuds traversés : tableau (n_trees, n, height + 1), racine comprise"""
+        count = len(X)
+        paths = np.zeros((self.n_trees, count, self.height + 1), dtype=np.int64)
+        rows = np.arange(count)
+        for tree in range(self.n_trees):
+            node = np.zeros(count, dtype=np.int64)
+            for level in range(self.height):
+                dims = self.split_dims[tree, node]
+                go_right = X[rows, dims] >= self.split_values[tree, node]
+                node = 2 * node + 1 + go_right
+                paths[tree, :, level + 1] = node
+        return paths
+
+    def raw_score(self, X: np.ndarray) -> np.ndarray:
+        """Score brut dans [0, 1] (1 = point isolé) par rapport à la fenêtre de référence"""
+        if not len(X):
+            return np.zeros(0)
+        return self.path_scores(self.paths(X))
+
+    def path_scores(self, paths: np.ndarray) -> np.ndarray:
+        trees = np.arange(self.n_trees)[:, None, None]
+        masses = self.reference_mass[trees, paths]
+        # Descente arrêtée au premier nœud dont la masse ne dépasse pas size_limit
+        small = masses <= self.size_limit
+        small[:, :, -1] = True
+        depth = small.argmax(axis=2)
+        mass = np.take_along_axis(masses, depth[:, :, None], axis=2)[:, :, 0]
+        total = (mass * 2.0 ** depth).sum(axis=0)
+        return 1.0 - total / self.max_score
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """
+        Score calibré dans [0, 1] : 0 jusqu'au plancher (quantile des scores de la fenêtre
+        précédente), puis croissant linéairement jusqu'à 1 pour un point isolé
+        """
+        raw = self.raw_score(X)
+        floor = self.score_floor
+        if floor is None:
+            return np.zeros(len(raw))
+        if floor >= 1.0:
+            return (raw >= 1.0).astype(float)
+        return np.clip((raw - floor) / (1.0 - floor), 0.0, 1.0)
+
+    def learn(self, X: np.ndarray):
+        """Ajoute les points aux masses de la fenêtre courante, en changeant de fenêtre si besoin"""
+        start = 0
+        while start < len(X):
+            stop = start + min(self.window_size - self.window_count, len(X) - start)
+            paths = self.paths(X[start:stop])
+            if self.windows:
+                # Noté avant d'être appris : score hors échantillon, comme en production
+                self.window_scores[self.window_count:self.window_count + stop - start] = self.path_scores(paths)
+            # Comptage de tous les arbres en un appel : nœuds décalés de tree × nodes
+            nodes = self.latest_mass.shape[1]
+            offsets = (np.arange(self.n_trees) * nodes)[:, None, None]
+            self.latest_mass += np.bincount((paths + offsets).ravel(),
+                                            minlength=self.latest_mass.size).reshape(self.latest_mass.shape)
+            self.window_count += stop - start
+            start = stop
+            if self.window_count >= self.window_size:
+                if self.windows:
+                    self.score_floor = float(np.quantile(self.window_scores, self.calibration_quantile))
+                self.reference_mass, self.latest_mass = self.latest_mass, np.zeros_like(self.latest_mass)
+                self.window_count = 0
+                self.windows += 1
+
+
+class OnlineAnomalyDetector:
+    """
+    Détecteur incrémental : chaque lot est d'abord noté puis appris (évaluation
+    prequentielle), sans réentraînement complet. Les caractéristiques sont centrées et
+    réduites par un RunningScaler, bornées à ±clip écarts-types puis ramenées dans [0, 1]
+    pour les half-space trees.
+    """
+
+    def __init__(self, n_features: int, config: Optional[dict] = None):
+        config = config or ONLINE_DETECTOR_CONFIG
+        self.clip = config['clip']
+        self.scaler = RunningScaler(n_features)
+        self.forest = HalfSpaceTrees(
+            n_features,
+            n_trees=config['n_trees'],
+            height=config['height'],
+            window_size=config['window_size'],
+            size_limit=config['size_limit'],
+            calibration_quantile=config['calibration_quantile'],
+            seed=config.get('seed')
+        )
+        # Horodatage du dernier événement appris : un événement relu n'est pas réappris
+        self.last_timestamp = float('-inf')
+
+    @property
+    def is_ready(self) -> bool:
+        return self.forest.is_ready
+
+    @property
+    def n_features(self) -> int:
+        return len(self.scaler.mean)
+
+    def normalize(self, X: np.ndarray) -> np.ndarray:
+        scaled = np.clip(self.scaler.transform(X), -self.clip, self.clip)
+        return (scaled + self.clip) / (2 * self.clip)
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        """Score calibré dans [0, 1] ; nul tant que deux fenêtres complètes n'ont pas été vues"""
+        if not self.is_ready:
+            return np.zeros(len(X))
+        return self.forest.score(self.normalize(X))
+
+    def learn(self, X: np.ndarray, timestamps: Optional[np.ndarray] = None):
+        """Apprend les lignes plus récentes que le dernier événement appris (toutes sans timestamps)"""
+        if timestamps is not None:
+            new = timestamps > self.last_timestamp
+            if not new.any():
+                return
+            order = np.argsort(timestamps[new], kind='stable')
+            X = X[new][order]
+            self.last_timestamp = float(timestamps[new].max())
+        if not len(X):
+            return
+        self.scaler.partial_fit(X)
+        self.forest.learn(self.normalize(X))
+
+    def score_and_learn(self, X: np.ndarray, timestamps: Optional[np.ndarray] = None) -> np.ndarray:
+        scores = self.score(X)
+        self.learn(X, timestamps)
+        return scores
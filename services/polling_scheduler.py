@@ -0,0 +1,147 @@
+"""
+Planification adaptative de la collecte NetXMS : un intervalle d'interrogation par nœud
+"""
+import heapq
+import logging
+import random
+import time
+from typing import Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+from monitoring.config.netxms_config import POLLING_CONFIG
+from monitoring.services.status_evaluator import StatusEvaluator
+
+logger = logging.getLogger(__name__)
+
+
+class NodePollState:
+    """État de planification d'un nœud"""
+
+    def __init__(self, interval: float, next_due: float):
+        self.interval = interval
+        self.next_due = next_due
+        self.last_poll: Optional[float] = None
+        self.last_values: Optional[np.ndarray] = None
+
+
+class AdaptivePollingScheduler:
+    """
+    Attribue à chaque nœud son propre intervalle de collecte :
+    - intervalle minimal si une métrique approche d'un seuil ou varie rapidement ;
+    - intervalle de base pour un nœud qui vient de se stabiliser ;
+    - intervalle allongé progressivement (jusqu'au maximum) tant que le nœud reste stable.
+
+    Les échéances sont dispersées aléatoirement (jitter) et un seau à jetons plafonne
+    le nombre global de nœuds interrogés par seconde, sauf pour la première collecte de
+    l'inventaire initial, qui doit afficher tout le parc d'un coup. Un nœud sans aucune
+    métrique (statut INCONNU) n'est pas considéré comme stable et reste à l'intervalle de base.
+    """
+
+    def __init__(self, status_evaluator: Optional[StatusEvaluator] = None, config: Optional[Dict] = None,
+                 seed: Optional[int] = None):
+        self.config = dict(POLLING_CONFIG, **(config or {}))
+        self.status_evaluator = status_evaluator or StatusEvaluator()
+        self.random = random.Random(seed)
+        self.states: Dict[Hashable, NodePollState] = {}
+        self.queue: List = []  # Tas (échéance, nœud), entrées périmées ignorées à la lecture
+        self.tokens = float(self.config['burst'])
+        self.last_refill: Optional[float] = None
+        # Nœuds du premier inventaire pas encore interrogés, exemptés du seau à jetons
+        self.initial_nodes: set = set()
+
+    def _jittered(self, interval: float) -> float:
+        jitter = self.config['jitter']
+        return interval * self.random.uniform(1 - jitter, 1 + jitter)
+
+    def _schedule(self, node_id: Hashable, state: NodePollState, next_due: float):
+        state.next_due = next_due
+        heapq.heappush(self.queue, (next_due, node_id))
+
+    def sync_nodes(self, node_ids: Iterable[Hashable], now: Optional[float] = None):
+        """Aligne la planification sur l'inventaire ; les nouveaux nœuds sont répartis sur un intervalle de base"""
+        now = time.time() if now is None else now
+        node_ids = set(node_ids)
+        # Premier inventaire : tous les nœuds sont interrogés immédiatement
+        initial = not self.states
+        for node_id in list(self.states):
+            if node_id not in node_ids:
+                del self.states[node_id]
+        for node_id in node_ids - set(self.states):
+            state = NodePollState(self.config['base_interval'], now)
+            self.states[node_id] = state
+            if initial:
+                self.initial_nodes.add(node_id)
+            self._schedule(node_id, state, now if initial else now + self.random.uniform(0, self.config['base_interval']))
+        self.initial_nodes &= node_ids
+
+    def _refill(self, now: float):
+        elapsed = 0.0 if self.last_refill is None else max(0.0, now - self.last_refill)
+        self.tokens = min(float(self.config['burst']), self.tokens + elapsed * self.config['max_polls_per_second'])
+        self.last_refill = now
+
+    def due_nodes(self, now: Optional[float] = None) -> List[Hashable]:
+        """Nœuds à interroger maintenant, les plus en retard d'abord, dans la limite du débit global"""
+        now = time.time() if now is None else now
+        self._refill(now)
+        due = []
+        throttled = 0
+        while self.queue and self.queue[0][0] <= now:
+            next_due, node_id = self.queue[0]
+            initial = node_id in self.initial_nodes
+            if not initial and throttled >= int(self.tokens):
+                break
+            heapq.heappop(self.queue)
+            state = self.states.get(node_id)
+            if state is None or state.next_due != next_due:
+                continue  # Nœud supprimé ou replanifié depuis
+            if initial:
+                self.initial_nodes.discard(node_id)
+            else:
+                throttled += 1
+            due.append(node_id)
+        self.tokens -= throttled
+        # Les nœuds dus mais hors budget restent dans la file pour le prochain passage
+        return due
+
+    def record(self, node_id: Hashable, equipment: Dict, now: Optional[float] = None) -> float:
+        """Met à jour l'intervalle d'un nœud après collecte et le replanifie ; retourne le nouvel intervalle"""
+        now = time.time() if now is None else now
+        state = self.states.get(node_id)
+        if state is None:
+            state = self.states[node_id] = NodePollState(self.config['base_interval'], now)
+
+        evaluator = self.status_evaluator
+        values = evaluator.metrics_matrix([equipment.get('metrics', {})])[0]
+        type_code = evaluator.type_code(equipment.get('equipment_type'))
+        applicable = ~np.isnan(values)
+
+        # Proximité des seuils d'avertissement
+        with np.errstate(divide='ignore', invalid='ignore'):
+            proximity = np.where(applicable, values / evaluator.warning[type_code], 0.0)
+        near_threshold = bool(np.nanmax(proximity, initial=0.0) >= self.config['proximity_ratio'])
+        alerting = equipment.get('status') not in (None, 'NORMAL', 'INCONNU')
+
+        # Vitesse de variation depuis la collecte précédente (unités par minute)
+        changing = False
+        if state.last_values is not None and state.last_poll is not None and now > state.last_poll:
+            delta = np.abs(values - state.last_values) * 60.0 / (now - state.last_poll)
+            changing = bool(np.nanmax(np.where(applicable, delta, np.nan), initial=0.0) >= self.config['change_rate'])
+
+        if near_threshold or alerting or changing:
+            interval = self.config['min_interval']
+        elif not applicable.any() or state.interval < self.config['base_interval']:
+            # Aucune métrique exploitable : pas de preuve de stabilité, pas d'allongement
+            interval = self.config['base_interval']
+        else:
+            interval = min(self.config['max_interval'], state.interval * self.config['backoff_factor'])
+
+        state.interval = interval
+        state.last_poll = now
+        state.last_values = values
+        self._schedule(node_id, state, now + self._jittered(interval))
+        return interval
+
+    def expected_polls_per_second(self) -> float:
+        """Charge moyenne induite par les intervalles courants"""
+        return sum(1.0 / state.interval for state in self.states.values())
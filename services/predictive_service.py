@@ -20,6 +20,7 @@ from monitoring.config.predictive_config import (
     LOAD_THRESHOLDS, GEO_CONFIG, ML_MODELS_CONFIG, REFRESH_INTERVALS
 )
 from monitoring.services.netxms_service import NetXMSService
+from monitoring.services.equipment_snapshot import EquipmentDelta
 from monitoring.services.wazuh_service import WazuhService
 
 logger = logging.getLogger(__name__)
@@ -42,6 +43,10 @@ class PredictiveService:
         self.historical_data = []
         self.anomaly_history = []
         
+        # Points d'analyse des équipements, tenus à jour par les différences entre collectes
+        self.equipment_points: Dict[int, Dict] = {}
+        self.netxms_service.subscribe_deltas(self.apply_equipment_delta)
+        
         # Initialisation des modèles
         self.initialize_models()
         
@@ -106,76 +111,95 @@ class PredictiveService:
         data = []
         
         try:
-            # Données NetXMS (équipements)
-            equipment_data = self.netxms_service.get_all_equipment_data()
-            for equipment in equipment_data:
-                metrics = equipment.get('metrics', {})
-                
-                # Caractéristiques temporelles
-                timestamp = datetime.now()
-                hour = timestamp.hour
-                weekday = timestamp.weekday()
-                
-                # Caractéristiques de charge
-                cpu = metrics.get('cpu_utilization', {}).get('value', 0)
-                ram = metrics.get('memory_utilization', {}).get('value', 0)
-                disk = metrics.get('disk_utilization', {}).get('value', 0)
-                network = metrics.get('network_traffic', {}).get('value', 0)
-                
-                # Vérification des pics de charge
-                load_spike_score = self.detect_load_spike(cpu, ram, disk, network)
-                
-                # Vérification activité hors horaires
-                off_hours_score = self.detect_off_hours_activity(hour, weekday)
-                
-                data_point = {
-                    'equipment_id': equipment['id'],
-                    'equipment_name': equipment['name'],
-                    'timestamp': timestamp.timestamp(),
-                    'hour': hour,
-                    'weekday': weekday,
-                    'cpu': cpu,
-                    'ram': ram,
-                    'disk': disk,
-                    'network': network,
-                    'load_spike_score': load_spike_score,
-                    'off_hours_score': off_hours_score,
-                    'data_type': 'equipment'
-                }
-                data.append(data_point)
-            
-            # Données Wazuh (activité utilisateur)
-            user_activity = self.wazuh_service.get_user_activity(hours=24)
-            for event in user_activity:
-                timestamp = event.get('timestamp', 0)
-                event_datetime = datetime.fromtimestamp(timestamp)
-                hour = event_datetime.hour
-                weekday = event_datetime.weekday()
+            # Données NetXMS (équipements) : la collecte met à jour equipment_points
+            # via apply_equipment_delta, seuls les nœuds modifiés sont recalculés
+            self.netxms_service.get_all_equipment_data()
+            
+            # Caractéristiques temporelles, communes à tous les équipements
+            timestamp = datetime.now()
+            hour = timestamp.hour
+            weekday = timestamp.weekday()
+            
+            # Vérification activité hors horaires
+            off_hours_score = self.detect_off_hours_activity(hour, weekday)
+            
+            for point in self.equipment_points.values():
+                data.append(dict(
+                    point,
+                    timestamp=timestamp.timestamp(),
+                    hour=hour,
+                    weekday=weekday,
+                    off_hours_score=off_hours_score
+                ))
+            
+            # Données Wazuh (activité utilisateur), lues page par page ; retenues seulement
+            # si toutes les pages ont été lues
+            activity = []
+            try:
+                for batch in self.wazuh_service.iter_user_activity(hours=24):
+                    for event in batch:
+                        timestamp = event.get('timestamp', 0)
+                        event_datetime = datetime.fromtimestamp(timestamp)
+                        hour = event_datetime.hour
+                        weekday = event_datetime.weekday()
                 
-                # Vérification activité hors horaires
-                off_hours_score = self.detect_off_hours_activity(hour, weekday)
+                        # Vérification activité hors horaires
+                        off_hours_score = self.detect_off_hours_activity(hour, weekday)
                 
-                # Vérification géolocalisation (simulée)
-                geo_anomaly_score = self.detect_geolocation_anomaly(event)
+                        # Vérification géolocalisation (simulée)
+                        geo_anomaly_score = self.detect_geolocation_anomaly(event)
                 
-                data_point = {
-                    'event_id': event.get('id', ''),
-                    'user': event.get('user', ''),
-                    'event_type': event.get('event_type', ''),
-                    'timestamp': timestamp,
-                    'hour': hour,
-                    'weekday': weekday,
-                    'off_hours_score': off_hours_score,
-                    'geo_anomaly_score': geo_anomaly_score,
-                    'data_type': 'user_activity'
-                }
-                data.append(data_point)
+                        data_point = {
+                            'event_id': event.get('id', ''),
+                            'user': event.get('user', ''),
+                            'event_type': event.get('event_type', ''),
+                            'timestamp': timestamp,
+                            'hour': hour,
+                            'weekday': weekday,
+                            'off_hours_score': off_hours_score,
+                            'geo_anomaly_score': geo_anomaly_score,
+                            'data_type': 'user_activity'
+                        }
+                        activity.append(data_point)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Activité utilisateur incomplète, ignorée pour cette analyse: {e}")
+            else:
+                data.extend(activity)
                 
         except Exception as e:
             logger.error(f"Erreur lors de la collecte des données: {e}")
             
         return data
         
+    def apply_equipment_delta(self, delta: EquipmentDelta):
+        """Met à jour les points d'analyse des équipements ajoutés, modifiés ou supprimés"""
+        for node_id in delta.removed:
+            self.equipment_points.pop(node_id, None)
+        for equipment in delta.added + delta.changed:
+            self.equipment_points[equipment['id']] = self.build_equipment_point(equipment)
+            
+    def build_equipment_point(self, equipment: Dict) -> Dict:
+        """Caractéristiques de charge d'un équipement (hors caractéristiques temporelles)"""
+        metrics = equipment.get('metrics', {})
+        
+        # Caractéristiques de charge
+        cpu = metrics.get('cpu_utilization', {}).get('value', 0)
+        ram = metrics.get('memory_utilization', {}).get('value', 0)
+        disk = metrics.get('disk_utilization', {}).get('value', 0)
+        network = metrics.get('network_traffic', {}).get('value', 0)
+        
+        return {
+            'equipment_id': equipment['id'],
+            'equipment_name': equipment['name'],
+            'cpu': cpu,
+            'ram': ram,
+            'disk': disk,
+            'network': network,
+            # Vérification des pics de charge
+            'load_spike_score': self.detect_load_spike(cpu, ram, disk, network),
+            'data_type': 'equipment'
+        }
+        
     def detect_load_spike(self, cpu: float, ram: float, disk: float, network: float) -> float:
         """Détecte les pics de charge soudains"""
         score = 0.0
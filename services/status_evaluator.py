@@ -0,0 +1,154 @@
+"""
+Évaluation vectorisée des seuils et du statut de l'ensemble des équipements
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from monitoring.config.netxms_config import METRICS_CONFIG, EQUIPMENT_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Codes de statut, ordonnés par gravité
+STATUS_UNKNOWN = -1
+STATUS_NORMAL = 0
+STATUS_WARNING = 1
+STATUS_CRITICAL = 2
+
+STATUS_LABELS = {
+    STATUS_UNKNOWN: 'INCONNU',
+    STATUS_NORMAL: 'NORMAL',
+    STATUS_WARNING: 'ATTENTION',
+    STATUS_CRITICAL: 'CRITIQUE'
+}
+
+
+def exceeds(values, thresholds):
+    """Dépassement d'un seuil : une valeur égale au seuil l'atteint déjà"""
+    return values >= thresholds
+
+
+def resolve_equipment_type(node: Dict) -> Optional[str]:
+    """Type d'équipement (clé de EQUIPMENT_TYPES) déclaré par le nœud, None sinon"""
+    declared = node.get('equipment_type') or node.get('type')
+    return declared if declared in EQUIPMENT_TYPES else None
+
+
+class StatusResult:
+    """Résultat d'une évaluation : statut par nœud, niveau par cellule et différences avec l'évaluation précédente"""
+
+    def __init__(self, status: np.ndarray, levels: np.ndarray, changed_rows: np.ndarray, changed_cells: np.ndarray):
+        self.status = status              # (nœuds,) codes STATUS_*
+        self.levels = levels              # (nœuds × métriques) 0 normal, 1 avertissement, 2 critique
+        self.changed_rows = changed_rows  # Indices des nœuds dont le statut a changé
+        self.changed_cells = changed_cells  # (k × 2) couples (ligne, colonne) dont le niveau a changé
+
+    @property
+    def breaches(self) -> np.ndarray:
+        """Cellules (ligne, colonne) dépassant au moins le seuil d'avertissement"""
+        return np.argwhere(self.levels > STATUS_NORMAL)
+
+    def labels(self) -> List[str]:
+        return [STATUS_LABELS[code] for code in self.status.tolist()]
+
+
+class StatusEvaluator:
+    """
+    Compare en une passe NumPy la matrice (nœuds × métriques) des valeurs courantes aux
+    seuils d'avertissement et critiques. Les seuils sont rangés dans des matrices
+    (types × métriques) : la dernière ligne correspond aux nœuds de type inconnu, qui
+    utilisent les seuils de METRICS_CONFIG. Toutes les métriques sont évaluées, quel que
+    soit le type.
+    """
+
+    def __init__(self, metrics: Optional[Iterable[str]] = None):
+        self.metrics = list(metrics or METRICS_CONFIG.keys())
+        self.metric_index = {metric: column for column, metric in enumerate(self.metrics)}
+        self.type_names = list(EQUIPMENT_TYPES.keys())
+        self.type_index = {type_name: code for code, type_name in enumerate(self.type_names)}
+        self.unknown_type = len(self.type_names)
+
+        shape = (len(self.type_names) + 1, len(self.metrics))
+        self.warning = np.full(shape, np.inf)
+        self.critical = np.full(shape, np.inf)
+
+        for column, metric in enumerate(self.metrics):
+            metric_config = METRICS_CONFIG.get(metric, {})
+            self.warning[:, column] = metric_config.get('threshold_warning', np.inf)
+            self.critical[:, column] = metric_config.get('threshold_critical', np.inf)
+
+        for type_name, type_config in EQUIPMENT_TYPES.items():
+            for metric, overrides in type_config.get('thresholds', {}).items():
+                self.set_thresholds(metric, overrides.get('threshold_warning'), overrides.get('threshold_critical'), type_name)
+
+        self.previous: Optional[StatusResult] = None
+
+    def type_code(self, equipment_type: Optional[str]) -> int:
+        return self.type_index.get(equipment_type, self.unknown_type)
+
+    def set_thresholds(self, metric: str, warning: Optional[float] = None, critical: Optional[float] = None,
+                       equipment_type: Optional[str] = None):
+        """Modifie les seuils d'une métrique pour un type d'équipement, ou pour tous les types si equipment_type est None"""
+        column = self.metric_index.get(metric)
+        if column is None:
+            return
+        rows = slice(None) if equipment_type is None else self.type_code(equipment_type)
+        if warning is not None:
+            self.warning[rows, column] = warning
+        if critical is not None:
+            self.critical[rows, column] = critical
+
+    def is_critical(self, value: float, type_code: int, column: int) -> bool:
+        """Même règle que evaluate pour une seule cellule (coloration du tableau)"""
+        return bool(exceeds(value, self.critical[type_code, column]))
+
+    def evaluate(self, values: np.ndarray, type_codes: np.ndarray, track_changes: bool = True) -> StatusResult:
+        """
+        values : matrice (nœuds × métriques), NaN pour une métrique absente
+        type_codes : code de type de chaque nœud (voir type_code)
+        track_changes : compare à l'évaluation précédente et la remplace
+        """
+        values = np.asarray(values, dtype=np.float64)
+        type_codes = np.asarray(type_codes, dtype=np.intp)
+
+        valid = ~np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            critical = valid & exceeds(values, self.critical[type_codes])
+            warning = valid & exceeds(values, self.warning[type_codes])
+
+        levels = np.where(critical, STATUS_CRITICAL, np.where(warning, STATUS_WARNING, STATUS_NORMAL)).astype(np.int8)
+        status = levels.max(axis=1, initial=STATUS_NORMAL).astype(np.int8)
+        status[~valid.any(axis=1)] = STATUS_UNKNOWN
+
+        previous = self.previous if track_changes else None
+        if previous is not None and previous.levels.shape == levels.shape:
+            changed_rows = np.flatnonzero(previous.status != status)
+            changed_cells = np.argwhere(previous.levels != levels)
+        else:
+            changed_rows = np.arange(len(status))
+            changed_cells = np.argwhere(np.ones(levels.shape, dtype=bool))
+
+        result = StatusResult(status, levels, changed_rows, changed_cells)
+        if track_changes:
+            self.previous = result
+        return result
+
+    def metrics_matrix(self, metrics_list: List[Dict]) -> np.ndarray:
+        """Construit la matrice des valeurs à partir de dictionnaires {métrique: {'value': ...}} ou {métrique: valeur}"""
+        values = np.full((len(metrics_list), len(self.metrics)), np.nan)
+        for row, metrics in enumerate(metrics_list):
+            for metric, data in metrics.items():
+                column = self.metric_index.get(metric)
+                if column is None:
+                    continue
+                value = data.get('value') if isinstance(data, dict) else data
+                if value is not None:
+                    values[row, column] = value
+        return values
+
+    def evaluate_equipment(self, equipment_data: List[Dict], track_changes: bool = True) -> StatusResult:
+        """Évalue une liste d'équipements au format de NetXMSService.get_all_equipment_data"""
+        values = self.metrics_matrix([equipment.get('metrics', {}) for equipment in equipment_data])
+        type_codes = np.array([self.type_code(equipment.get('equipment_type')) for equipment in equipment_data], dtype=np.intp)
+        return self.evaluate(values, type_codes, track_changes)
@@ -2,20 +2,85 @@
 Service pour l'API Wazuh avec analyse ML
 """
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 import logging
 import numpy as np
+from scipy import sparse
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-from sklearn.feature_extraction.text import TfidfVectorizer
 import pickle
 import os
-from monitoring.config.wazuh_config import WAZUH_CONFIG, EVENT_TYPES, ML_THRESHOLDS
+from monitoring.config.wazuh_config import WAZUH_CONFIG, EVENT_TYPES, ML_THRESHOLDS, ONLINE_DETECTOR_CONFIG
+from monitoring.services.event_features import EventBatch, FEATURE_COUNT, MESSAGE_FEATURE_COUNT, MESSAGE_VECTORIZER
+from monitoring.services.online_detector import OnlineAnomalyDetector
 
 logger = logging.getLogger(__name__)
 
+# Points de suspicion ajoutés selon le type d'événement
+EVENT_TYPE_SCORES = {
+    'network_access': 0.4,
+    'program_execution': 0.2,
+    'file_access': 0.1
+}
+
+
+def event_timestamp(event: Dict) -> float:
+    """Horodatage d'un événement en secondes epoch (epoch s/ms ou ISO 8601), 0 si absent"""
+    value = event.get('timestamp')
+    if isinstance(value, (int, float)):
+        return value / 1000.0 if value > 1e11 else float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+class ScoreCache:
+    """Résultats de scoring indexés par (id d'événement, version du modèle) : LRU borné avec durée de vie"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key) -> Optional[tuple]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value: tuple):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
 class WazuhService:
     def __init__(self):
         self.api_url = WAZUH_CONFIG['api_url']
@@ -23,15 +88,31 @@ class WazuhService:
         self.password = WAZUH_CONFIG['password']
         self.timeout = WAZUH_CONFIG['timeout']
         self.verify_ssl = WAZUH_CONFIG['verify_ssl']
+        self.page_size = WAZUH_CONFIG.get('page_size', 1000)
+        self.max_workers = WAZUH_CONFIG.get('max_workers', 4)
+        self.user_activity_filters = WAZUH_CONFIG.get('user_activity_filters', [])
+        self.user_activity_query = WAZUH_CONFIG.get('user_activity_query')
         self.session = requests.Session()
         self.session.auth = (self.username, self.password)
         self.session.verify = self.verify_ssl
+        # Pool de connexions dimensionné pour les requêtes simultanées
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         
         # Modèles ML
         self.isolation_forest = None
         self.scaler = StandardScaler()
-        self.vectorizer = TfidfVectorizer(max_features=100, stop_words='english')
+        # Hachage du contenu des messages : sans vocabulaire, donc rien à entraîner ni à sauvegarder
+        self.vectorizer = MESSAGE_VECTORIZER
         self.ml_model_path = 'monitoring/models/user_activity_model.pkl'
+        # Détecteur incrémental, mis à jour à chaque analyse en parallèle des réentraînements
+        self.online_detector = None
+        self.online_risk = ONLINE_DETECTOR_CONFIG['risk_source'] == 'online'
+        # Version du modèle, incrémentée à chaque réentraînement ; les scores en cache en dépendent
+        self.model_version = 0
+        self.score_cache = ScoreCache(WAZUH_CONFIG.get('score_cache_size', 200000),
+                                      WAZUH_CONFIG.get('score_cache_ttl', 48 * 3600))
         
         # Initialisation des modèles
         self.initialize_ml_models()
@@ -49,7 +130,7 @@ class WazuhService:
                     models = pickle.load(f)
                     self.isolation_forest = models['isolation_forest']
                     self.scaler = models['scaler']
-                    self.vectorizer = models['vectorizer']
+                    self.online_detector = models.get('online_detector')
                 logger.info("Modèles ML chargés depuis le fichier")
             else:
                 self.isolation_forest = IsolationForest(
@@ -60,6 +141,8 @@ class WazuhService:
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation des modèles ML: {e}")
             self.isolation_forest = IsolationForest(contamination=0.1, random_state=42)
+        if self.online_detector is None and ONLINE_DETECTOR_CONFIG['enabled']:
+            self.online_detector = OnlineAnomalyDetector(FEATURE_COUNT + MESSAGE_FEATURE_COUNT)
             
     def save_ml_models(self):
         """Sauvegarde les modèles ML"""
@@ -68,7 +151,7 @@ class WazuhService:
             models = {
                 'isolation_forest': self.isolation_forest,
                 'scaler': self.scaler,
-                'vectorizer': self.vectorizer
+                'online_detector': self.online_detector
             }
             with open(self.ml_model_path, 'wb') as f:
                 pickle.dump(models, f)
@@ -78,200 +161,377 @@ class WazuhService:
             
     def get_events(self, hours: int = 24) -> List[Dict]:
         """
-        Récupère les événements depuis l'API Wazuh
+        Récupère tous les événements des dernières heures (toutes les pages).
+        Pour de grands volumes, préférer iter_events qui ne garde qu'une page en mémoire.
+        Liste vide si une page n'a pas pu être lue.
         """
         try:
-            end_time = datetime.now()
-            start_time = end_time - timedelta(hours=hours)
-            
-            params = {
-                'from': int(start_time.timestamp()),
-                'to': int(end_time.timestamp()),
-                'limit': 1000
-            }
-            
-            response = self.session.get(
-                f"{self.api_url}/events",
-                params=params,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            return response.json().get('data', [])
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erreur lors de la récupération des événements: {e}")
+            return [event for batch in self.iter_events(hours) for event in batch]
+        except requests.exceptions.RequestException:
             return []
-            
-    def get_user_activity(self, hours: int = 24) -> List[Dict]:
+
+    def parse_events_page(self, payload: Dict) -> Tuple[List[Dict], Optional[int], Optional[object]]:
         """
-        Récupère l'activité utilisateur spécifique
+        (événements, total, curseur) d'une réponse de /events. 'data' est soit la liste des
+        événements, soit le format de l'API Wazuh (affected_items, total_affected_items).
+        Le curseur (search_after) est renvoyé par les serveurs qui le proposent.
         """
-        if self.simulation:
-            return [
-                {'timestamp': '2024-01-01T12:00:00', 'user': 'simu', 'type': 'login', 'message': 'Connexion simulée', 'agent': 'PC-SIMU', 'severity': 1, 'score': 0.1, 'risk': 'Normal'}
-            ]
-        try:
-            # Filtres pour les événements utilisateur
-            user_filters = [
-                'event_type:login',
-                'event_type:program_execution',
-                'event_type:file_access',
-                'event_type:network_access'
-            ]
-            
-            events = []
-            for filter_query in user_filters:
-                params = {
-                    'q': filter_query,
-                    'from': int((datetime.now() - timedelta(hours=hours)).timestamp()),
-                    'to': int(datetime.now().timestamp()),
-                    'limit': 500
-                }
-                
+        data = payload.get('data', [])
+        total = payload.get('total')
+        cursor = payload.get('search_after')
+        if isinstance(data, dict):
+            total = data.get('total_affected_items', total)
+            cursor = data.get('search_after', cursor)
+            data = data.get('affected_items', [])
+        return data, total, cursor
+
+    def iter_events(self, hours: int = 24, query: Optional[str] = None,
+                    page_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Parcourt page par page les événements des dernières heures (filtre q optionnel).
+
+        La fenêtre est figée au premier appel pour que les pages restent cohérentes. Le
+        curseur search_after est suivi s'il est fourni, sinon l'offset ; la pagination
+        s'arrête sur une page incomplète ou lorsque le total annoncé est atteint. Une seule
+        page est en mémoire à la fois. Une erreur HTTP en cours de parcours est levée
+        (RequestException) : un résultat tronqué n'est jamais présenté comme complet.
+        """
+        page_size = page_size or self.page_size
+        end_time = datetime.now()
+        start_time = end_time - timedelta(hours=hours)
+        params = {
+            'from': int(start_time.timestamp()),
+            'to': int(end_time.timestamp()),
+            'limit': page_size
+        }
+        if query:
+            params['q'] = query
+
+        offset = 0
+        cursor = None
+        while True:
+            page_params = dict(params)
+            if cursor is not None:
+                page_params['search_after'] = json.dumps(cursor) if isinstance(cursor, (list, dict)) else cursor
+            else:
+                page_params['offset'] = offset
+            try:
                 response = self.session.get(
                     f"{self.api_url}/events",
-                    params=params,
+                    params=page_params,
                     timeout=self.timeout
                 )
                 response.raise_for_status()
-                events.extend(response.json().get('data', []))
-                
-            return events
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erreur lors de la récupération de l'activité utilisateur: {e}")
+                events, total, cursor = self.parse_events_page(response.json())
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Erreur lors de la récupération des événements (offset {offset}): {e}")
+                raise
+            if not events:
+                return
+            yield events
+            offset += len(events)
+            if len(events) < page_size or (total is not None and offset >= total):
+                return
+
+    def iter_user_activity(self, hours: int = 24) -> Iterator[List[Dict]]:
+        """
+        Pages des événements d'activité utilisateur (connexions, programmes, fichiers, réseau).
+
+        Avec WAZUH_CONFIG['user_activity_query'], une seule requête couvre tous les types ;
+        sinon chaque filtre est parcouru dans son propre thread sur le pool de connexions et
+        les pages sont transmises dès leur arrivée. Les événements déjà reçus (même id) sont
+        écartés. L'ordre des pages n'est pas garanti : get_user_activity les trie. Comme
+        iter_events, lève RequestException si une page n'a pas pu être lue.
+        """
+        if self.simulation:
+            yield [
+                {'timestamp': '2024-01-01T12:00:00', 'user': 'simu', 'type': 'login', 'message': 'Connexion simulée', 'agent': 'PC-SIMU', 'severity': 1, 'score': 0.1, 'risk': 'Normal'}
+            ]
+            return
+        if self.user_activity_query:
+            pages = self.iter_events(hours, self.user_activity_query)
+        else:
+            pages = self.iter_concurrent_events(hours, self.user_activity_filters)
+
+        seen_ids = set()
+        for events in pages:
+            unique = []
+            for event in events:
+                event_id = event.get('id')
+                if event_id not in (None, ''):
+                    if event_id in seen_ids:
+                        continue
+                    seen_ids.add(event_id)
+                unique.append(event)
+            if unique:
+                yield unique
+
+    def iter_concurrent_events(self, hours: int, queries: List[str]) -> Iterator[List[Dict]]:
+        """
+        Parcourt plusieurs filtres en parallèle (max_workers threads) et fournit leurs pages
+        au fil de l'eau. La file est bornée : un consommateur lent freine les requêtes au
+        lieu d'accumuler les pages en mémoire. Fermer le générateur arrête les threads.
+        L'erreur d'un filtre est levée dans le consommateur, qui arrête les autres threads.
+        """
+        if not queries:
+            return
+        pages: queue.Queue = queue.Queue(maxsize=2 * len(queries))
+        stop = threading.Event()
+        done = object()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fetch(query: str):
+            if stop.is_set():
+                return
+            try:
+                for events in self.iter_events(hours, query):
+                    if not put(events):
+                        return
+            except Exception as e:
+                logger.error(f"Erreur lors de la récupération des événements ({query}): {e}")
+                put(e)
+            finally:
+                put(done)
+
+        workers = max(1, min(self.max_workers, len(queries)))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            for query in queries:
+                executor.submit(fetch, query)
+            remaining = len(queries)
+            while remaining:
+                item = pages.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_user_activity(self, hours: int = 24) -> List[Dict]:
+        """
+        Récupère l'activité utilisateur spécifique, sans doublons, du plus récent au plus ancien.
+        Liste vide si une page n'a pas pu être lue : une activité partielle n'est pas analysée.
+        """
+        try:
+            events = [event for batch in self.iter_user_activity(hours) for event in batch]
+        except requests.exceptions.RequestException:
             return []
+        events.sort(key=event_timestamp, reverse=True)
+        return events
             
     def analyze_event_with_ml(self, event: Dict) -> Dict:
         """
-        Analyse un événement avec les modèles ML
+        Analyse un événement avec les modèles ML (voir analyze_events_with_ml pour un lot)
+        """
+        analysis = self.analyze_events_with_ml([event])
+        return {
+            'suspicious_score': float(analysis['suspicious_score'][0]),
+            'anomaly_score': float(analysis['anomaly_score'][0]),
+            'online_score': float(analysis['online_score'][0]),
+            'risk_level': str(analysis['risk_level'][0])
+        }
+
+    def analyze_events_with_ml(self, events: List[Dict], batch: Optional[EventBatch] = None) -> Dict[str, np.ndarray]:
+        """
+        Analyse un lot d'événements en une passe : une seule matrice de caractéristiques,
+        un seul appel au scaler et à l'Isolation Forest, puis scores et niveaux de risque
+        calculés sur des tableaux. Retourne les colonnes 'suspicious_score',
+        'anomaly_score', 'online_score' et 'risk_level', alignées sur events, ainsi que le
+        masque 'scored' des événements réellement évalués par un modèle. Les autres
+        (caractéristiques illisibles, modèle non entraîné ou en erreur) restent à 0 / 'normal'.
+        batch permet de réutiliser les colonnes déjà calculées pour ces événements.
         """
+        batch = batch or EventBatch(events)
+        count = len(batch)
+        anomaly_scores = np.zeros(count)
+        suspicious_scores = np.zeros(count)
+        online_scores = np.zeros(count)
+        risk_scores = anomaly_scores
+        valid = batch.valid
+        scored = False
+
+        if valid.any():
+            scored = True
+            try:
+                # Normalisation des caractéristiques, ajout du contenu des messages et prédiction avec Isolation Forest
+                features_scaled = self.scaler.transform(batch.features[valid])
+                n_features = getattr(self.isolation_forest, 'n_features_in_', FEATURE_COUNT)
+                anomaly_scores[valid] = self.isolation_forest.decision_function(
+                    batch.model_matrix(features_scaled, valid, n_features)
+                )
+            except Exception as e:
+                logger.error(f"Erreur lors de l'analyse ML: {e}")
+                anomaly_scores[:] = 0.0
+                scored = False
+
+            online_scores = self.update_online_detector(batch)
+            if self.online_risk and self.online_detector is not None and self.online_detector.is_ready:
+                risk_scores = online_scores
+                scored = True
+
+            if scored:
+                suspicious_scores = self.calculate_suspicious_scores(
+                    batch.event_types, np.where(valid, batch.severities, 0.0), batch.hours, risk_scores
+                )
+                suspicious_scores[~valid] = 0.0
+
+        return {
+            'suspicious_score': suspicious_scores,
+            'anomaly_score': anomaly_scores,
+            'online_score': online_scores,
+            'risk_level': self.determine_risk_levels(suspicious_scores, risk_scores),
+            'scored': valid & scored
+        }
+
+    def score_events(self, events: List[Dict]) -> Dict[str, np.ndarray]:
+        """
+        Comme analyze_events_with_ml, mais en réutilisant les résultats déjà calculés pour
+        un événement de même id avec la version courante du modèle : seuls les nouveaux
+        événements (ou ceux sans id) sont analysés, en un seul lot. Seuls les résultats
+        réellement évalués par un modèle sont mis en cache : un événement noté par défaut
+        (modèle non entraîné ou en erreur) sera réanalysé au prochain appel.
+        """
+        version = self.model_version
+        results: List[Optional[tuple]] = [None] * len(events)
+        misses = []
+        for row, event in enumerate(events):
+            event_id = event.get('id')
+            if event_id not in (None, ''):
+                results[row] = self.score_cache.get((event_id, version))
+            if results[row] is None:
+                misses.append(row)
+
+        if misses:
+            analysis = self.analyze_events_with_ml([events[row] for row in misses])
+            new_results = zip(
+                analysis['suspicious_score'].tolist(), analysis['anomaly_score'].tolist(),
+                analysis['online_score'].tolist(), analysis['risk_level'].tolist()
+            )
+            for row, result, scored in zip(misses, new_results, analysis['scored'].tolist()):
+                results[row] = result
+                event_id = events[row].get('id')
+                if scored and event_id not in (None, ''):
+                    self.score_cache.put((event_id, version), result)
+            logger.debug(f"{len(misses)} événements analysés, {len(events) - len(misses)} lus dans le cache")
+
+        suspicious_scores, anomaly_scores, online_scores, risk_levels = zip(*results) if results else ((),) * 4
+        return {
+            'suspicious_score': np.array(suspicious_scores, dtype=float),
+            'anomaly_score': np.array(anomaly_scores, dtype=float),
+            'online_score': np.array(online_scores, dtype=float),
+            'risk_level': np.array(risk_levels, dtype=object)
+        }
+
+    def update_online_detector(self, batch: EventBatch) -> np.ndarray:
+        """
+        Note les événements valides du lot avec le détecteur incrémental puis les lui fait
+        apprendre (seuls les événements plus récents que le dernier appris sont ajoutés).
+        Retourne un score calibré dans [0, 1] par événement : nul pour une activité
+        habituelle ou tant que le détecteur n'est pas prêt.
+        """
+        scores = np.zeros(len(batch))
+        if self.online_detector is None:
+            return scores
+        valid = batch.valid
         try:
-            # Extraction des caractéristiques
-            features = self.extract_features(event)
-            
-            if not features:
-                return {
-                    'suspicious_score': 0.0,
-                    'anomaly_score': 0.0,
-                    'risk_level': 'normal'
-                }
-            
-            # Normalisation des caractéristiques
-            features_scaled = self.scaler.transform([features])
-            
-            # Prédiction avec Isolation Forest
-            anomaly_score = self.isolation_forest.decision_function(features_scaled)[0]
-            
-            # Calcul du score de suspicion
-            suspicious_score = self.calculate_suspicious_score(event, anomaly_score)
-            
-            # Détermination du niveau de risque
-            risk_level = self.determine_risk_level(suspicious_score, anomaly_score)
-            
-            return {
-                'suspicious_score': suspicious_score,
-                'anomaly_score': anomaly_score,
-                'risk_level': risk_level
-            }
+            X = batch.model_matrix(batch.features[valid], valid, self.online_detector.n_features)
+            if sparse.issparse(X):
+                X = X.toarray()
+            scores[valid] = self.online_detector.score_and_learn(X, batch.timestamps[valid])
         except Exception as e:
-            logger.error(f"Erreur lors de l'analyse ML: {e}")
-            return {
-                'suspicious_score': 0.0,
-                'anomaly_score': 0.0,
-                'risk_level': 'normal'
-            }
-            
+            logger.error(f"Erreur lors de la mise à jour du détecteur incrémental: {e}")
+        return scores
+
+    def extract_feature_matrix(self, events: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Matrice (n, FEATURE_COUNT) des caractéristiques d'un lot d'événements et masque
+        des lignes valides (les lignes invalides sont nulles)
+        """
+        batch = EventBatch(events)
+        return batch.features, batch.valid
+
     def extract_features(self, event: Dict) -> List[float]:
         """
-        Extrait les caractéristiques d'un événement pour l'analyse ML
+        Extrait les caractéristiques d'un événement pour l'analyse ML (liste vide si illisible)
         """
-        features = []
-        
-        try:
-            # Caractéristiques temporelles
-            timestamp = event.get('timestamp', 0)
-            hour = datetime.fromtimestamp(timestamp).hour
-            features.extend([
-                hour / 24.0,  # Heure normalisée
-                datetime.fromtimestamp(timestamp).weekday() / 7.0  # Jour de la semaine
-            ])
-            
-            # Caractéristiques de l'utilisateur
-            user = event.get('user', '')
-            features.append(len(user) / 50.0)  # Longueur du nom d'utilisateur
-            
-            # Caractéristiques de l'événement
-            event_type = event.get('event_type', '')
-            features.append(len(event_type) / 20.0)
-            
-            # Caractéristiques du message
-            message = event.get('message', '')
-            features.append(len(message) / 200.0)
-            
-            # Caractéristiques de l'agent
-            agent = event.get('agent', '')
-            features.append(len(agent) / 50.0)
-            
-            # Score de sévérité
-            severity = event.get('severity', 0)
-            features.append(severity / 15.0)
-            
-            return features
-        except Exception as e:
-            logger.error(f"Erreur lors de l'extraction des caractéristiques: {e}")
+        batch = EventBatch([event])
+        if not batch.valid[0]:
+            logger.error(f"Caractéristiques illisibles pour l'événement {event.get('id', '')}")
             return []
+        return batch.features[0].tolist()
             
     def calculate_suspicious_score(self, event: Dict, anomaly_score: float) -> float:
         """
         Calcule un score de suspicion basé sur l'événement et l'anomalie
         """
-        score = 0.0
-        
+        batch = EventBatch([event])
+        return float(self.calculate_suspicious_scores(
+            batch.event_types, [event.get('severity', 0)], batch.hours, [anomaly_score]
+        )[0])
+
+    def calculate_suspicious_scores(self, event_types: List[str], severities, hours, anomaly_scores) -> np.ndarray:
+        """
+        Version vectorisée de calculate_suspicious_score : un score par événement à partir
+        des colonnes type, sévérité (brute), heure locale et score d'anomalie
+        """
+        anomaly_scores = np.asarray(anomaly_scores, dtype=float)
+        severities = np.asarray(severities, dtype=float)
+        hours = np.asarray(hours)
+
         # Score de base basé sur l'anomalie
-        score += abs(anomaly_score) * 0.3
-        
+        score = np.abs(anomaly_scores) * 0.3
+
         # Score basé sur le type d'événement
-        event_type = event.get('event_type', '')
-        if event_type == 'network_access':
-            score += 0.4
-        elif event_type == 'program_execution':
-            score += 0.2
-        elif event_type == 'file_access':
-            score += 0.1
-            
+        score += np.fromiter((EVENT_TYPE_SCORES.get(event_type, 0.0) for event_type in event_types),
+                             dtype=float, count=len(anomaly_scores))
+
         # Score basé sur la sévérité
-        severity = event.get('severity', 0)
-        score += (severity / 15.0) * 0.3
-        
+        score += (severities / 15.0) * 0.3
+
         # Score basé sur l'heure (activité nocturne suspecte)
-        timestamp = event.get('timestamp', 0)
-        hour = datetime.fromtimestamp(timestamp).hour
-        if 22 <= hour or hour <= 6:
-            score += 0.2
-            
-        return min(score, 1.0)
-        
+        score += np.where((hours >= 22) | (hours <= 6), 0.2, 0.0)
+
+        return np.minimum(score, 1.0)
+
     def determine_risk_level(self, suspicious_score: float, anomaly_score: float) -> str:
         """
         Détermine le niveau de risque basé sur les scores
         """
-        if suspicious_score >= ML_THRESHOLDS['critical_score'] or abs(anomaly_score) >= ML_THRESHOLDS['anomaly_threshold']:
-            return 'critical'
-        elif suspicious_score >= ML_THRESHOLDS['suspicious_score']:
-            return 'suspicious'
-        else:
-            return 'normal'
-            
+        return str(self.determine_risk_levels([suspicious_score], [anomaly_score])[0])
+
+    def determine_risk_levels(self, suspicious_scores, anomaly_scores) -> np.ndarray:
+        """Version vectorisée de determine_risk_level"""
+        suspicious_scores = np.asarray(suspicious_scores, dtype=float)
+        anomaly_scores = np.asarray(anomaly_scores, dtype=float)
+        critical = (suspicious_scores >= ML_THRESHOLDS['critical_score']) | \
+                   (np.abs(anomaly_scores) >= ML_THRESHOLDS['anomaly_threshold'])
+        suspicious = suspicious_scores >= ML_THRESHOLDS['suspicious_score']
+        return np.select([critical, suspicious], ['critical', 'suspicious'], default='normal')
+
     def get_all_user_activity(self) -> List[Dict]:
         """
         Récupère et analyse toute l'activité utilisateur
+        (seuls les événements absents du cache de scoring sont analysés)
         """
         events = self.get_user_activity()
+        analysis = self.score_events(events)
         analyzed_events = []
         
-        for event in events:
-            # Analyse ML
-            ml_analysis = self.analyze_event_with_ml(event)
-            
+        for event, suspicious_score, anomaly_score, online_score, risk_level in zip(
+                events, analysis['suspicious_score'].tolist(), analysis['anomaly_score'].tolist(),
+                analysis['online_score'].tolist(), analysis['risk_level'].tolist()):
             # Enrichissement de l'événement
             enriched_event = {
                 'id': event.get('id', ''),
@@ -281,10 +541,11 @@ class WazuhService:
                 'message': event.get('message', ''),
                 'agent': event.get('agent', ''),
                 'severity': event.get('severity', 0),
-                'suspicious_score': ml_analysis['suspicious_score'],
-                'anomaly_score': ml_analysis['anomaly_score'],
-                'risk_level': ml_analysis['risk_level'],
-                'datetime': datetime.fromtimestamp(event.get('timestamp', 0)).strftime('%Y-%m-%d %H:%M:%S')
+                'suspicious_score': suspicious_score,
+                'anomaly_score': anomaly_score,
+                'risk_level': risk_level,
+                'online_score': online_score,
+                'datetime': datetime.fromtimestamp(event_timestamp(event)).strftime('%Y-%m-%d %H:%M:%S')
             }
             
             analyzed_events.append(enriched_event)
@@ -294,33 +555,32 @@ class WazuhService:
         
         return analyzed_events
         
-    def train_ml_models(self, training_data: List[Dict]):
+    def train_ml_models(self, training_data: List[Dict], batch: Optional[EventBatch] = None):
         """
         Entraîne les modèles ML avec de nouvelles données
+        (batch : colonnes déjà extraites de training_data, réutilisées si fournies)
         """
         try:
             if not training_data:
                 return
                 
             # Extraction des caractéristiques
-            features_list = []
-            for event in training_data:
-                features = self.extract_features(event)
-                if features:
-                    features_list.append(features)
-                    
-            if not features_list:
+            batch = batch or EventBatch(training_data)
+            if not batch.valid.any():
                 return
-                
-            # Conversion en array numpy
-            X = np.array(features_list)
+            X = batch.features[batch.valid]
             
             # Entraînement du scaler
             self.scaler.fit(X)
             X_scaled = self.scaler.transform(X)
             
-            # Entraînement de l'Isolation Forest
-            self.isolation_forest.fit(X_scaled)
+            # Entraînement de l'Isolation Forest, avec le contenu haché des messages
+            self.isolation_forest.fit(
+                batch.model_matrix(X_scaled, batch.valid, FEATURE_COUNT + MESSAGE_FEATURE_COUNT)
+            )
+            # Nouveau modèle : les scores en cache ne sont plus valables
+            self.model_version += 1
+            self.score_cache.clear()
             
             # Sauvegarde des modèles
             self.save_ml_models()
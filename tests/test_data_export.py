@@ -0,0 +1,21 @@
+"""
+Tests de l'export par blocs : un export sans ligne produit un fichier réduit aux colonnes
+"""
+import pytest
+
+from monitoring.utils.data_export import HISTORY_COLUMNS, export_chunks
+
+
+def test_empty_csv_export_writes_header(tmp_path):
+    path = tmp_path / 'historique.csv'
+    assert export_chunks(iter([]), str(path), HISTORY_COLUMNS) == 0
+    assert path.read_text(encoding='utf-8').splitlines() == [','.join(HISTORY_COLUMNS)]
+
+
+def test_empty_parquet_export_keeps_columns(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'historique.parquet'
+    assert export_chunks(iter([]), str(path), HISTORY_COLUMNS) == 0
+    table = pq.read_table(str(path))
+    assert table.num_rows == 0
+    assert table.column_names == HISTORY_COLUMNS
@@ -0,0 +1,31 @@
+"""
+Tests des différences entre collectes (SnapshotDiffer)
+"""
+from monitoring.services.equipment_snapshot import SnapshotDiffer
+
+
+def equipment(**metrics):
+    return {'id': 1, 'name': 'Serveur-01', 'metrics': {metric: {'value': value} for metric, value in metrics.items()}}
+
+
+def test_dead_band_and_sampled_entries():
+    differ = SnapshotDiffer()
+    differ.diff([equipment(cpu_utilization=10.0)])
+    delta = differ.diff([equipment(cpu_utilization=10.5)])
+    assert delta.is_empty
+    assert len(delta.sampled) == 1
+    delta = differ.diff([equipment(cpu_utilization=12.0)])
+    assert delta.changed_fields == {1: ['cpu_utilization']}
+
+
+def test_missing_metric_reported_as_none():
+    differ = SnapshotDiffer()
+    differ.diff([equipment(cpu_utilization=10.0, disk_utilization=50.0)])
+    delta = differ.diff([equipment(cpu_utilization=10.0)])
+    assert delta.changed_fields == {1: ['disk_utilization']}
+    assert differ.reference[1]['disk_utilization'] is None
+
+    # Signalée une seule fois, puis de nouveau à son retour
+    assert differ.diff([equipment(cpu_utilization=10.0)]).is_empty
+    delta = differ.diff([equipment(cpu_utilization=10.0, disk_utilization=50.0)])
+    assert delta.changed_fields == {1: ['disk_utilization']}
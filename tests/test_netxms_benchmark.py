@@ -0,0 +1,52 @@
+"""
+Test de fumée du banc de mesure NetXMS (10 nœuds, 1 cycle)
+"""
+import json
+import sys
+
+import pytest
+
+from monitoring.utils import netxms_benchmark
+
+
+def check_result(result, scenario):
+    assert result['scenario'] == scenario
+    assert result['nodes'] == 10
+    assert result['cycles'] == 1
+    assert result['requests_cold'] > 0
+    assert result['errors'] == 0
+
+
+@pytest.mark.parametrize('scenario', ['full', 'adaptive'])
+def test_service_scenarios(scenario):
+    results = netxms_benchmark.run_benchmarks([10], [scenario], cycles=1)
+    assert len(results) == 1
+    check_result(results[0], scenario)
+    assert scenario in netxms_benchmark.format_results(results)
+    assert netxms_benchmark.compare_to_baseline(results, results, tolerance=0.0) == []
+
+
+def test_page_scenario():
+    pytest.importorskip('PyQt5')
+    results = netxms_benchmark.run_benchmarks([10], ['page'], cycles=1)
+    check_result(results[0], 'page')
+
+
+def test_command_line_baseline(tmp_path, monkeypatch, capsys):
+    output = tmp_path / 'reference.json'
+    monkeypatch.setattr(sys, 'argv', ['netxms_benchmark', '--nodes', '10', '--scenarios', 'full',
+                                      '--cycles', '1', '--json', str(output)])
+    netxms_benchmark.main()
+    reference = json.loads(output.read_text(encoding='utf-8'))
+    assert [entry['scenario'] for entry in reference] == ['full']
+
+    # Une référence impossible à tenir fait échouer la commande
+    for entry in reference:
+        entry.update(cold_s=0.0, mean_s=0.0, requests_per_cycle=0, peak_memory_mb=0.0)
+    output.write_text(json.dumps(reference), encoding='utf-8')
+    monkeypatch.setattr(sys, 'argv', ['netxms_benchmark', '--nodes', '10', '--scenarios', 'full',
+                                      '--cycles', '1', '--baseline', str(output)])
+    with pytest.raises(SystemExit) as exit_info:
+        netxms_benchmark.main()
+    assert exit_info.value.code == 1
+    assert 'Régressions détectées' in capsys.readouterr().out
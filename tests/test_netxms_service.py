@@ -0,0 +1,126 @@
+"""
+Tests de NetXMSService contre le serveur NetXMS de substitution : lecture groupée et
+repli unitaire, revalidation ETag de l'inventaire, récupération incrémentale
+"""
+import pytest
+
+from monitoring.config.netxms_config import METRICS_CONFIG, METRICS_HISTORY_CONFIG, NETXMS_CONFIG
+from monitoring.services.netxms_service import NetXMSService
+from monitoring.utils.netxms_stub_server import NetXMSStubServer
+
+NODE_COUNT = 25
+BATCH_SIZE = 10
+# Métriques de METRICS_CONFIG plus l'uptime
+DCI_COUNT = len(METRICS_CONFIG) + 1
+
+
+@pytest.fixture(autouse=True)
+def memory_history(monkeypatch):
+    monkeypatch.setitem(METRICS_HISTORY_CONFIG, 'path', ':memory:')
+
+
+def stub_server(**kwargs) -> NetXMSStubServer:
+    """Serveur à utiliser comme gestionnaire de contexte (démarré à l'entrée)"""
+    return NetXMSStubServer(node_count=NODE_COUNT, seed=1, **kwargs)
+
+
+def connect(stub: NetXMSStubServer) -> NetXMSService:
+    service = NetXMSService(api_url=stub.api_url)
+    assert not service.simulation
+    service.bulk_batch_size = BATCH_SIZE
+    stub.reset_counters()
+    return service
+
+
+def assert_complete(equipment_data):
+    assert len(equipment_data) == NODE_COUNT
+    for equipment in equipment_data:
+        assert set(equipment['metrics']) == set(METRICS_CONFIG)
+
+
+def test_batched_collection():
+    with stub_server() as stub:
+        service = connect(stub)
+        assert_complete(service.get_all_equipment_data())
+        assert stub.request_counts == {'nodes': 1, 'bulk_last_values': 3}
+        assert service.bulk_supported is True
+
+
+@pytest.mark.parametrize('status', [404, 405, 501])
+def test_batch_unsupported_falls_back_to_unitary_requests(status):
+    with stub_server(batch_supported=False, unsupported_status=status) as stub:
+        service = connect(stub)
+        assert_complete(service.get_all_equipment_data())
+        assert stub.request_counts == {'nodes': 1, 'unsupported': 1, 'last_value': NODE_COUNT * DCI_COUNT}
+        assert service.bulk_supported is False
+
+        # Le refus est mémorisé : la collecte suivante ne retente pas la lecture groupée
+        stub.reset_counters()
+        assert_complete(service.get_all_equipment_data())
+        assert 'unsupported' not in stub.request_counts
+
+
+def test_batch_refused_after_detection_rereads_each_batch():
+    with stub_server() as stub:
+        service = connect(stub)
+        service.get_all_equipment_data()
+        stub.batch_supported = False
+        stub.reset_counters()
+        assert_complete(service.get_all_equipment_data())
+        assert stub.request_counts['unsupported'] == 3
+        assert stub.request_counts['last_value'] == NODE_COUNT * DCI_COUNT
+
+
+def test_inventory_revalidated_with_etag(monkeypatch):
+    monkeypatch.setitem(NETXMS_CONFIG, 'cache_ttl', {'nodes': 0})
+    with stub_server() as stub:
+        service = connect(stub)
+        url = f"{stub.api_url}/nodes"
+        nodes, refreshed = service.cached_get('nodes', url)
+        assert refreshed and len(nodes) == NODE_COUNT
+
+        # Inventaire inchangé : 304, la réponse en cache est servie
+        cached, refreshed = service.cached_get('nodes', url)
+        assert not refreshed and cached is nodes
+        assert stub.request_counts['nodes'] == 2
+
+        stub.add_node('Serveur-NOUVEAU')
+        nodes, refreshed = service.cached_get('nodes', url)
+        assert refreshed and len(nodes) == NODE_COUNT + 1
+
+
+def test_inventory_served_from_cache_within_ttl():
+    with stub_server() as stub:
+        service = connect(stub)
+        service.get_nodes()
+        service.get_nodes()
+        assert stub.request_counts == {'nodes': 1}
+
+
+def test_incremental_metrics_fetch_only_new_points(monkeypatch):
+    with stub_server() as stub:
+        service = connect(stub)
+        ranges = []
+        fetch = service.fetch_node_metrics
+
+        def spy(node_id, dci_name, start, end):
+            ranges.append((start, end))
+            return fetch(node_id, dci_name, start, end)
+
+        monkeypatch.setattr(service, 'fetch_node_metrics', spy)
+
+        first = service.get_node_metrics(1, 'CPU_UTIL', hours=1)
+        assert first and len(ranges) == 1
+
+        second = service.get_node_metrics(1, 'CPU_UTIL', hours=1)
+        assert stub.request_counts['values'] == 2
+        # Seule la fin de la série est redemandée, avec le recouvrement configuré
+        start, _ = ranges[1]
+        assert start >= ranges[0][1] - service.incremental_overlap - 60
+        timestamps = [point['timestamp'] for point in second]
+        assert timestamps == sorted(set(timestamps))
+        assert len(second) >= len(first)
+
+        # Fenêtre élargie : complément du début et fin de série
+        service.get_node_metrics(1, 'CPU_UTIL', hours=2)
+        assert stub.request_counts['values'] == 4
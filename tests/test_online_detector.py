@@ -0,0 +1,53 @@
+"""
+Tests du détecteur incrémental : calibration du score sur des données normales
+"""
+import numpy as np
+
+from monitoring.config.wazuh_config import ML_THRESHOLDS, ONLINE_DETECTOR_CONFIG
+from monitoring.services.online_detector import OnlineAnomalyDetector
+
+N_FEATURES = 7
+
+
+def trained_detector(rng, windows=3):
+    detector = OnlineAnomalyDetector(N_FEATURES)
+    for _ in range(windows):
+        detector.score_and_learn(rng.normal(size=(ONLINE_DETECTOR_CONFIG['window_size'], N_FEATURES)))
+    return detector
+
+
+def test_not_ready_before_two_windows():
+    rng = np.random.default_rng(0)
+    detector = trained_detector(rng, windows=1)
+    assert not detector.is_ready
+    assert not detector.score(rng.normal(size=(10, N_FEATURES))).any()
+    detector.learn(rng.normal(size=(ONLINE_DETECTOR_CONFIG['window_size'], N_FEATURES)))
+    assert detector.is_ready
+
+
+def test_normal_data_stays_below_thresholds():
+    rng = np.random.default_rng(1)
+    detector = trained_detector(rng)
+    scores = detector.score_and_learn(rng.normal(size=(5000, N_FEATURES)))
+    assert np.median(scores) == 0.0
+    assert scores.max() < ML_THRESHOLDS['anomaly_threshold']
+    # Contribution moyenne au score suspect (poids 0.3) négligeable
+    assert (scores * 0.3).mean() < 0.01
+
+
+def test_outliers_reach_anomaly_threshold():
+    rng = np.random.default_rng(2)
+    detector = trained_detector(rng)
+    scores = detector.score(rng.normal(size=(50, N_FEATURES)) + 8.0)
+    assert (scores >= ML_THRESHOLDS['anomaly_threshold']).all()
+
+
+def test_replayed_events_are_not_learned_twice():
+    rng = np.random.default_rng(3)
+    detector = OnlineAnomalyDetector(N_FEATURES)
+    X = rng.normal(size=(100, N_FEATURES))
+    timestamps = np.arange(100, dtype=float)
+    detector.learn(X, timestamps)
+    detector.learn(X, timestamps)
+    assert detector.scaler.count == 100
+    assert detector.forest.window_count == 100
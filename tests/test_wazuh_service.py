@@ -0,0 +1,81 @@
+"""
+Tests de la pagination des événements Wazuh : une page en erreur n'est jamais
+présentée comme un résultat complet
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from monitoring.config.wazuh_config import WAZUH_CONFIG
+from monitoring.services.wazuh_service import WazuhService
+
+PAGE_SIZE = 5
+
+
+class FailingEventsHandler(BaseHTTPRequestHandler):
+    """Première page complète, erreur 500 sur la suivante"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/status':
+            return self.send_json({'status': 'ok'})
+        params = parse_qs(url.query)
+        if int(params.get('offset', ['0'])[0]) > 0:
+            return self.send_json({'error': 'internal'}, 500)
+        event_type = params.get('q', ['event_type:login'])[0].split(':')[-1]
+        events = [
+            {'id': f"{event_type}-{index}", 'timestamp': 1700000000 + index, 'user': 'alice',
+             'event_type': event_type, 'message': 'test', 'agent': 'PC-01', 'severity': 3}
+            for index in range(PAGE_SIZE)
+        ]
+        return self.send_json({'data': events, 'total': 3 * PAGE_SIZE})
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FailingEventsHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    host, port = httpd.server_address[:2]
+    monkeypatch.setitem(WAZUH_CONFIG, 'api_url', f"http://{host}:{port}")
+    monkeypatch.setitem(WAZUH_CONFIG, 'page_size', PAGE_SIZE)
+    wazuh_service = WazuhService()
+    assert not wazuh_service.simulation
+    yield wazuh_service
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+def test_iter_events_raises_on_page_error(service):
+    pages = service.iter_events(hours=1)
+    assert len(next(pages)) == PAGE_SIZE
+    with pytest.raises(requests.exceptions.RequestException):
+        next(pages)
+
+
+def test_concurrent_filter_error_reaches_consumer(service):
+    with pytest.raises(requests.exceptions.RequestException):
+        list(service.iter_user_activity(hours=1))
+
+
+def test_partial_activity_is_not_scored(service):
+    assert service.get_events(hours=1) == []
+    assert service.get_user_activity(hours=1) == []
+    assert service.get_all_user_activity() == []
+    assert len(service.score_cache) == 0
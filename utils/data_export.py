@@ -0,0 +1,136 @@
+"""
+Export par blocs des données de surveillance (CSV ou Parquet), à mémoire constante
+"""
+import csv
+import logging
+import math
+import os
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Export Parquet indisponible sans pyarrow
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# Format -> filtre de la boîte de dialogue d'enregistrement
+EXPORT_FORMATS = {
+    'csv': "CSV (*.csv)",
+    'parquet': "Parquet (*.parquet)"
+}
+
+# Colonnes de l'export de l'historique persistant
+HISTORY_COLUMNS = ['node_id', 'dci', 'timestamp', 'value', 'min', 'max']
+
+# Un bloc : colonnes de même longueur, indexées par leur titre
+Chunk = Dict[str, Sequence]
+
+
+def available_formats() -> List[str]:
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet' or pq is not None]
+
+
+def format_from_path(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    return extension if extension in EXPORT_FORMATS else 'csv'
+
+
+class CSVChunkWriter:
+    """Écrit chaque bloc à la suite ; les valeurs manquantes (None, NaN) deviennent des cellules vides"""
+
+    def __init__(self, path: str, columns: List[str]):
+        self.columns = columns
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, chunk: Chunk):
+        cells = [
+            ['' if value is None or (isinstance(value, float) and math.isnan(value)) else value for value in chunk[column]]
+            for column in self.columns
+        ]
+        self.writer.writerows(zip(*cells))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetChunkWriter:
+    """
+    Un groupe de lignes Parquet par bloc ; le schéma est déduit du premier bloc. Sans
+    aucun bloc, le fichier est tout de même créé avec les colonnes (sans type), comme
+    le CSV réduit à sa ligne d'en-tête.
+    """
+
+    def __init__(self, path: str, columns: List[str]):
+        if pq is None:
+            raise RuntimeError("L'export Parquet nécessite le paquet pyarrow")
+        self.path = path
+        self.columns = columns
+        self.writer = None
+
+    def write(self, chunk: Chunk):
+        # from_pandas : les NaN deviennent des valeurs nulles, comme les cellules vides du CSV
+        table = pa.table({column: pa.array(chunk[column], from_pandas=True) for column in self.columns})
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is None:
+            empty = pa.table({column: pa.array([], type=pa.null()) for column in self.columns})
+            pq.write_table(empty, self.path)
+            return
+        self.writer.close()
+
+
+def open_writer(path: str, columns: List[str], fmt: Optional[str] = None):
+    fmt = fmt or format_from_path(path)
+    return ParquetChunkWriter(path, columns) if fmt == 'parquet' else CSVChunkWriter(path, columns)
+
+
+def export_chunks(chunks: Iterable[Chunk], path: str, columns: List[str], fmt: Optional[str] = None,
+                  total: Optional[int] = None, progress: Optional[Callable[[int, Optional[int]], None]] = None,
+                  cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Écrit les blocs au fur et à mesure de leur production : un seul bloc est en mémoire
+    à la fois. progress(lignes écrites, total) est appelé après chaque bloc ; l'export
+    s'arrête (fichier incomplet supprimé) dès que cancelled() est vrai.
+    Retourne le nombre de lignes écrites.
+    """
+    writer = open_writer(path, columns, fmt)
+    written = 0
+    try:
+        for chunk in chunks:
+            if cancelled is not None and cancelled():
+                break
+            writer.write(chunk)
+            written += len(chunk[columns[0]])
+            if progress is not None:
+                progress(written, total)
+    finally:
+        writer.close()
+    if cancelled is not None and cancelled():
+        if os.path.exists(path):
+            os.remove(path)
+        logger.info(f"Export vers {path} annulé")
+    else:
+        logger.info(f"{written} lignes exportées vers {path}")
+    return written
+
+
+def history_chunks(rows_chunks: Iterable[List[tuple]]) -> Iterable[Chunk]:
+    """Blocs de MetricsHistoryService.iter_range mis en colonnes, horodatages au format ISO"""
+    for rows in rows_chunks:
+        node_ids, dcis, timestamps, values, minimums, maximums = zip(*rows)
+        yield {
+            'node_id': node_ids,
+            'dci': dcis,
+            'timestamp': [datetime.fromtimestamp(ts).isoformat() for ts in timestamps],
+            'value': values,
+            'min': minimums,
+            'max': maximums
+        }
@@ -0,0 +1,69 @@
+"""
+Décimation min/max des séries temporelles pour l'affichage (pyramide de niveaux de détail)
+"""
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class MinMaxPyramid:
+    """
+    Pyramide de décimation d'une série : le niveau k regroupe 2^k échantillons consécutifs
+    en un intervalle (horodatage du premier, minimum, maximum). Chaque niveau est calculé
+    à partir du précédent, à la demande, en O(n / 2^k).
+
+    envelope(max_points) renvoie l'enveloppe min/max du niveau le plus fin tenant dans
+    max_points points : le coût de tracé dépend de la largeur du graphique et non de la
+    durée affichée, et les pics restent visibles quel que soit le niveau.
+    """
+
+    def __init__(self, timestamps: np.ndarray, values: np.ndarray, minimum: Optional[np.ndarray] = None,
+                 maximum: Optional[np.ndarray] = None):
+        self.timestamps = timestamps
+        self.values = values
+        minimum = values if minimum is None else minimum
+        maximum = values if maximum is None else maximum
+        self.levels: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = [(timestamps, minimum, maximum)]
+        # Niveau 0 déjà agrégé (min/max distincts des valeurs) : l'enveloppe est nécessaire même sans décimation
+        self.aggregated = minimum is not values or maximum is not values
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def level(self, k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Niveau k (ou le plus grossier disponible) : (horodatages, minimums, maximums)"""
+        while len(self.levels) <= k:
+            timestamps, minimum, maximum = self.levels[-1]
+            if len(timestamps) <= 1:
+                break
+            even = len(timestamps) // 2 * 2
+            # fmin / fmax ignorent les NaN (échantillons manquants)
+            coarse = (
+                timestamps[:even:2],
+                np.fmin(minimum[:even:2], minimum[1:even:2]),
+                np.fmax(maximum[:even:2], maximum[1:even:2])
+            )
+            if even < len(timestamps):
+                # Le dernier échantillon isolé forme son propre intervalle
+                coarse = tuple(np.append(part, source[-1:]) for part, source in zip(coarse, (timestamps, minimum, maximum)))
+            self.levels.append(coarse)
+        return self.levels[min(k, len(self.levels) - 1)]
+
+    def envelope(self, max_points: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points à tracer (x, y) : la série elle-même si elle tient dans max_points
+        (vues sans copie), sinon deux points (min, max) par intervalle.
+        """
+        count = len(self.timestamps)
+        if count <= max_points and not self.aggregated:
+            return self.timestamps, self.values
+
+        buckets = max(1, max_points // 2)
+        k = max(0, math.ceil(math.log2(count / buckets))) if count > buckets else 0
+        timestamps, minimum, maximum = self.level(k)
+        x = np.repeat(timestamps, 2)
+        y = np.empty(len(x), dtype=np.float64)
+        y[0::2] = minimum
+        y[1::2] = maximum
+        return x, y
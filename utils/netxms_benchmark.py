@@ -0,0 +1,262 @@
+"""
+Banc de mesure de la collecte NetXMS contre le serveur de substitution
+
+Pour chaque taille d'inventaire, démarre un NetXMSStubServer local et mesure :
+- la durée d'un cycle de rafraîchissement (premier cycle à froid, puis moyenne et maximum) ;
+- le nombre de requêtes HTTP reçues par le serveur par cycle ;
+- le pic d'allocations Python (tracemalloc) sur un cycle supplémentaire.
+
+Scénarios :
+- full     : NetXMSService.get_all_equipment_data (collecte de tous les nœuds)
+- adaptive : NetXMSService.collect_due_equipment (collecte planifiée par nœud)
+- page     : SurveillancePage.refresh_data (collecte en arrière-plan, historique, tableau et graphiques)
+
+Les résultats peuvent être écrits en JSON puis servir de référence : toute mesure
+dépassant la référence de plus de --tolerance fait échouer la commande (code 1).
+
+Utilisation :
+    python -m monitoring.utils.netxms_benchmark --nodes 100,1000,10000
+    python -m monitoring.utils.netxms_benchmark --nodes 1000 --latency-ms 20 --error-rate 0.01 --scenarios full,page
+    python -m monitoring.utils.netxms_benchmark --nodes 1000 --json reference.json
+    python -m monitoring.utils.netxms_benchmark --nodes 1000 --baseline reference.json --tolerance 0.25
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from monitoring.config.netxms_config import NETXMS_CONFIG, METRICS_HISTORY_CONFIG
+from monitoring.services.netxms_service import NetXMSService
+from monitoring.utils.netxms_stub_server import NetXMSStubServer
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ['full', 'adaptive', 'page']
+
+# Mesures comparées à la référence (plus la valeur est basse, mieux c'est) et écart absolu
+# en deçà duquel une différence est considérée comme du bruit de mesure
+COMPARED_MEASURES = {'cold_s': 0.05, 'mean_s': 0.05, 'requests_per_cycle': 1, 'peak_memory_mb': 1.0}
+
+
+@contextmanager
+def benchmark_config(api_url: str, history_path: str):
+    """Pointe temporairement la configuration NetXMS vers le serveur factice et une base d'historique jetable"""
+    saved = NETXMS_CONFIG['api_url'], METRICS_HISTORY_CONFIG['path']
+    NETXMS_CONFIG['api_url'] = api_url
+    METRICS_HISTORY_CONFIG['path'] = history_path
+    try:
+        yield
+    finally:
+        NETXMS_CONFIG['api_url'], METRICS_HISTORY_CONFIG['path'] = saved
+
+
+def measure(server: NetXMSStubServer, refresh: Callable[[], object], cycles: int,
+            cold: Optional[Callable[[], object]] = None) -> Dict:
+    """
+    Exécute `cycles` rafraîchissements chronométrés puis un cycle sous tracemalloc.
+    Le premier cycle (à froid) exécute `cold` s'il est fourni, `refresh` sinon.
+    """
+    durations = []
+    requests_per_cycle = []
+    errors = 0
+    for cycle in range(max(1, cycles)):
+        server.reset_counters()
+        start = time.perf_counter()
+        (cold if cycle == 0 and cold is not None else refresh)()
+        durations.append(time.perf_counter() - start)
+        with server.lock:
+            counts = dict(server.request_counts)
+        errors += counts.get('errors', 0)
+        requests_per_cycle.append(sum(counts.values()))
+
+    # Cycle distinct : tracemalloc ralentit fortement l'exécution
+    tracemalloc.start()
+    try:
+        refresh()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    warm = durations[1:] or durations
+    return {
+        'cycles': len(durations),
+        'cold_s': round(durations[0], 4),
+        'mean_s': round(sum(warm) / len(warm), 4),
+        'max_s': round(max(warm), 4),
+        'requests_cold': requests_per_cycle[0],
+        'requests_per_cycle': round(sum(requests_per_cycle) / len(requests_per_cycle), 1),
+        'errors': errors,
+        'peak_memory_mb': round(peak / (1024 * 1024), 2)
+    }
+
+
+def benchmark_service(server: NetXMSStubServer, scenario: str, cycles: int, history_path: str,
+                      max_workers: Optional[int] = None) -> Dict:
+    with benchmark_config(server.api_url, history_path):
+        service = NetXMSService()
+    if service.simulation:
+        raise RuntimeError(f"Serveur factice injoignable sur {server.api_url}")
+
+    if scenario == 'full':
+        refresh = lambda: service.get_all_equipment_data(max_workers)
+    else:
+        refresh = lambda: service.collect_due_equipment(max_workers)
+    try:
+        return measure(server, refresh, cycles)
+    finally:
+        service.metrics_history.close()
+
+
+def benchmark_page(server: NetXMSStubServer, cycles: int, history_path: str) -> Dict:
+    """Mesure SurveillancePage.refresh_data (hors affichage si aucun écran n'est disponible)"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    from monitoring.interfaces.admin.surveillance_page import SurveillancePage
+    pages = []
+
+    def wait_collection():
+        # La collecte s'exécute dans un thread ; son résultat est appliqué par la boucle d'événements
+        pages[0].collection_thread.wait()
+        app.processEvents()
+
+    def construct():
+        # Le constructeur lance la première collecte : c'est le cycle à froid
+        with benchmark_config(server.api_url, history_path):
+            pages.append(SurveillancePage())
+        pages[0].timer.stop()
+        wait_collection()
+
+    def refresh():
+        pages[0].refresh_data()
+        wait_collection()
+
+    try:
+        return measure(server, refresh, cycles, cold=construct)
+    finally:
+        for page in pages:
+            page.stop_collection()
+            page.netxms_service.metrics_history.close()
+            page.deleteLater()
+        app.processEvents()
+
+
+def run_benchmarks(node_counts: List[int], scenarios: List[str], cycles: int = 3, latency_ms: float = 0.0,
+                   latency_jitter_ms: float = 0.0, error_rate: float = 0.0, batch_supported: bool = True,
+                   max_workers: Optional[int] = None, seed: int = 42) -> List[Dict]:
+    results = []
+    for node_count in node_counts:
+        for scenario in scenarios:
+            server = NetXMSStubServer(node_count=node_count, batch_supported=batch_supported, seed=seed,
+                                      latency_ms=latency_ms, latency_jitter_ms=latency_jitter_ms,
+                                      error_rate=error_rate)
+            with server, tempfile.TemporaryDirectory() as tmpdir:
+                history_path = os.path.join(tmpdir, 'metrics_history.db')
+                logger.info(f"Scénario {scenario}, {node_count} nœuds")
+                if scenario == 'page':
+                    result = benchmark_page(server, cycles, history_path)
+                else:
+                    result = benchmark_service(server, scenario, cycles, history_path, max_workers)
+            result.update({
+                'scenario': scenario,
+                'nodes': node_count,
+                'batch': batch_supported,
+                'latency_ms': latency_ms,
+                'error_rate': error_rate
+            })
+            results.append(result)
+    return results
+
+
+def compare_to_baseline(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Liste des régressions : mesures dépassant la référence de plus de `tolerance` (fraction)"""
+    reference = {(entry['scenario'], entry['nodes']): entry for entry in baseline}
+    regressions = []
+    for result in results:
+        previous = reference.get((result['scenario'], result['nodes']))
+        if previous is None:
+            continue
+        for measure_name, noise in COMPARED_MEASURES.items():
+            before, after = previous.get(measure_name), result.get(measure_name)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > noise:
+                regressions.append(
+                    f"{result['scenario']} / {result['nodes']} nœuds : {measure_name} {before} -> {after}"
+                )
+    return regressions
+
+
+def format_results(results: List[Dict]) -> str:
+    header = f"{'scénario':<10} {'nœuds':>7} {'froid (s)':>10} {'moyen (s)':>10} {'max (s)':>9} " \
+             f"{'req. froid':>10} {'req./cycle':>10} {'erreurs':>8} {'pic (Mo)':>9}"
+    lines = [header, '-' * len(header)]
+    for result in results:
+        lines.append(
+            f"{result['scenario']:<10} {result['nodes']:>7} {result['cold_s']:>10.3f} {result['mean_s']:>10.3f} "
+            f"{result['max_s']:>9.3f} {result['requests_cold']:>10} {result['requests_per_cycle']:>10} "
+            f"{result['errors']:>8} {result['peak_memory_mb']:>9.2f}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de mesure de la collecte NetXMS")
+    parser.add_argument('--nodes', default='100,1000', help="Tailles d'inventaire, séparées par des virgules")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Parmi {', '.join(SCENARIOS)}")
+    parser.add_argument('--cycles', type=int, default=3, help="Rafraîchissements chronométrés par scénario")
+    parser.add_argument('--workers', type=int, default=None, help="Requêtes simultanées (NETXMS_CONFIG par défaut)")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--no-batch', action='store_true', help="Désactive la lecture groupée côté serveur")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Écrit les résultats dans ce fichier")
+    parser.add_argument('--baseline', help="Résultats de référence (JSON) à ne pas dépasser")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Dépassement toléré de la référence (fraction)")
+    args = parser.parse_args()
+
+    # Les erreurs injectées produiraient un avertissement par requête
+    logging.basicConfig(level=logging.ERROR)
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',') if scenario.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Scénarios inconnus : {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(
+        [int(count) for count in args.nodes.split(',')],
+        scenarios,
+        cycles=args.cycles,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        batch_supported=not args.no_batch,
+        max_workers=args.workers,
+        seed=args.seed
+    )
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRégressions détectées :")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nAucune régression par rapport à la référence")
+
+
+if __name__ == '__main__':
+    main()
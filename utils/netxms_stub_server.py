@@ -0,0 +1,354 @@
+"""
+Serveur NetXMS de substitution pour les tests locaux de NetXMSService
+
+Expose un sous-ensemble de l'API REST utilisée par le service (nœuds, dernières
+valeurs de DCI, historique) ainsi que la lecture groupée /dci/last_values, qui
+peut être désactivée (réponse 404, 405 ou 501) pour tester le repli requête par requête.
+
+Les valeurs suivent, pour chaque couple (nœud, DCI), un profil reproductible :
+niveau de base, cycle journalier et bruit ; une fraction des nœuds est chargée
+près des seuils. Une latence et un taux d'erreurs (503) peuvent être injectés
+pour reproduire un serveur distant ou dégradé. Dimensionné pour 10 à 50 000 nœuds.
+
+Utilisation :
+    python -m monitoring.utils.netxms_stub_server --nodes 50 --port 8080
+    python -m monitoring.utils.netxms_stub_server --no-batch
+    python -m monitoring.utils.netxms_stub_server --nodes 20000 --latency-ms 20 --error-rate 0.01
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = '/api/v1'
+
+# Plage de valeurs simulées par DCI
+DCI_RANGES = {
+    'CPU_UTIL': (5.0, 95.0),
+    'MEMORY_UTIL': (20.0, 95.0),
+    'DISK_UTIL': (30.0, 98.0),
+    'NETWORK_TRAFFIC': (1.0, 250.0),
+    'UPTIME': (3600.0, 90 * 86400.0)
+}
+
+NODE_PREFIXES = ['Serveur', 'PC', 'Routeur', 'Switch', 'Firewall']
+
+# Sites et groupes (baies) attribués aux nœuds, pour l'arborescence de la page de surveillance
+STUB_SITES = ['Paris', 'Lyon', 'Marseille', 'Lille']
+STUB_GROUPS_PER_SITE = 12
+
+# Part des nœuds dont la charge est proche des seuils d'alerte
+HOT_NODE_RATIO = 0.05
+
+
+class DCIProfile:
+    """Profil de valeurs d'une DCI pour un nœud : base + cycle journalier + bruit, borné à DCI_RANGES"""
+
+    def __init__(self, rng: random.Random, low: float, high: float, hot: bool):
+        span = high - low
+        self.low = low
+        self.high = high
+        self.base = low + span * (rng.uniform(0.75, 0.9) if hot else rng.uniform(0.1, 0.55))
+        self.amplitude = span * rng.uniform(0.02, 0.12)
+        self.phase = rng.uniform(0, 2 * math.pi)
+        self.noise = span * rng.uniform(0.005, 0.03)
+
+    def value(self, ts: float, rng: random.Random) -> float:
+        cycle = math.sin(2 * math.pi * (ts % 86400) / 86400 + self.phase)
+        value = self.base + self.amplitude * cycle + rng.gauss(0, self.noise)
+        return round(min(self.high, max(self.low, value)), 2)
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    """File d'attente d'acceptation élargie pour les clients fortement concurrents"""
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class NetXMSStubServer:
+    """Serveur HTTP NetXMS factice exécuté dans un thread"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, node_count: int = 10,
+                 batch_supported: bool = True, seed: int = 42, latency_ms: float = 0.0,
+                 latency_jitter_ms: float = 0.0, error_rate: float = 0.0, unsupported_status: int = 404):
+        self.batch_supported = batch_supported
+        self.unsupported_status = unsupported_status  # Réponse à la lecture groupée désactivée
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.started_at = time.time()
+        self.nodes = [
+            {
+                'id': node_id,
+                'name': f"{NODE_PREFIXES[node_id % len(NODE_PREFIXES)]}-{node_id:05d}",
+                'site': STUB_SITES[node_id % len(STUB_SITES)],
+                'group': f"Baie-{node_id // len(STUB_SITES) % STUB_GROUPS_PER_SITE + 1:02d}"
+            }
+            for node_id in range(1, node_count + 1)
+        ]
+        self.node_index = {node['id']: node for node in self.nodes}
+        self.inventory_version = 1
+        self.profiles: Dict = {}
+        self.boot_times: Dict[int, float] = {}
+        self.request_counts = {}
+        self.lock = threading.Lock()
+        self.httpd = StubHTTPServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def api_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    @property
+    def total_requests(self) -> int:
+        with self.lock:
+            return sum(self.request_counts.values())
+
+    def reset_counters(self):
+        with self.lock:
+            self.request_counts.clear()
+
+    def start(self) -> 'NetXMSStubServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Serveur NetXMS factice démarré sur {self.api_url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread:
+            self.thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def add_node(self, name: str) -> Dict:
+        """Ajoute un nœud à l'inventaire (change l'ETag de /nodes)"""
+        with self.lock:
+            node = {'id': max(self.node_index, default=0) + 1, 'name': name}
+            self.nodes.append(node)
+            self.node_index[node['id']] = node
+            self.inventory_version += 1
+        return node
+
+    def remove_node(self, node_id: int):
+        with self.lock:
+            self.nodes = [node for node in self.nodes if node['id'] != node_id]
+            self.node_index.pop(node_id, None)
+            self.inventory_version += 1
+
+    def _count(self, endpoint: str):
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def _profile(self, node_id: int, dci_name: str) -> DCIProfile:
+        """Profil reproductible d'un couple (nœud, DCI), créé à la première demande"""
+        key = (node_id, dci_name)
+        profile = self.profiles.get(key)
+        if profile is None:
+            rng = random.Random(f"{self.seed}:{node_id}:{dci_name}")
+            hot = random.Random(f"{self.seed}:{node_id}").random() < HOT_NODE_RATIO
+            low, high = DCI_RANGES[dci_name]
+            profile = self.profiles[key] = DCIProfile(rng, low, high, hot)
+        return profile
+
+    def sample(self, node_id: int, dci_name: str, ts: float) -> float:
+        """Valeur simulée d'une DCI à l'instant ts ; l'uptime croît depuis un démarrage fictif"""
+        if dci_name == 'UPTIME':
+            boot_time = self.boot_times.get(node_id)
+            if boot_time is None:
+                low, high = DCI_RANGES[dci_name]
+                boot_time = self.boot_times[node_id] = self.started_at - random.Random(f"{self.seed}:{node_id}:boot").uniform(low, high)
+            return round(max(0.0, ts - boot_time), 0)
+        return self._profile(node_id, dci_name).value(ts, self.random)
+
+    def last_value(self, node_id: int, dci_name: str) -> Optional[Dict]:
+        """Dernière valeur simulée d'une DCI"""
+        if node_id not in self.node_index or dci_name not in DCI_RANGES:
+            return None
+        now = time.time()
+        return {
+            'node_id': node_id,
+            'dci_name': dci_name,
+            'value': self.sample(node_id, dci_name, now),
+            'timestamp': datetime.fromtimestamp(now).isoformat()
+        }
+
+    def values(self, node_id: int, dci_name: str, start_ms: int, end_ms: int, step: int = 30) -> List[Dict]:
+        """Historique simulé d'une DCI, un point toutes les `step` secondes"""
+        if node_id not in self.node_index or dci_name not in DCI_RANGES:
+            return []
+        points = []
+        ts = (start_ms // 1000 // step + 1) * step
+        while ts <= end_ms // 1000:
+            points.append({
+                'timestamp': datetime.fromtimestamp(ts).isoformat(),
+                'value': self.sample(node_id, dci_name, ts)
+            })
+            ts += step
+        return points
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send_json(self, payload, status: int = 200, etag: Optional[str] = None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _not_modified(self, etag: str) -> bool:
+                """Répond 304 si l'ETag fourni par le client est toujours valide"""
+                if self.headers.get('If-None-Match') != etag:
+                    return False
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return True
+
+            def _not_found(self):
+                self._send_json({'error': 'not found'}, 404)
+
+            def _degrade(self) -> bool:
+                """Applique la latence simulée ; répond 503 (et retourne True) selon le taux d'erreurs"""
+                delay = server.latency_ms + (server.random.uniform(0, server.latency_jitter_ms) if server.latency_jitter_ms else 0.0)
+                if delay > 0:
+                    time.sleep(delay / 1000.0)
+                if server.error_rate and server.random.random() < server.error_rate:
+                    server._count('errors')
+                    self._send_json({'error': 'service unavailable'}, 503)
+                    return True
+                return False
+
+            def do_GET(self):
+                if self._degrade():
+                    return
+                url = urlparse(self.path)
+                path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else None
+                if path is None:
+                    return self._not_found()
+
+                if path == '/version':
+                    server._count('version')
+                    return self._send_json({'version': 'stub'})
+                etag = f'"inventory-{server.inventory_version}"'
+                if path == '/nodes':
+                    server._count('nodes')
+                    if self._not_modified(etag):
+                        return
+                    return self._send_json(server.nodes, etag=etag)
+
+                match = re.fullmatch(r'/nodes/(\d+)', path)
+                if match:
+                    server._count('node_details')
+                    node = server.node_index.get(int(match.group(1)))
+                    if node is None:
+                        return self._not_found()
+                    if self._not_modified(etag):
+                        return
+                    return self._send_json(dict(node, status='NORMAL'), etag=etag)
+
+                match = re.fullmatch(r'/nodes/(\d+)/dci/([^/]+)/last_value', path)
+                if match:
+                    server._count('last_value')
+                    data = server.last_value(int(match.group(1)), match.group(2))
+                    if data is None:
+                        return self._not_found()
+                    return self._send_json(data)
+
+                match = re.fullmatch(r'/nodes/(\d+)/dci/([^/]+)/values', path)
+                if match:
+                    server._count('values')
+                    params = parse_qs(url.query)
+                    now_ms = int(datetime.now().timestamp() * 1000)
+                    start_ms = int(params.get('from', [now_ms - 3600 * 1000])[0])
+                    end_ms = int(params.get('to', [now_ms])[0])
+                    return self._send_json(server.values(int(match.group(1)), match.group(2), start_ms, end_ms))
+
+                return self._not_found()
+
+            def do_POST(self):
+                if self._degrade():
+                    return
+                path = urlparse(self.path).path
+                if path != f"{API_PREFIX}/dci/last_values":
+                    server._count('unsupported')
+                    return self._not_found()
+                if not server.batch_supported:
+                    server._count('unsupported')
+                    return self._send_json({'error': 'not supported'}, server.unsupported_status)
+
+                server._count('bulk_last_values')
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b'{}')
+                    node_ids = payload.get('nodes', [])
+                    dci_names = payload.get('dci', [])
+                except (ValueError, AttributeError):
+                    return self._send_json({'error': 'invalid payload'}, 400)
+
+                items = []
+                for node_id in node_ids:
+                    for dci_name in dci_names:
+                        data = server.last_value(node_id, dci_name)
+                        if data is not None:
+                            items.append(data)
+                return self._send_json(items)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur NetXMS factice")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--nodes', type=int, default=10, help="Nombre de nœuds simulés")
+    parser.add_argument('--no-batch', action='store_true', help="Désactive la lecture groupée /dci/last_values")
+    parser.add_argument('--unsupported-status', type=int, default=404, choices=[404, 405, 501],
+                        help="Code renvoyé par la lecture groupée désactivée")
+    parser.add_argument('--seed', type=int, default=42, help="Graine des profils de valeurs")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Latence ajoutée à chaque réponse")
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0, help="Variation aléatoire de la latence")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Part des requêtes en erreur 503 (0 à 1)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = NetXMSStubServer(args.host, args.port, args.nodes, batch_supported=not args.no_batch, seed=args.seed,
+                              latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                              error_rate=args.error_rate, unsupported_status=args.unsupported_status)
+    print(f"Serveur NetXMS factice sur {server.api_url} ({args.nodes} nœuds)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Stockage en mémoire des séries temporelles de métriques (tampons circulaires NumPy)
+"""
+import logging
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class TimeSeriesStore:
+    """
+    Séries temporelles par couple (nœud, métrique) dans des tampons circulaires préalloués.
+
+    Chaque série occupe une ligne de tableaux de largeur 2 × capacity : chaque échantillon
+    est écrit deux fois (positions i et i + capacity), de sorte que les N derniers
+    échantillons forment toujours une tranche contiguë. L'ajout est en O(1) et la lecture
+    d'une fenêtre renvoie une vue sans copie.
+
+    Mémoire bornée : max_series × 2 × capacity × (8 + 4 × nombre de métriques) octets.
+    """
+
+    def __init__(self, metrics: Iterable[str], capacity: int = 720, max_series: int = 2048):
+        self.metrics = list(metrics)
+        self.capacity = capacity
+        self.max_series = max_series
+
+        self._timestamps = np.zeros((max_series, 2 * capacity), dtype=np.float64)
+        self._values = {
+            metric: np.full((max_series, 2 * capacity), np.nan, dtype=np.float32)
+            for metric in self.metrics
+        }
+        self._head = np.zeros(max_series, dtype=np.int64)    # Prochaine position d'écriture
+        self._count = np.zeros(max_series, dtype=np.int64)   # Échantillons valides (≤ capacity)
+        self._version = np.zeros(max_series, dtype=np.int64)  # Nombre total d'ajouts
+
+        self._slots: Dict[Hashable, int] = {}
+        self._free_slots: List[int] = list(range(max_series - 1, -1, -1))
+        # Avertissement de saturation émis une seule fois, jusqu'à la libération d'une série
+        self._capacity_warned = False
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def keys(self) -> List[Hashable]:
+        return list(self._slots)
+
+    def memory_bytes(self) -> int:
+        """Taille des tampons préalloués, indépendante du remplissage"""
+        return self._timestamps.nbytes + sum(values.nbytes for values in self._values.values())
+
+    def _slot(self, key: Hashable, create: bool = False) -> Optional[int]:
+        slot = self._slots.get(key)
+        if slot is None and create:
+            if not self._free_slots:
+                if not self._capacity_warned:
+                    logger.warning(f"Capacité du stockage de séries atteinte ({self.max_series}), "
+                                   f"{key} et les nouvelles séries suivantes sont ignorés")
+                    self._capacity_warned = True
+                return None
+            slot = self._free_slots.pop()
+            self._slots[key] = slot
+            self._head[slot] = 0
+            self._count[slot] = 0
+            self._timestamps[slot].fill(0.0)
+            for values in self._values.values():
+                values[slot].fill(np.nan)
+        return slot
+
+    def append(self, key: Hashable, timestamp: float, values: Dict[str, float]) -> bool:
+        """Ajoute un échantillon (toutes métriques) pour une série ; les métriques absentes valent NaN"""
+        slot = self._slot(key, create=True)
+        if slot is None:
+            return False
+
+        head = self._head[slot]
+        mirror = head + self.capacity
+        self._timestamps[slot, head] = self._timestamps[slot, mirror] = timestamp
+        for metric, buffer in self._values.items():
+            value = values.get(metric)
+            value = np.nan if value is None else value
+            buffer[slot, head] = buffer[slot, mirror] = value
+
+        self._head[slot] = (head + 1) % self.capacity
+        self._count[slot] = min(self._count[slot] + 1, self.capacity)
+        self._version[slot] += 1
+        return True
+
+    def remove(self, key: Hashable):
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            self._free_slots.append(slot)
+            self._capacity_warned = False
+
+    def count(self, key: Hashable) -> int:
+        slot = self._slot(key)
+        return 0 if slot is None else int(self._count[slot])
+
+    def version(self, key: Hashable) -> int:
+        """Compteur d'ajouts de la série, utile pour invalider des caches dérivés"""
+        slot = self._slot(key)
+        return 0 if slot is None else int(self._version[slot])
+
+    def _bounds(self, slot: int, last: Optional[int]) -> Tuple[int, int]:
+        count = int(self._count[slot])
+        n = count if last is None else max(0, min(last, count))
+        end = int(self._head[slot]) + self.capacity
+        return end - n, end
+
+    def timestamps(self, key: Hashable, last: Optional[int] = None, since: Optional[float] = None) -> np.ndarray:
+        """Vue (lecture seule) des horodatages de la fenêtre demandée, du plus ancien au plus récent"""
+        timestamps, _ = self.window(key, None, last, since)
+        return timestamps
+
+    def window(self, key: Hashable, metric: Optional[str], last: Optional[int] = None,
+               since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Renvoie (horodatages, valeurs) pour les `last` derniers échantillons et/ou ceux
+        postérieurs à `since`. Les tableaux sont des vues en lecture seule sur les tampons.
+        """
+        slot = self._slot(key)
+        if slot is None:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float32)
+
+        start, end = self._bounds(slot, last)
+        timestamps = self._timestamps[slot, start:end]
+        if since is not None:
+            start += int(np.searchsorted(timestamps, since, side='right'))
+            timestamps = self._timestamps[slot, start:end]
+
+        values = self._values[metric][slot, start:end] if metric is not None else np.empty(0, dtype=np.float32)
+        timestamps = timestamps.view()
+        values = values.view()
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+    def latest(self, key: Hashable, metric: str) -> Optional[float]:
+        """Dernière valeur d'une métrique, ou None"""
+        _, values = self.window(key, metric, last=1)
+        if values.size == 0 or np.isnan(values[0]):
+            return None
+        return float(values[0])